@@ -3,6 +3,23 @@
 
 EVENTBRITE_DOWNLOAD_FREQUENCY_HOURS = 48
 
+EVENTBRITE_API_URL = "https://www.eventbriteapi.com/v3"
+# Concurrent requests, and the most requests per second made to any one host, when downloading.
+EVENTBRITE_DOWNLOAD_WORKERS = 8
+EVENTBRITE_REQUESTS_PER_SECOND = 10
+# Pages of the event listings scraped at once, and the page the scraper gives up at.
+EVENTBRITE_SCRAPE_WORKERS = 4
+EVENTBRITE_SCRAPE_PAGE_LIMIT = 500
+# Raw data parsed by each task when the parse stage is split across the workers.
+EVENTBRITE_PARSE_CHUNK_SIZE = 200
+
+# How long a venue's Google Maps place is trusted before it is looked up again, and how closely
+# venues without an EventBrite ID must be placed to share a lookup.
+GOOGLE_MAPS_VENUE_CACHE_DAYS = 30
+GOOGLE_MAPS_VENUE_DECIMAL_PLACES = 3
+# The Places API never returns photos wider than this.
+GOOGLE_MAPS_PHOTO_MAX_WIDTH = 1600
+
 BLEACH_ALLOWED_TAGS = [
     "div",
     "p",
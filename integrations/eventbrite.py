@@ -4,8 +4,14 @@
 import json
 import logging
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
 from datetime import datetime
 from datetime import timedelta
+from functools import cached_property
 from http.client import OK
 
 # 3rd-party
@@ -15,6 +21,8 @@ import pytz
 from django.conf import settings
 from django.core.files.temp import NamedTemporaryFile
 from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from googlemaps.exceptions import TransportError
 from pytz import UTC
@@ -22,18 +30,38 @@ from pytz import UTC
 # Project
 from integrations.constants import BLEACH_ALLOWED_ATTRIBUTES
 from integrations.constants import BLEACH_ALLOWED_TAGS
+from integrations.constants import EVENTBRITE_API_URL
 from integrations.constants import EVENTBRITE_CATEGORY_MAPPING
 from integrations.constants import EVENTBRITE_DOWNLOAD_FREQUENCY_HOURS
+from integrations.constants import EVENTBRITE_DOWNLOAD_WORKERS
+from integrations.constants import EVENTBRITE_PARSE_CHUNK_SIZE
+from integrations.constants import EVENTBRITE_REQUESTS_PER_SECOND
+from integrations.constants import EVENTBRITE_SCRAPE_PAGE_LIMIT
+from integrations.constants import EVENTBRITE_SCRAPE_WORKERS
+from integrations.constants import GOOGLE_MAPS_PHOTO_MAX_WIDTH
+from integrations.constants import GOOGLE_MAPS_VENUE_CACHE_DAYS
+from integrations.constants import GOOGLE_MAPS_VENUE_DECIMAL_PLACES
 from integrations.exceptions import APIError
 from integrations.models import EventBriteEventID
 from integrations.models import EventBriteRawEventData
+from integrations.models import GoogleMapsVenue
+from integrations.utils import RateLimiter
 from integrations.utils import http_request_with_backoff
+from integrations.utils import pooled_session
+from search.cache import bump_search_version
 from search.constants import SEARCH_ENTITY_SOURCES
 from search.models import Event
 from search.models import Place
+from search.models import SearchDocument
 from search.models import SearchImage
 from users.models import CustomUser
 
+# Event links look like https://www.eventbrite.com/e/some-event-name-1234?aff=xyz, on either the
+# .com or .co.uk domain. The ID is the digits at the end of the path.
+EVENT_LINK_PATTERN = re.compile(
+    rb'href="https://www\.eventbrite\.(?:com|co\.uk)/e/(?:[^"?]*-)?(\d+)[?"]',
+)
+
 
 def get_or_create_api_user():
     """We need a user to 'upload' the data. Create a fake user if one doesn't exist for the api."""
@@ -50,20 +78,35 @@ class EventIDDownloader:
     Stage 1 of the download process.
 
     EventBrite have closed off access to their event lists API so fetch the same data with a bit
-    of light web scraping.
+    of light web scraping. A window of pages is fetched at once, and nothing past the first page
+    without results is scheduled.
     """
 
+    def __init__(
+        self,
+        workers: int = EVENTBRITE_SCRAPE_WORKERS,
+        requests_per_second: float = EVENTBRITE_REQUESTS_PER_SECOND,
+    ):
+        """Share one rate limited connection pool between the scraping workers."""
+        self.workers = workers
+        self.session = pooled_session(workers)
+        self.rate_limiter = RateLimiter(requests_per_second)
+
     def _fetch_page_content(self, page_id: int):
         """Perform a GET request for that page's events."""
         url = f"https://www.eventbrite.co.uk/d/united-kingdom/all-events/?page={page_id}"
-        response = http_request_with_backoff("get", url)
+        response = http_request_with_backoff(
+            "get",
+            url,
+            session=self.session,
+            rate_limiter=self.rate_limiter,
+        )
         if response.status_code != OK:
             raise APIError(f"The page {url} did not return the correct status.")
 
-        data = str(response.content)
-        return data
+        return response.content
 
-    def _check_for_results(self, page_content):
+    def _check_for_results(self, page_content: bytes):
         """
         Check to see if the page has run out of options.
 
@@ -71,65 +114,119 @@ class EventIDDownloader:
         number but the X is actually the number of events, not pages. Check for the text
         'Nothing matched your search, but you might like these options." to denote end of listings.
         """
-        if "Nothing matched your search, but you might like these options." in page_content:
+        if b"Nothing matched your search, but you might like these options." in page_content:
             return False
         return True
 
-    def _get_event_ids_from_page(self, page_content: str):
-        """Get event id's by web scraping."""
-        event_ids = []
-        links = re.findall(
-            'href="https:\/\/www\.eventbrite\.com\/e\/(.*?)"',  # noqa: W605
-            page_content,
-        )
-        links += re.findall(
-            'href="https:\/\/www\.eventbrite\.co.uk\/e\/(.*?)"',  # noqa: W605
-            page_content,
-        )
+    def _get_event_ids_from_page(self, page_content: bytes):
+        """Get event id's by web scraping, in one pass over the raw page."""
+        return list({int(event_id) for event_id in EVENT_LINK_PATTERN.findall(page_content)})
 
-        for link in links:
-            event_id = link.split("?")[0]
-            event_id = event_id.split("-")[-1]
-            event_ids.append(event_id)
-        event_ids = list(set(event_ids))
+    def _save_event_ids(self, event_ids: list):
+        """
+        Create any new event ID's and mark them all as seen now.
 
-        return event_ids
+        This is two queries however many ID's there are, new ID's are inserted and existing ones
+        skipped, then last_seen is set on all of them.
+        """
+        event_ids = [int(event_id) for event_id in event_ids]
+        EventBriteEventID.objects.bulk_create(
+            [EventBriteEventID(event_id=event_id) for event_id in event_ids],
+            ignore_conflicts=True,
+        )
+        EventBriteEventID.objects.filter(event_id__in=event_ids).update(last_seen=timezone.now())
 
     def get_event_ids(self):
         """Get and update all event ID's from the EventBrite site."""
         logging.info(f"Beginning EventBrite event ID download @ {timezone.now()}")
-
-        for page_number in range(1, 500):
-            page_content = self._fetch_page_content(page_number)
-
-            if not self._check_for_results(page_content):
-                logging.info(
-                    f"EventBrite event ID downloader ran out of pages on page {page_number}",
-                )
-                return True
-
-            event_ids = self._get_event_ids_from_page(page_content)
-            for event_id in event_ids:
-                event, _ = EventBriteEventID.objects.get_or_create(event_id=event_id)
-                event.last_seen = timezone.now()
-                event.save()
-            logging.info(f"EventBrite event ID downloader completed downloading page {page_number}")
-
+        start_time = time.monotonic()
+        pages_scraped = 0
+        ids_found = 0
+        # The first page found with no results, every page after it is empty too.
+        end_page = None
+        next_page = 1
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            while True:
+                while (
+                    len(futures) < self.workers
+                    and next_page < EVENTBRITE_SCRAPE_PAGE_LIMIT
+                    and (end_page is None or next_page < end_page)
+                ):
+                    futures[executor.submit(self._fetch_page_content, next_page)] = next_page
+                    next_page += 1
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_number = futures.pop(future)
+                    if end_page is not None and page_number > end_page:
+                        continue
+                    try:
+                        page_content = future.result()
+                    except APIError as e:
+                        # A failed page is skipped, the pages after it are still scraped.
+                        logging.error(f"Unable to scrape EventBrite page {page_number}, error {e}.")
+                        continue
+
+                    if not self._check_for_results(page_content):
+                        end_page = page_number
+                        for pending, pending_page in list(futures.items()):
+                            if pending_page > end_page and pending.cancel():
+                                del futures[pending]
+                        continue
+
+                    event_ids = self._get_event_ids_from_page(page_content)
+                    self._save_event_ids(event_ids)
+                    pages_scraped += 1
+                    ids_found += len(event_ids)
+                    logging.info(
+                        f"EventBrite event ID downloader completed downloading page {page_number}",
+                    )
+
+        elapsed = time.monotonic() - start_time
+        logging.info(
+            f"EventBrite event ID downloader scraped {pages_scraped} pages in {elapsed:.1f}s, "
+            f"{pages_scraped / elapsed if elapsed else 0:.2f} pages/s, "
+            f"{ids_found / pages_scraped if pages_scraped else 0:.1f} IDs/page",
+        )
+        if end_page is not None:
+            logging.info(f"EventBrite event ID downloader ran out of pages on page {end_page}")
         logging.info(f"Completed EventBrite event ID download @ {timezone.now()}")
         return True
 
 
 class EventRawDataDownloader:
-    """Download the raw data from the API endpoint."""
+    """
+    Download the raw data from the API endpoint.
 
-    def _get_event_data(self, event_id):
-        """Get an event from the API."""
-        url = (
-            f"https://www.eventbriteapi.com/v3/events/{event_id}/"
-            f"?expand=category,subcategory,venue,format,listing_properties,ticket_availability"
-            f"&token={settings.EVENTBRITE_API_KEY}"
+    Requests are made from a pool of worker threads over one pooled session, rate limited so the
+    API is not flooded. The responses are saved on the calling thread, so the workers never
+    touch the database.
+    """
+
+    def __init__(
+        self,
+        api_url: str = EVENTBRITE_API_URL,
+        workers: int = EVENTBRITE_DOWNLOAD_WORKERS,
+        requests_per_second: float = EVENTBRITE_REQUESTS_PER_SECOND,
+    ):
+        """Share one rate limited connection pool between the download workers."""
+        self.api_url = api_url
+        self.workers = workers
+        self.session = pooled_session(workers)
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+    def _get_api_json(self, url):
+        """Get a URL from the API over the pooled session, and return the loaded JSON."""
+        response = http_request_with_backoff(
+            "get",
+            url,
+            session=self.session,
+            rate_limiter=self.rate_limiter,
         )
-        response = http_request_with_backoff("get", url)
         if response.status_code != OK:
             raise APIError(
                 f"The API did not return a correct response. "
@@ -137,30 +234,97 @@ class EventRawDataDownloader:
             )
         return json.loads(response.content)
 
+    def _get_event_data(self, event_id):
+        """Get an event from the API."""
+        return self._get_api_json(
+            f"{self.api_url}/events/{event_id}/"
+            f"?expand=category,subcategory,venue,format,listing_properties,ticket_availability"
+            f"&token={settings.EVENTBRITE_API_KEY}",
+        )
+
+    def _get_event_description(self, event_id):
+        """Get an event's full HTML description from the API."""
+        return self._get_api_json(
+            f"{self.api_url}/events/{event_id}/description/?token={settings.EVENTBRITE_API_KEY}",
+        )["description"]
+
+    def _download_event(self, event_id):
+        """Get an event and its description, this runs on the worker threads."""
+        return self._get_event_data(event_id), self._get_event_description(event_id)
+
     def get_recently_seen_events(self):
         """Get all the recently seen events."""
         all_events = EventBriteEventID.objects.filter(
             last_seen__gt=timezone.now() - timedelta(hours=EVENTBRITE_DOWNLOAD_FREQUENCY_HOURS),
         )
-        for event_id in all_events:
-            try:
-                event_data = self._get_event_data(event_id.event_id)
+        content_hashes = dict(
+            EventBriteRawEventData.objects.filter(event_id__in=all_events).values_list(
+                "event_id",
+                "content_hash",
+            ),
+        )
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self._download_event, event_id.event_id): event_id
+                for event_id in all_events
+            }
+            for future in as_completed(futures):
+                event_id = futures[future]
                 try:
-                    raw_data = EventBriteRawEventData.objects.get(event_id=event_id)
-                except EventBriteRawEventData.DoesNotExist:
-                    raw_data = EventBriteRawEventData(event_id=event_id)
-                raw_data.data = event_data
-                raw_data.save()
-            except APIError:
-                continue
+                    event_data, description = future.result()
+                except (APIError, KeyError):
+                    continue
+                content_hash = EventBriteRawEventData.hash_content(event_data, description)
+                if event_id.event_id not in content_hashes:
+                    EventBriteRawEventData.objects.create(
+                        event_id=event_id,
+                        data=event_data,
+                        description=description,
+                        content_hash=content_hash,
+                    )
+                elif content_hashes[event_id.event_id] != content_hash:
+                    EventBriteRawEventData.objects.filter(event_id=event_id).update(
+                        data=event_data,
+                        description=description,
+                        content_hash=content_hash,
+                    )
 
 
 class EventBriteEventParser:
-    """Turn Raw EventBrite data into events."""
+    """
+    Turn Raw EventBrite data into events.
+
+    A parser is used for one run. Objects shared between events, the API user, the category
+    filters, venues and places, are looked up once per run or per batch and kept on the parser.
+    Each event's new image and place are linked to it in bulk at the end of its batch.
+    """
 
     def __init__(self):
         """Create a gmaps client."""
         self.gmaps_client = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY)
+        self.venues_by_key = {}
+        self.places_by_gmaps_id = {}
+        self.event_links = []
+
+    @cached_property
+    def api_user(self):
+        """The integrations user, fetched once per run."""
+        return get_or_create_api_user()
+
+    @cached_property
+    def category_filters(self):
+        """The filters for each EventBrite category ID and each subcategory ID."""
+        category_filters = {}
+        subcategory_filters = {}
+        for cat_data in EVENTBRITE_CATEGORY_MAPPING.values():
+            category_filters.setdefault(cat_data["id"], {}).update(
+                {our_filter: True for our_filter in cat_data["our_filters"]},
+            )
+            for subcat_data in cat_data["subcategories"]:
+                subcategory_filters.setdefault(subcat_data["id"], {}).update(
+                    {our_filter: True for our_filter in subcat_data["our_filters"]},
+                )
+        return category_filters, subcategory_filters
 
     def _has_event_changed(self, event: Event, raw_data: EventBriteRawEventData):
         """Has the event changed compared to the last time we looked."""
@@ -182,18 +346,12 @@ class EventBriteEventParser:
 
     def _determine_filters(self, raw_data: EventBriteRawEventData):
         """Figure out which filters apply based on the filter mapping."""
+        category_filters, subcategory_filters = self.category_filters
         filters = {}
-
-        for _, cat_data in EVENTBRITE_CATEGORY_MAPPING.items():
-            if raw_data.data["category_id"]:
-                if cat_data["id"] == raw_data.data["category_id"]:
-                    filters |= {our_filter: True for our_filter in cat_data["our_filters"]}
-
-            if raw_data.data["subcategory_id"]:
-                for subcat_data in cat_data["subcategories"]:
-                    if subcat_data["id"] == raw_data.data["subcategory_id"]:
-                        filters |= {our_filter: True for our_filter in subcat_data["our_filters"]}
-
+        if raw_data.data["category_id"]:
+            filters |= category_filters.get(raw_data.data["category_id"], {})
+        if raw_data.data["subcategory_id"]:
+            filters |= subcategory_filters.get(raw_data.data["subcategory_id"], {})
         return filters
 
     def _build_photo_from_gmaps_data(self, image: SearchImage, gmaps_data: dict, place: Place):
@@ -202,7 +360,10 @@ class EventBriteEventParser:
 
         Save the emage as a SearchImage.
         """
-        img_data = self.gmaps_client.places_photo(gmaps_data["photo_reference"], max_width=10000)
+        img_data = self.gmaps_client.places_photo(
+            gmaps_data["photo_reference"],
+            max_width=GOOGLE_MAPS_PHOTO_MAX_WIDTH,
+        )
         temp_image = NamedTemporaryFile()
         for block in img_data:
             # If no more file then stop
@@ -210,46 +371,132 @@ class EventBriteEventParser:
                 break
             # Write image block to temporary file
             temp_image.write(block)
-        image.uploaded_by = get_or_create_api_user()
+        image.uploaded_by = self.api_user
         image.alt_text = place.headline
         image.uploaded_image.save(f"{gmaps_data['photo_reference']}.jpeg", temp_image)
         image.save()
 
-    def _build_place(self, event: Event, raw_data: EventBriteRawEventData):
+    def _venue_cache_key(self, venue: dict):
         """
-        Build the associated place using the Google maps API.
+        Key venues by their EventBrite ID, or failing that their name and rough location.
+
+        Online events have no venue, so raise a ValueError for them like any other unusable event.
+        """
+        if not isinstance(venue, dict):
+            raise ValueError("The event has no venue")
+        if venue.get("id"):
+            return f"eventbrite:{venue['id']}"
+        return "|".join(
+            [
+                " ".join(venue["name"].lower().split()),
+                f"{float(venue['address']['latitude']):.{GOOGLE_MAPS_VENUE_DECIMAL_PLACES}f}",
+                f"{float(venue['address']['longitude']):.{GOOGLE_MAPS_VENUE_DECIMAL_PLACES}f}",
+            ],
+        )
+
+    def _venue_cache_cutoff(self):
+        """Venues resolved before this are too old to be trusted."""
+        return timezone.now() - timedelta(days=GOOGLE_MAPS_VENUE_CACHE_DAYS)
+
+    def _fresh_venues(self):
+        """Venues resolved recently enough to be trusted."""
+        return GoogleMapsVenue.objects.filter(resolved_at__gt=self._venue_cache_cutoff())
+
+    def _prefetch_places(self, raw_datasets: list):
+        """
+        Look up the cached venues of a batch of events, and their places, in two queries.
+
+        Venues kept from earlier batches are dropped once they are too old to be trusted.
+        """
+        cutoff = self._venue_cache_cutoff()
+        self.venues_by_key = {
+            venue_key: venue
+            for venue_key, venue in self.venues_by_key.items()
+            if venue.resolved_at > cutoff
+        }
+        venue_keys = set()
+        for raw_data in raw_datasets:
+            try:
+                venue_keys.add(self._venue_cache_key(raw_data.data["venue"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        venue_keys -= set(self.venues_by_key)
+        if not venue_keys:
+            return
+
+        venues = list(self._fresh_venues().filter(venue_key__in=venue_keys))
+        self.venues_by_key |= {venue.venue_key: venue for venue in venues}
+        place_ids = {venue.place_id for venue in venues} - set(self.places_by_gmaps_id)
+        if place_ids:
+            places = Place.objects.filter(google_maps_place_id__in=place_ids)
+            for place in places.prefetch_related("images"):
+                self.places_by_gmaps_id.setdefault(place.google_maps_place_id, place)
+
+    def _resolve_venue(self, raw_data: EventBriteRawEventData):
+        """
+        Find the Google Maps place for the event's venue, from the cache if possible.
+
+        Only venues read back from the cache are kept on the parser, and only while they are fresh,
+        so a venue is resolved again once it expires, however long the run.
 
         This is not guaranteed to work 100% of the time, but we'll follow this process:
         1. Get the venue name and try and find it using the Places API.
         2. We're provided with the lat and long, so check that we've got the right place.
         """
-        search_point = (
-            raw_data.data["venue"]["address"]["latitude"],
-            raw_data.data["venue"]["address"]["longitude"],
-        )
+        venue = raw_data.data["venue"]
+        venue_key = self._venue_cache_key(venue)
+        known_venue = self.venues_by_key.get(venue_key)
+        if known_venue is not None and known_venue.resolved_at > self._venue_cache_cutoff():
+            return known_venue
+        cached_venue = self._fresh_venues().filter(venue_key=venue_key).first()
+        if cached_venue:
+            self.venues_by_key[venue_key] = cached_venue
+            return cached_venue
+
+        search_point = (venue["address"]["latitude"], venue["address"]["longitude"])
         radius = 1000  # Meters, I think...
         gmaps_places = self.gmaps_client.places(
-            raw_data.data["venue"]["name"],
+            venue["name"],
             location=search_point,
             radius=radius,
         )
         if len(gmaps_places["results"]) == 0:
             raise ValueError(
-                f"Unable to find a matching Google Maps place for {raw_data.data['venue']['name']}",
+                f"Unable to find a matching Google Maps place for {venue['name']}",
             )
 
         gmaps_place = gmaps_places["results"][0]
+        photos = gmaps_place.get("photos") or []
+        google_maps_venue, _ = GoogleMapsVenue.objects.update_or_create(
+            venue_key=venue_key,
+            defaults={
+                "place_id": gmaps_place["place_id"],
+                "place_data": gmaps_place,
+                "photo_reference": photos[0]["photo_reference"] if photos else "",
+                "resolved_at": timezone.now(),
+            },
+        )
+        return google_maps_venue
+
+    def _build_place(self, event: Event, raw_data: EventBriteRawEventData):
+        """
+        Build the associated place from the venue's Google Maps place.
+
+        The photo is only downloaded for places that don't have an image yet. Chunks are parsed
+        concurrently, so a place created by another chunk since the lookup is updated instead.
+        """
+        google_maps_venue = self._resolve_venue(raw_data)
+        gmaps_place = google_maps_venue.place_data
         # Do we already have a place? If so, use it but update it anyway.
-        existing_places = Place.objects.filter(google_maps_place_id=gmaps_place["place_id"])
-        if len(existing_places) > 0:
-            mmm_place = existing_places[0]
-            image = mmm_place.images.first()
-            if not image:
-                image = SearchImage()
+        mmm_place = self.places_by_gmaps_id.get(gmaps_place["place_id"])
+        if mmm_place is None:
+            mmm_place = Place.objects.filter(google_maps_place_id=gmaps_place["place_id"]).first()
+        if mmm_place is not None:
+            image = mmm_place.primary_image
             new_place = False
         else:
             mmm_place = Place()
-            image = SearchImage()
+            image = None
             new_place = True
 
         # Update place data
@@ -267,7 +514,7 @@ class EventBriteEventParser:
             mmm_place.google_maps_place_id = gmaps_place["place_id"]
             mmm_place.location_lat = gmaps_place["geometry"]["location"]["lat"]
             mmm_place.location_long = gmaps_place["geometry"]["location"]["lng"]
-            mmm_place.created_by = get_or_create_api_user()
+            mmm_place.created_by = self.api_user
             if not mmm_place.attributes:
                 mmm_place.attributes = {}
         mmm_place.attributes = (
@@ -280,26 +527,36 @@ class EventBriteEventParser:
             }
             | event.attributes
         )
-        mmm_place.save()
-        if len(gmaps_place["photos"]) > 0:
-            self._build_photo_from_gmaps_data(image, gmaps_place["photos"][0], mmm_place)
+        try:
+            with transaction.atomic():
+                mmm_place.save()
+        except IntegrityError:
+            if not new_place:
+                raise
+            # Another chunk created the place since it was looked up, so update that one instead.
+            created_place = mmm_place
+            mmm_place = Place.objects.get(google_maps_place_id=gmaps_place["place_id"])
+            mmm_place.attributes = (mmm_place.attributes or {}) | created_place.attributes
+            mmm_place.save()
+            image = mmm_place.primary_image
+        self.places_by_gmaps_id[gmaps_place["place_id"]] = mmm_place
+        if image is None and google_maps_venue.photo_reference:
+            image = SearchImage()
+            self._build_photo_from_gmaps_data(
+                image,
+                {"photo_reference": google_maps_venue.photo_reference},
+                mmm_place,
+            )
             mmm_place.images.add(image)
         return mmm_place
 
-    def _update_description(self, event, event_id):
-        """The description is a separate API call. This is untrusted HTML, so bleach it."""
-        url = (
-            f"https://www.eventbriteapi.com/v3/events/{event_id}/"
-            f"description/?token={settings.EVENTBRITE_API_KEY}"
-        )
-        response = http_request_with_backoff("get", url)
-        if response.status_code != OK:
-            raise ValueError(
-                f"Unable to update description. Response code="
-                f"{response.status_code}, error={response.content}",
-            )
-        data = json.loads(response.content)
-        description = data["description"]
+    def _update_description(self, event, raw_data: EventBriteRawEventData):
+        """
+        Set the downloaded description on the event. This is untrusted HTML, so bleach it.
+
+        Raw data downloaded before descriptions were stored falls back to the event summary.
+        """
+        description = raw_data.description or raw_data.data["description"]["html"]
         description = bleach.clean(
             description,
             tags=BLEACH_ALLOWED_TAGS,
@@ -312,7 +569,7 @@ class EventBriteEventParser:
         event.last_updated = timezone.now()
         event.approved_by = None
         event.approval_timestamp = None
-        event.created_by = get_or_create_api_user()
+        event.created_by = self.api_user
 
         # Update the stuff that we need, or else fail with log.
         try:
@@ -345,43 +602,110 @@ class EventBriteEventParser:
             new_image = SearchImage(
                 link_url=raw_data.data["logo"]["original"]["url"],
                 alt_text=raw_data.data["name"]["text"],
-                uploaded_by=get_or_create_api_user(),
+                uploaded_by=self.api_user,
             )
-            self._update_description(event, raw_data.event_id.event_id)
-            new_image.save()
+            self._update_description(event, raw_data)
             place = self._build_place(event, raw_data)
             event.save()
-            event.images.add(new_image)
-            event.places.add(place)
+            self.event_links.append((event, new_image, place))
+            return True
         except (KeyError, ValueError, TypeError, IntegrityError, TransportError) as e:
             logging.error(
                 f"Unable to create a new event for id {raw_data.event_id.event_id}, error {e}.",
             )
             return False
 
-    def process_data(self):
-        """Process the latest EventBrite data into actual events."""
-        all_events = EventBriteEventID.objects.filter(
-            last_seen__gt=timezone.now() - timedelta(hours=EVENTBRITE_DOWNLOAD_FREQUENCY_HOURS),
-        )
-        for event_id in all_events:
+    def _write_event_links(self):
+        """
+        Save the new images of the batch's events, link them and their places to the events.
 
-            try:
-                event_raw_data = EventBriteRawEventData.objects.get(event_id=event_id)
-            except EventBriteRawEventData.DoesNotExist:
-                continue
+        The links are bulk created, which sends no m2m signals, so each event's search document is
+        rebuilt once here rather than once for every link.
+        """
+        if not self.event_links:
+            return
+        SearchImage.objects.bulk_create([image for _event, image, _place in self.event_links])
+        Event.images.through.objects.bulk_create(
+            [
+                Event.images.through(event_id=event.id, searchimage_id=image.id)
+                for event, image, _place in self.event_links
+            ],
+            ignore_conflicts=True,
+        )
+        Event.places.through.objects.bulk_create(
+            [
+                Event.places.through(event_id=event.id, place_id=place.id)
+                for event, _image, place in self.event_links
+            ],
+            ignore_conflicts=True,
+        )
+        event_ids = [event.id for event, _image, _place in self.event_links]
+        for event in Event.objects.filter(id__in=event_ids).prefetch_related("images", "places"):
+            SearchDocument.update_for_entity(event)
+        transaction.on_commit(bump_search_version)
+        self.event_links = []
+
+    def _mark_parsed(self, raw_datasets: list):
+        """Record that the current content of each raw data has been parsed, in one query."""
+        for raw_data in raw_datasets:
+            raw_data.parsed_hash = raw_data.content_hash
+        EventBriteRawEventData.objects.bulk_update(raw_datasets, ["parsed_hash"])
+
+    def _raw_data_to_parse(self):
+        """Raw data for recently seen events whose content changed since it was last parsed."""
+        return EventBriteRawEventData.objects.filter(
+            event_id__last_seen__gt=timezone.now()
+            - timedelta(hours=EVENTBRITE_DOWNLOAD_FREQUENCY_HOURS),
+        ).exclude(parsed_hash=F("content_hash"))
+
+    def get_raw_data_ids_to_parse(self):
+        """The ID's of the raw data that process_data would parse, to split between tasks."""
+        raw_data_ids = self._raw_data_to_parse().values_list("id", flat=True)
+        return [str(raw_data_id) for raw_data_id in raw_data_ids]
+
+    def process_data(self, raw_data_ids: list = None):
+        """
+        Process the latest EventBrite data into actual events.
 
-            try:
-                event = Event.objects.get(attributes__eventbrite_event_id=event_id.event_id)
-                if not self._has_event_changed(event, event_raw_data):
+        Only raw data whose content has changed since it was last parsed successfully is
+        processed, limited to raw_data_ids if given. Raw data is fetched in batches along with each
+        event, through its EventBrite ID link, and the batch's venues and places. New events are
+        linked to their EventBrite IDs, and raw data is marked as parsed, in bulk once the batch's
+        links are written. Returns the number of events parsed, unchanged and failed.
+        """
+        totals = {"parsed": 0, "unchanged": 0, "failed": 0}
+        if raw_data_ids is None:
+            raw_data_ids = self.get_raw_data_ids_to_parse()
+
+        for start in range(0, len(raw_data_ids), EVENTBRITE_PARSE_CHUNK_SIZE):
+            end = start + EVENTBRITE_PARSE_CHUNK_SIZE
+            batch = list(
+                self._raw_data_to_parse()
+                .filter(id__in=raw_data_ids[start:end])
+                .select_related("event_id__search_event"),
+            )
+            self._prefetch_places(batch)
+            unchanged, parsed, linked_event_ids = [], [], []
+            for event_raw_data in batch:
+                event_id = event_raw_data.event_id
+                event = event_id.search_event
+                if event is None:
+                    event = Event()
+                elif not self._has_event_changed(event, event_raw_data):
+                    unchanged.append(event_raw_data)
                     continue
-            except Event.DoesNotExist:
-                event = Event()
-            except Event.MultipleObjectsReturned:
-                event = Event.objects.filter(
-                    attributes__eventbrite_event_id=event_id.event_id,
-                ).first()
-                event.delete()
-                continue
 
-            self._populate_event(event, event_raw_data)
+                if self._populate_event(event, event_raw_data):
+                    if event_id.search_event_id != event.id:
+                        event_id.search_event = event
+                        linked_event_ids.append(event_id)
+                    parsed.append(event_raw_data)
+                else:
+                    totals["failed"] += 1
+
+            EventBriteEventID.objects.bulk_update(linked_event_ids, ["search_event"])
+            self._write_event_links()
+            self._mark_parsed(unchanged + parsed)
+            totals["unchanged"] += len(unchanged)
+            totals["parsed"] += len(parsed)
+        return totals
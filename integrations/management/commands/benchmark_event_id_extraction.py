@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Benchmark extracting event ID's from saved EventBrite listing pages."""
+
+# Standard Library
+import json
+import pathlib
+import statistics
+import time
+
+# 3rd-party
+from django.core.management.base import BaseCommand
+
+# Project
+from integrations.eventbrite import EventIDDownloader
+
+SAMPLE_PAGE = (
+    pathlib.Path(__file__).parents[2] / "tests" / "mock_api_data" / "eventbrite_results_page.txt"
+)
+
+
+class Command(BaseCommand):
+    """Time EventIDDownloader._get_event_ids_from_page against saved listing pages."""
+
+    help = "Time event ID extraction against saved EventBrite listing pages."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument("pages", nargs="*", default=[str(SAMPLE_PAGE)])
+        parser.add_argument("--repeats", type=int, default=200)
+
+    def handle(self, *args, **options):  # noqa: D102
+        downloader = EventIDDownloader(workers=1)
+        results = {}
+        for page in options["pages"]:
+            with open(page, "rb") as page_file:
+                page_content = page_file.read()
+            timings = []
+            for _ in range(options["repeats"]):
+                start = time.perf_counter()
+                event_ids = downloader._get_event_ids_from_page(page_content)
+                timings.append((time.perf_counter() - start) * 1000000)
+            results[page] = {
+                "page_bytes": len(page_content),
+                "event_ids": len(event_ids),
+                "median_us": round(statistics.median(timings), 1),
+                "min_us": round(min(timings), 1),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.4 on 2026-10-17 09:12
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0003_alter_eventbriteeventid_first_fetched_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventbriteraweventdata",
+            name="description",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
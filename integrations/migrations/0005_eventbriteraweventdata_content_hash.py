@@ -0,0 +1,25 @@
+# Generated by Django 4.0.4 on 2026-10-17 10:03
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0004_eventbriteraweventdata_description"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventbriteraweventdata",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="eventbriteraweventdata",
+            name="parsed_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.0.4 on 2026-10-17 10:41
+
+# 3rd-party
+import django.db.models.deletion
+from django.db import migrations
+from django.db import models
+
+
+def link_events(apps, schema_editor):
+    """
+    Link each EventBrite ID to the event that was created from it.
+
+    Events were matched by the eventbrite_event_id attribute, and duplicates were deleted as they
+    were found. Keep the most recently updated event for each ID and delete the rest.
+    """
+    event_model = apps.get_model("search", "Event")
+    search_document_model = apps.get_model("search", "SearchDocument")
+    eventbrite_event_id_model = apps.get_model("integrations", "EventBriteEventID")
+
+    events = {}
+    duplicates = []
+    for event_id, eventbrite_event_id in (
+        event_model.objects.filter(attributes__has_key="eventbrite_event_id")
+        .order_by("-last_updated")
+        .values_list("id", "attributes__eventbrite_event_id")
+        .iterator()
+    ):
+        if eventbrite_event_id in events:
+            duplicates.append(event_id)
+        else:
+            events[eventbrite_event_id] = event_id
+
+    search_document_model.objects.filter(id__in=duplicates).delete()
+    event_model.objects.filter(id__in=duplicates).delete()
+
+    eventbrite_event_ids = []
+    for eventbrite_event_id in eventbrite_event_id_model.objects.filter(
+        event_id__in=[int(event_id) for event_id in events if event_id.isdigit()],
+    ).iterator():
+        eventbrite_event_id.search_event_id = events[str(eventbrite_event_id.event_id)]
+        eventbrite_event_ids.append(eventbrite_event_id)
+    eventbrite_event_id_model.objects.bulk_update(
+        eventbrite_event_ids,
+        ["search_event"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0012_searchdocument"),
+        ("integrations", "0005_eventbriteraweventdata_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventbriteeventid",
+            name="search_event",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="eventbrite_event",
+                to="search.event",
+            ),
+        ),
+        migrations.RunPython(link_events, migrations.RunPython.noop),
+    ]
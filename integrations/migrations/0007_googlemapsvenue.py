@@ -0,0 +1,28 @@
+# Generated by Django 4.0.4 on 2026-10-17 11:26
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0006_eventbriteeventid_search_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GoogleMapsVenue",
+            fields=[
+                (
+                    "venue_key",
+                    models.CharField(max_length=512, primary_key=True, serialize=False),
+                ),
+                ("place_id", models.CharField(max_length=1024)),
+                ("place_data", models.JSONField()),
+                ("photo_reference", models.CharField(blank=True, default="", max_length=1024)),
+                ("resolved_at", models.DateTimeField()),
+            ],
+        ),
+    ]
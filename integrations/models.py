@@ -2,11 +2,16 @@
 """Third party integrations models."""
 
 # Standard Library
+import hashlib
+import json
 import uuid
 
 # 3rd-party
 from django.db import models
 
+# Project
+from search.models import Event
+
 
 class EventBriteEventID(models.Model):
     """
@@ -19,6 +24,13 @@ class EventBriteEventID(models.Model):
     first_fetched = models.DateTimeField(auto_now_add=True)
     last_seen = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(null=True, blank=True)
+    search_event = models.OneToOneField(
+        Event,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="eventbrite_event",
+    )
 
 
 class EventBriteRawEventData(models.Model):
@@ -27,3 +39,31 @@ class EventBriteRawEventData(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     event_id = models.ForeignKey(EventBriteEventID, on_delete=models.CASCADE)
     data = models.JSONField()
+    # The full HTML description is a separate endpoint, it is downloaded alongside the data so
+    # that parsing never needs the API.
+    description = models.TextField(blank=True, default="")
+    # A hash of the data and description when they were downloaded, and of the content the event
+    # was last successfully parsed from, so that only changed events are written and parsed.
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    parsed_hash = models.CharField(max_length=64, null=True, blank=True)
+
+    @staticmethod
+    def hash_content(data: dict, description: str):
+        """A stable hash of downloaded event data and description."""
+        content = json.dumps(data, sort_keys=True, separators=(",", ":")) + description
+        return hashlib.sha256(content.encode()).hexdigest()
+
+
+class GoogleMapsVenue(models.Model):
+    """
+    An EventBrite venue resolved to a Google Maps place.
+
+    Many events share a venue, so the Places API is only asked about each venue once every
+    GOOGLE_MAPS_VENUE_CACHE_DAYS.
+    """
+
+    venue_key = models.CharField(max_length=512, primary_key=True)
+    place_id = models.CharField(max_length=1024)
+    place_data = models.JSONField()
+    photo_reference = models.CharField(max_length=1024, blank=True, default="")
+    resolved_at = models.DateTimeField()
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 """Integrations tasks."""
+# Standard Library
+import logging
+
 # 3rd-party
+from celery import chain
+from celery import chord
 from celery import shared_task
 
 # Project
+from integrations.constants import EVENTBRITE_PARSE_CHUNK_SIZE
 from integrations.eventbrite import EventBriteEventParser
 from integrations.eventbrite import EventIDDownloader
 from integrations.eventbrite import EventRawDataDownloader
@@ -23,19 +29,46 @@ def get_eventbrite_raw_event_data():
     downloader.get_recently_seen_events()
 
 
-@shared_task(time_limit=1200)
+@shared_task(time_limit=1200, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def parse_eventbrite_chunk(raw_data_ids):
+    """
+    Async task to turn one chunk of eventbrite data into events.
+
+    Raw data is marked as it is parsed, so a retry only parses what the failed attempt didn't.
+    """
+    parser = EventBriteEventParser()
+    return parser.process_data(raw_data_ids)
+
+
+@shared_task
+def record_eventbrite_parse_totals(chunk_totals):
+    """Add up the totals from every parsed chunk."""
+    totals = {"parsed": 0, "unchanged": 0, "failed": 0}
+    for chunk in chunk_totals:
+        for key, value in chunk.items():
+            totals[key] += value
+    logging.info(f"Completed EventBrite parse of {len(chunk_totals)} chunks: {totals}")
+    return totals
+
+
+@shared_task
 def parse_eventbrite_data_into_events():
-    """Async task to turn eventbrite data into actual events."""
-    downloader = EventBriteEventParser()
-    downloader.process_data()
+    """Async task to turn eventbrite data into actual events, in chunks across the workers."""
+    raw_data_ids = EventBriteEventParser().get_raw_data_ids_to_parse()
+    chunks = []
+    for start in range(0, len(raw_data_ids), EVENTBRITE_PARSE_CHUNK_SIZE):
+        end = start + EVENTBRITE_PARSE_CHUNK_SIZE
+        chunks.append(raw_data_ids[start:end])
+    if not chunks:
+        return
+    chord(parse_eventbrite_chunk.s(chunk) for chunk in chunks)(record_eventbrite_parse_totals.s())
 
 
-@shared_task(time_limit=4800)
+@shared_task
 def eventbrite_full_download():
-    """Perform a full download loop for EventBrite."""
-    downloader = EventIDDownloader()
-    downloader.get_event_ids()
-    downloader = EventRawDataDownloader()
-    downloader.get_recently_seen_events()
-    downloader = EventBriteEventParser()
-    downloader.process_data()
+    """Perform a full download loop for EventBrite, each stage starting when the last ends."""
+    chain(
+        get_eventbrite_event_ids.si(),
+        get_eventbrite_raw_event_data.si(),
+        parse_eventbrite_data_into_events.si(),
+    ).delay()
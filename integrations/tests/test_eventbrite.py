@@ -5,9 +5,12 @@
 import datetime
 import json
 import pathlib
+import threading
 from datetime import timedelta
 from http.client import NOT_FOUND
 from http.client import OK
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from unittest.mock import MagicMock
 from unittest.mock import call
 from unittest.mock import patch
@@ -15,12 +18,17 @@ from unittest.mock import patch
 # 3rd-party
 import pytz
 from django.conf import settings
+from django.db import IntegrityError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 # Project
 from integrations.constants import BLEACH_ALLOWED_ATTRIBUTES
 from integrations.constants import BLEACH_ALLOWED_TAGS
+from integrations.constants import GOOGLE_MAPS_PHOTO_MAX_WIDTH
+from integrations.constants import GOOGLE_MAPS_VENUE_CACHE_DAYS
 from integrations.eventbrite import EventBriteEventParser
 from integrations.eventbrite import EventIDDownloader
 from integrations.eventbrite import EventRawDataDownloader
@@ -28,11 +36,13 @@ from integrations.eventbrite import get_or_create_api_user
 from integrations.exceptions import APIError
 from integrations.models import EventBriteEventID
 from integrations.models import EventBriteRawEventData
+from integrations.models import GoogleMapsVenue
 from integrations.tests.factories import EventBriteEventIDFactory
 from integrations.tests.factories import EventBriteRawEventDataFactory
 from search.constants import SEARCH_ENTITY_SOURCES
 from search.models import Event
 from search.models import Place
+from search.models import SearchDocument
 from search.models import SearchImage
 from search.tests.factories import EventFactory
 from search.tests.factories import PlaceFactory
@@ -40,6 +50,16 @@ from search.tests.factories import SearchImageFactory
 from users.models import CustomUser
 
 
+def save_complete_event(event: Event, raw_data: EventBriteRawEventData):
+    """Stand in for _populate_event, saving the event with complete factory data."""
+    complete_event = EventFactory.build(created_by=get_or_create_api_user())
+    for field in Event._meta.concrete_fields:
+        if not field.primary_key:
+            setattr(event, field.attname, getattr(complete_event, field.attname))
+    event.save()
+    return True
+
+
 class TestGetOrCreateAPIUser(TestCase):
     """Tests for the get_or_create_api_user function."""
 
@@ -99,6 +119,8 @@ class TestEventIDDownloader(TestCase):
         mock_backoff.assert_called_once_with(
             "get",
             "https://www.eventbrite.co.uk/d/united-kingdom/all-events/?page=1",
+            session=self.downloader.session,
+            rate_limiter=self.downloader.rate_limiter,
         )
 
     @patch("integrations.eventbrite.http_request_with_backoff")
@@ -111,24 +133,24 @@ class TestEventIDDownloader(TestCase):
         assert f"The page {url} did not return the correct status." in str(e.exception)
 
     @patch("integrations.eventbrite.http_request_with_backoff")
-    def test__fetch_page_content_returns_stringified_page_content(self, mock_backoff):
-        """The function should return the response data as a string."""
+    def test__fetch_page_content_returns_raw_page_content(self, mock_backoff):
+        """The function should return the response data as bytes, without copying it."""
         mock_backoff.return_value = MagicMock(status_code=OK, content=b"Hey!")
         response = self.downloader._fetch_page_content(1)
-        assert response == "b'Hey!'"
+        assert response == b"Hey!"
 
     def test__check_for_results_returns_false_if_string_match_found_in_page_content(self):
         """The function should return false if the no more results text is found in the page."""
         assert (
             self.downloader._check_for_results(
-                "Nothing matched your search, but you might like these options.",
+                b"Nothing matched your search, but you might like these options.",
             )
             is False
         )
 
     def test__check_for_results_returns_true_if_string_match_not_found_in_page_content(self):
         """The function should return true if the not more results text is not found in the page."""
-        assert self.downloader._check_for_results("Loads of results!") is True
+        assert self.downloader._check_for_results(b"Loads of results!") is True
 
     def test_functional_eventbrite_actually_shows_the_right_text(self):
         """
@@ -137,24 +159,34 @@ class TestEventIDDownloader(TestCase):
         Actually call the page and make sure they haven't changed it.
         """
         response = self.downloader._fetch_page_content(5000)
-        assert "Nothing matched your search, but you might like these options." in response
+        assert b"Nothing matched your search, but you might like these options." in response
 
     def test__get_event_ids_from_page_gets_the_correct_ids(self):
         """The function should get the correct event ID's from the page content."""
         file = pathlib.Path(__file__).parent.resolve()
-        with open(f"{file}/mock_api_data/eventbrite_results_page.txt", "r") as sample_page:
+        with open(f"{file}/mock_api_data/eventbrite_results_page.txt", "rb") as sample_page:
             event_ids = self.downloader._get_event_ids_from_page(sample_page.read())
 
-            for exp_id in self.expected_ids:
-                assert exp_id in event_ids
+        assert sorted(event_ids) == sorted(int(exp_id) for exp_id in self.expected_ids)
+
+    def test__get_event_ids_from_page_matches_both_domains(self):
+        """Links on either domain, with or without a name or query string, should be found."""
+        page_content = (
+            b'<a href="https://www.eventbrite.com/e/a-gig-123?aff=ebdssbdestsearch">'
+            b'<a href="https://www.eventbrite.co.uk/e/456">'
+            b'<a href="https://www.eventbrite.co.uk/e/a-gig-123">'
+            b'<a href="https://www.eventbrite.co.uk/d/united-kingdom/all-events/">'
+        )
+        assert sorted(self.downloader._get_event_ids_from_page(page_content)) == [123, 456]
 
     def test_get_event_ids_loops_through_pages_until_no_more_results(self):
         """Function should loop through results until there are no more."""
-        self.downloader._fetch_page_content = MagicMock(return_value="Test Data")
-        self.downloader._check_for_results = MagicMock(side_effect=[True, True, True, False])
-        response = self.downloader.get_event_ids()
+        downloader = EventIDDownloader(workers=1)
+        downloader._fetch_page_content = MagicMock(return_value=b"Test Data")
+        downloader._check_for_results = MagicMock(side_effect=[True, True, True, False])
+        response = downloader.get_event_ids()
         assert response is True
-        self.downloader._fetch_page_content.assert_has_calls(
+        downloader._fetch_page_content.assert_has_calls(
             [
                 call(1),
                 call(2),
@@ -162,28 +194,79 @@ class TestEventIDDownloader(TestCase):
                 call(4),
             ],
         )
-        assert self.downloader._fetch_page_content.call_count == 4
+        assert downloader._fetch_page_content.call_count == 4
+
+    def test_get_event_ids_stops_scheduling_pages_after_the_last_page(self):
+        """Pages are fetched concurrently, but nothing past the end of the results is used."""
+        end_page_content = b"Nothing matched your search, but you might like these options."
+        downloader = EventIDDownloader(workers=4)
+        downloader._fetch_page_content = MagicMock(
+            side_effect=lambda page: f"page {page}".encode() if page < 10 else end_page_content,
+        )
+        downloader._get_event_ids_from_page = MagicMock(
+            side_effect=lambda page_content: [page_content.split()[-1]],
+        )
+        assert downloader.get_event_ids() is True
+
+        fetched_pages = [args[0] for args, _kwargs in downloader._fetch_page_content.call_args_list]
+        assert set(range(1, 10)) <= set(fetched_pages)
+        assert max(fetched_pages) < 10 + downloader.workers
+        assert set(EventBriteEventID.objects.values_list("event_id", flat=True)) == set(
+            range(1, 10),
+        )
+
+    def test_get_event_ids_skips_pages_that_fail(self):
+        """An APIError for one page should not stop the other pages being saved."""
+        end_page_content = b"Nothing matched your search, but you might like these options."
+
+        def fetch_page_content(page):
+            if page == 2:
+                raise APIError("Nope")
+            return f"page {page}".encode() if page < 4 else end_page_content
+
+        downloader = EventIDDownloader(workers=1)
+        downloader._fetch_page_content = MagicMock(side_effect=fetch_page_content)
+        downloader._get_event_ids_from_page = MagicMock(
+            side_effect=lambda page_content: [page_content.split()[-1]],
+        )
+        assert downloader.get_event_ids() is True
+        assert set(EventBriteEventID.objects.values_list("event_id", flat=True)) == {1, 3}
 
     def test_get_event_ids_saves_event_ids_to_db(self):
         """Function should save the event ID's to the DB."""
         assert EventBriteEventID.objects.count() == 0
+        downloader = EventIDDownloader(workers=1)
         file = pathlib.Path(__file__).parent.resolve()
-        with open(f"{file}/mock_api_data/eventbrite_results_page.txt", "r") as sample_page:
-            self.downloader._fetch_page_content = MagicMock(
+        with open(f"{file}/mock_api_data/eventbrite_results_page.txt", "rb") as sample_page:
+            downloader._fetch_page_content = MagicMock(
                 side_effect=[
                     sample_page.read(),
-                    "Nothing matched your search, but you might like these options.",
+                    b"Nothing matched your search, but you might like these options.",
                 ],
             )
-        self.downloader.get_event_ids()
+        downloader.get_event_ids()
         assert EventBriteEventID.objects.count() == len(self.expected_ids)
 
+    def test__save_event_ids_creates_new_ids_and_refreshes_existing_ones(self):
+        """New ID's should be created, existing ID's should only have last_seen updated."""
+        existing = EventBriteEventIDFactory(event_id=1234)
+        EventBriteEventID.objects.filter(event_id=1234).update(
+            last_seen=timezone.now() - timedelta(days=10),
+        )
+        with self.assertNumQueries(2):
+            self.downloader._save_event_ids(["1234", "5678"])
+        assert set(EventBriteEventID.objects.values_list("event_id", flat=True)) == {1234, 5678}
+        refreshed = EventBriteEventID.objects.get(event_id=1234)
+        assert refreshed.first_fetched == existing.first_fetched
+        assert timezone.now() - refreshed.last_seen < timedelta(seconds=2)
+
 
 class TestEventRawDataDownloader(TestCase):
     """Tests for the EventRawDataDownloader class."""
 
     def setUp(self) -> None:  # noqa: D102
         self.downloader = EventRawDataDownloader()
+        self.downloader._get_event_description = MagicMock(return_value="<p>Description</p>")
         self.event_ids = [
             EventBriteEventIDFactory(),
             EventBriteEventIDFactory(),
@@ -205,6 +288,8 @@ class TestEventRawDataDownloader(TestCase):
             f"https://www.eventbriteapi.com/v3/events/1234/"
             f"?expand=category,subcategory,venue,format,listing_properties,ticket_availability"
             f"&token={settings.EVENTBRITE_API_KEY}",
+            session=self.downloader.session,
+            rate_limiter=self.downloader.rate_limiter,
         )
 
     @patch("integrations.eventbrite.http_request_with_backoff")
@@ -222,6 +307,31 @@ class TestEventRawDataDownloader(TestCase):
         response = self.downloader._get_event_data("1234")
         assert response == {"Hey": "There!"}
 
+    @patch("integrations.eventbrite.http_request_with_backoff")
+    def test__get_event_description_returns_the_description(self, mock_get):
+        """Function should call the description endpoint and return the description HTML."""
+        downloader = EventRawDataDownloader()
+        mock_get.return_value = MagicMock(
+            status_code=OK,
+            content=json.dumps({"description": "My description"}),
+        )
+        assert downloader._get_event_description("1234") == "My description"
+        mock_get.assert_called_once_with(
+            "get",
+            f"https://www.eventbriteapi.com/v3/events/1234/"
+            f"description/?token={settings.EVENTBRITE_API_KEY}",
+            session=downloader.session,
+            rate_limiter=downloader.rate_limiter,
+        )
+
+    @patch("integrations.eventbrite.http_request_with_backoff")
+    def test__get_event_description_raises_apierror_if_incorrect_status(self, mock_get):
+        """Function should raise an API error if the response was not correct."""
+        downloader = EventRawDataDownloader()
+        mock_get.return_value = MagicMock(status_code=NOT_FOUND, content=b"{}")
+        with self.assertRaises(APIError):
+            downloader._get_event_description("1234")
+
     def test_get_recently_seen_events_only_get_events_last_seen_in_timeframe(self):
         """Function should only download events recently seen on ID download."""
         self.downloader._get_event_data = MagicMock(return_value=self.sample_json)
@@ -248,6 +358,7 @@ class TestEventRawDataDownloader(TestCase):
             raw_datasets = EventBriteRawEventData.objects.filter(event_id=event_id).all()
             assert len(raw_datasets) == 1
             assert raw_datasets[0].data == self.sample_json
+            assert raw_datasets[0].description == "<p>Description</p>"
 
     def test_get_recently_seen_events_updates_existing_model_and_saves_json(self):
         """If there is a current EventBriteRawEventData, save JSON."""
@@ -263,6 +374,69 @@ class TestEventRawDataDownloader(TestCase):
             assert len(raw_datasets) == 1
             assert raw_datasets[0].data == self.sample_json
 
+    def test_get_recently_seen_events_does_not_rewrite_unchanged_data(self):
+        """If the downloaded content hashes the same as the stored content, skip the write."""
+        raw_data = EventBriteRawEventDataFactory(
+            event_id=self.event_ids[0],
+            data={"stale": True},
+            content_hash=EventBriteRawEventData.hash_content(
+                self.sample_json,
+                "<p>Description</p>",
+            ),
+        )
+        self.downloader._get_event_data = MagicMock(return_value=self.sample_json)
+        self.downloader.get_recently_seen_events()
+        raw_data.refresh_from_db()
+        assert raw_data.data == {"stale": True}
+        assert EventBriteRawEventData.objects.count() == 3
+
+    def test_get_recently_seen_events_skips_events_that_fail_to_download(self):
+        """An APIError for one event should not stop the others being saved."""
+        failing_id = self.event_ids[0].event_id
+
+        def get_event_data(event_id):
+            if event_id == failing_id:
+                raise APIError("Nope")
+            return self.sample_json
+
+        self.downloader._get_event_data = MagicMock(side_effect=get_event_data)
+        self.downloader.get_recently_seen_events()
+        assert not EventBriteRawEventData.objects.filter(event_id=self.event_ids[0]).exists()
+        assert EventBriteRawEventData.objects.count() == 2
+
+    def test_get_recently_seen_events_downloads_from_the_api_concurrently(self):
+        """Every event should be fetched from the API and saved, over real HTTP requests."""
+        sample_json = self.sample_json
+
+        class FakeAPIHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: D102 N802
+                if "/description/" in self.path:
+                    content = {"description": "<p>Description</p>"}
+                else:
+                    content = sample_json
+                self.send_response(OK)
+                self.end_headers()
+                self.wfile.write(json.dumps(content).encode())
+
+            def log_message(self, *args):  # noqa: D102
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAPIHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        downloader = EventRawDataDownloader(
+            api_url=f"http://127.0.0.1:{server.server_port}",
+            workers=3,
+            requests_per_second=0,
+        )
+        downloader.get_recently_seen_events()
+        for event_id in self.event_ids:
+            raw_data = EventBriteRawEventData.objects.get(event_id=event_id)
+            assert raw_data.data == sample_json
+            assert raw_data.description == "<p>Description</p>"
+
 
 class TestEventBriteEventParser(TestCase):
     """Tests for the TestEventBriteEventParser."""
@@ -343,6 +517,12 @@ class TestEventBriteEventParser(TestCase):
         self.raw_data[0].save()
         assert self.parser._determine_filters(self.raw_data[0]) == {"Barry": True, "White": True}
 
+    def test_api_user_is_fetched_once_per_parser(self):
+        """The API user should be looked up once and then reused."""
+        assert self.parser.api_user == get_or_create_api_user()
+        with self.assertNumQueries(0):
+            self.parser.api_user
+
     def test__build_photo_from_gmaps_data_creates_or_updates_photo(self):
         """Function should update the suppleid image with bytecode from google maps."""
         self.parser.gmaps_client.places_photo = MagicMock(return_value=[b"ab", b"12", b"cd", b""])
@@ -469,51 +649,143 @@ class TestEventBriteEventParser(TestCase):
         }
         assert list(place.images.all()) == [SearchImage.objects.first()]
 
-    @patch("integrations.eventbrite.http_request_with_backoff")
-    def test__update_description_calls_correct_api_endpoint(self, mock_get):
-        """Function should call the correct API endpoint to get the event description."""
-        mock_get.return_value = MagicMock(
-            status_code=OK,
-            content=json.dumps({"description": "My description"}),
+    def test__build_place_updates_a_place_created_by_another_chunk(self):
+        """A place created concurrently since the lookup should be updated, not duplicated."""
+        place = PlaceFactory(google_maps_place_id=self.mock_google_maps_place["place_id"])
+        place.images.add(SearchImageFactory())
+        self.parser.gmaps_client.places = MagicMock(
+            return_value={"results": [self.mock_google_maps_place]},
         )
-        event = EventFactory()
-        self.parser._update_description(event, 123456)
+        filter_places = Place.objects.filter
 
-        mock_get.assert_called_once_with(
-            "get",
-            f"https://www.eventbriteapi.com/v3/events/123456/"
-            f"description/?token={settings.EVENTBRITE_API_KEY}",
+        def filter_before_the_other_chunk_saved(*args, **kwargs):
+            if kwargs == {"google_maps_place_id": self.mock_google_maps_place["place_id"]}:
+                return Place.objects.none()
+            return filter_places(*args, **kwargs)
+
+        with patch.object(Place.objects, "filter", side_effect=filter_before_the_other_chunk_saved):
+            built_place = self.parser._build_place(EventFactory(), EventBriteRawEventDataFactory())
+        assert built_place == place
+        assert Place.objects.count() == 1
+        place.refresh_from_db()
+        assert "google_maps_data" in place.attributes
+
+    def test__build_place_resolves_each_venue_once(self):
+        """Events at a venue that has already been resolved should not call the Maps API."""
+        self.parser.gmaps_client.places = MagicMock(
+            return_value={"results": [self.mock_google_maps_place]},
         )
+        self.parser.gmaps_client.places_photo = MagicMock(return_value=[b"ab", b""])
+        first_place = self.parser._build_place(EventFactory(), EventBriteRawEventDataFactory())
+        second_place = self.parser._build_place(EventFactory(), EventBriteRawEventDataFactory())
+        assert first_place == second_place
+        self.parser.gmaps_client.places.assert_called_once()
+        self.parser.gmaps_client.places_photo.assert_called_once_with(
+            "gbdbdfbgdbgxbdthDGfgv",
+            max_width=GOOGLE_MAPS_PHOTO_MAX_WIDTH,
+        )
+        venue = GoogleMapsVenue.objects.get()
+        assert venue.place_id == self.mock_google_maps_place["place_id"]
+        assert venue.photo_reference == "gbdbdfbgdbgxbdthDGfgv"
 
-    @patch("integrations.eventbrite.http_request_with_backoff")
-    def test__update_description_raises_valueerror_if_response_is_not_ok(self, mock_get):
-        """Function should raise a ValueError if the HTTP repsonse is not OK."""
-        mock_get.return_value = MagicMock(
-            status_code=NOT_FOUND,
-            content=json.dumps({"error": "Not found"}),
+    def test__build_place_resolves_venues_again_once_the_cache_expires(self):
+        """Venues resolved longer ago than the cache lifetime should be looked up again."""
+        raw_data = EventBriteRawEventDataFactory()
+        self.parser.gmaps_client.places = MagicMock(
+            return_value={"results": [self.mock_google_maps_place]},
         )
-        event = EventFactory()
-        with self.assertRaises(ValueError) as e:
-            self.parser._update_description(event, 123456)
-        assert f"Unable to update description. Response code=" f"{NOT_FOUND}, error=" in str(
-            e.exception,
+        self.parser._build_place(EventFactory(), raw_data)
+        GoogleMapsVenue.objects.update(
+            resolved_at=timezone.now() - timedelta(days=GOOGLE_MAPS_VENUE_CACHE_DAYS + 1),
         )
+        self.parser._build_place(EventFactory(), raw_data)
+        assert self.parser.gmaps_client.places.call_count == 2
+        assert GoogleMapsVenue.objects.count() == 1
 
-    @patch("integrations.eventbrite.bleach")
-    @patch("integrations.eventbrite.http_request_with_backoff")
-    def test__update_description_bleaches_description_and_adds_to_event(
-        self,
-        mock_get,
-        mock_bleach,
-    ):
-        """Function should bleach the returned description with the standard list of tags."""
-        mock_get.return_value = MagicMock(
-            status_code=OK,
-            content=json.dumps({"description": "My description"}),
+    def test__build_place_resolves_expired_venues_kept_on_the_parser_again(self):
+        """A venue kept from earlier in a long run should not be used once it has expired."""
+        raw_data = EventBriteRawEventDataFactory()
+        venue_key = self.parser._venue_cache_key(raw_data.data["venue"])
+        self.parser.venues_by_key[venue_key] = GoogleMapsVenue(
+            venue_key=venue_key,
+            place_id="old",
+            place_data={},
+            resolved_at=timezone.now() - timedelta(days=GOOGLE_MAPS_VENUE_CACHE_DAYS + 1),
+        )
+        self.parser.gmaps_client.places = MagicMock(
+            return_value={"results": [self.mock_google_maps_place]},
+        )
+        self.parser.gmaps_client.places_photo = MagicMock(return_value=[b"ab", b""])
+        place = self.parser._build_place(EventFactory(), raw_data)
+        self.parser.gmaps_client.places.assert_called_once()
+        assert place.google_maps_place_id == self.mock_google_maps_place["place_id"]
+
+    def test_process_data_marks_the_batch_parsed_in_one_query(self):
+        """Unchanged and parsed raw data should be marked together with one bulk update."""
+        for raw_data in self.raw_data:
+            raw_data.content_hash = f"hash-{raw_data.id}"
+            raw_data.save()
+        self.parser._populate_event = MagicMock(side_effect=save_complete_event)
+        with patch.object(EventBriteRawEventData.objects, "bulk_update") as bulk_update:
+            self.parser.process_data()
+        bulk_update.assert_called_once()
+        assert sorted(raw_data.id for raw_data in bulk_update.call_args[0][0]) == sorted(
+            raw_data.id for raw_data in self.raw_data
+        )
+
+    def test__build_place_uses_the_prefetched_place(self):
+        """A place prefetched for the batch should be used without looking it up again."""
+        raw_data = EventBriteRawEventDataFactory()
+        place = PlaceFactory(google_maps_place_id="1234ABCD")
+        place.images.add(SearchImageFactory())
+        GoogleMapsVenue.objects.create(
+            venue_key=self.parser._venue_cache_key(raw_data.data["venue"]),
+            place_id="1234ABCD",
+            place_data=self.mock_google_maps_place,
+            resolved_at=timezone.now(),
         )
+        self.parser._prefetch_places([raw_data])
+        assert self.parser.places_by_gmaps_id == {"1234ABCD": place}
+        self.parser.gmaps_client.places = MagicMock()
+        assert self.parser._build_place(EventFactory(), raw_data) == place
+        self.parser.gmaps_client.places.assert_not_called()
+
+    def test__venue_cache_key_falls_back_to_name_and_location(self):
+        """Venues without an EventBrite ID should be keyed on their name and rounded location."""
+        venue = {
+            "id": None,
+            "name": "  The   Pub ",
+            "address": {"latitude": "51.440426", "longitude": "-0.9427994999999783"},
+        }
+        assert self.parser._venue_cache_key(venue) == "the pub|51.440|-0.943"
+        venue["id"] = "123"
+        assert self.parser._venue_cache_key(venue) == "eventbrite:123"
+
+    def test__venue_cache_key_raises_valueerror_for_online_events(self):
+        """Online events have no venue, which should fail like any other unusable event."""
+        with self.assertRaises(ValueError):
+            self.parser._venue_cache_key(None)
+
+    def test_process_data_parses_the_rest_of_the_batch_after_an_online_event(self):
+        """An event without a venue should fail on its own, without stopping the batch."""
+        online = self.raw_data[0]
+        online.data = online.data | {"venue": None}
+        online.save()
+        self.parser.gmaps_client.places = MagicMock(
+            return_value={"results": [self.mock_google_maps_place]},
+        )
+        self.parser.gmaps_client.places_photo = MagicMock(return_value=[b"ab", b""])
+        totals = self.parser.process_data()
+        assert totals == {"parsed": len(self.raw_data) - 1, "unchanged": 0, "failed": 1}
+        assert Event.objects.count() == len(self.raw_data) - 1
+
+    @patch("integrations.eventbrite.bleach")
+    def test__update_description_bleaches_description_and_adds_to_event(self, mock_bleach):
+        """Function should bleach the downloaded description with the standard list of tags."""
         mock_bleach.clean.return_value = "bleached description"
         event = EventFactory()
-        self.parser._update_description(event, 123456)
+        raw_data = EventBriteRawEventDataFactory(description="My description")
+        self.parser._update_description(event, raw_data)
         mock_bleach.clean.assert_called_once_with(
             "My description",
             tags=BLEACH_ALLOWED_TAGS,
@@ -521,6 +793,20 @@ class TestEventBriteEventParser(TestCase):
         )
         assert event.description == "bleached description"
 
+    def test__update_description_falls_back_to_the_summary(self):
+        """Raw data without a downloaded description should use the description in the data."""
+        event = EventFactory()
+        raw_data = EventBriteRawEventDataFactory(description="")
+        self.parser._update_description(event, raw_data)
+        assert event.description == raw_data.data["description"]["html"]
+
+    @patch("integrations.eventbrite.http_request_with_backoff")
+    def test__populate_event_makes_no_eventbrite_requests(self, mock_get):
+        """Parsing should only use the downloaded data."""
+        self.parser._build_place = MagicMock(return_value=PlaceFactory())
+        self.parser._populate_event(Event(), EventBriteRawEventDataFactory())
+        mock_get.assert_not_called()
+
     def test__populate_event_catches_errors_and_returns_false(self):
         """
         We need this download to be as robust as possible, even at the expense of data loss.
@@ -545,6 +831,7 @@ class TestEventBriteEventParser(TestCase):
         expected_place = PlaceFactory()
         self.parser._build_place = MagicMock(return_value=expected_place)
         self.parser._populate_event(event, raw_data)
+        self.parser._write_event_links()
         event.refresh_from_db()
         assert abs(event.last_updated - timezone.now()) < timedelta(seconds=2)
         assert event.approved_by is None
@@ -581,9 +868,36 @@ class TestEventBriteEventParser(TestCase):
         assert image.alt_text == "RUSU Summer Ball 2022"
         assert image.uploaded_by == get_or_create_api_user()
 
-        self.parser._update_description.assert_called_once_with(event, raw_data.event_id.event_id)
+        self.parser._update_description.assert_called_once_with(event, raw_data)
         assert event.places.first() == expected_place
 
+    def test__write_event_links_links_the_batch_and_updates_the_documents(self):
+        """Images and places are linked in bulk, so the documents have to be rebuilt with them."""
+        events = [EventFactory(), EventFactory()]
+        place = PlaceFactory()
+        images = [SearchImage(link_url=f"https://example.com/{n}.jpeg") for n in range(2)]
+        for image in images:
+            image.uploaded_by = get_or_create_api_user()
+        self.parser.event_links = [(event, image, place) for event, image in zip(events, images)]
+        self.parser._write_event_links()
+        assert self.parser.event_links == []
+        for event, image in zip(events, images):
+            assert list(event.images.all()) == [image]
+            assert list(event.places.all()) == [place]
+            document = SearchDocument.objects.get(id=event.id)
+            assert document.image_url == image.display_url
+            assert document.location_lat == place.location_lat
+
+    def test_process_data_only_marks_raw_data_parsed_once_the_links_are_written(self):
+        """A batch that fails to link its events should be parsed again."""
+        self.parser._populate_event = MagicMock(side_effect=save_complete_event)
+        self.parser._write_event_links = MagicMock(side_effect=IntegrityError)
+        with self.assertRaises(IntegrityError):
+            self.parser.process_data()
+        for raw_data in self.raw_data:
+            raw_data.refresh_from_db()
+            assert raw_data.parsed_hash is None
+
     def test_process_data_ignores_event_ids_with_no_raw_data(self):
         """If there is not raw event data downloaded, move on."""
         EventBriteRawEventData.objects.all().delete()
@@ -592,10 +906,57 @@ class TestEventBriteEventParser(TestCase):
         self.parser.process_data()
         self.parser._populate_event.assert_not_called()
 
+    def test_process_data_only_processes_raw_data_that_changed_since_last_parse(self):
+        """Raw data already parsed with its current content should be skipped."""
+        parsed = self.raw_data[0]
+        parsed.content_hash = parsed.parsed_hash = "abc"
+        parsed.save()
+        self.parser._populate_event = MagicMock(return_value=False)
+        self.parser.process_data()
+        assert self.parser._populate_event.call_count == len(self.raw_data) - 1
+        parsed_raw_data = [args[1] for args, _kwargs in self.parser._populate_event.call_args_list]
+        assert parsed not in parsed_raw_data
+
+    def test_process_data_records_the_parsed_hash_after_a_successful_parse(self):
+        """Only raw data that parsed successfully should be marked as parsed."""
+        for raw_data in self.raw_data:
+            raw_data.content_hash = f"hash-{raw_data.id}"
+            raw_data.save()
+        failing = self.raw_data[1]
+        self.parser._populate_event = MagicMock(
+            side_effect=lambda event, raw_data: (
+                raw_data.id != failing.id and save_complete_event(event, raw_data)
+            ),
+        )
+        self.parser.process_data()
+        for raw_data in self.raw_data:
+            raw_data.refresh_from_db()
+            expected_hash = None if raw_data.id == failing.id else raw_data.content_hash
+            assert raw_data.parsed_hash == expected_hash
+
+    def test_process_data_only_processes_the_given_raw_data(self):
+        """If raw data ID's are given, only that raw data should be processed."""
+        self.parser._populate_event = MagicMock(side_effect=save_complete_event)
+        totals = self.parser.process_data([str(self.raw_data[0].id)])
+        assert totals == {"parsed": 1, "unchanged": 0, "failed": 0}
+        assert self.parser._populate_event.call_args[0][1] == self.raw_data[0]
+
+    def test_get_raw_data_ids_to_parse_returns_unparsed_raw_data(self):
+        """Raw data already parsed with its current content should not be returned."""
+        parsed = self.raw_data[0]
+        parsed.content_hash = parsed.parsed_hash = "abc"
+        parsed.save()
+        assert sorted(self.parser.get_raw_data_ids_to_parse()) == sorted(
+            str(raw_data.id) for raw_data in self.raw_data[1:]
+        )
+
     def test_process_data_does_not_process_events_that_have_not_changed(self):
         """If the event has not changed, do not reprocess."""
         for rd in self.raw_data:
-            EventFactory(attributes={"eventbrite_event_id": rd.event_id.event_id})
+            rd.event_id.search_event = EventFactory(
+                attributes={"eventbrite_event_id": rd.event_id.event_id},
+            )
+            rd.event_id.save()
 
         self.parser._has_event_changed = MagicMock(return_value=False)
         self.parser._populate_event = MagicMock()
@@ -604,23 +965,60 @@ class TestEventBriteEventParser(TestCase):
 
     def test_process_data_creates_a_new_event_if_one_does_not_exist(self):
         """If no event exists, pass a new event into _populate_event."""
-        self.parser._populate_event = MagicMock()
+        self.parser._populate_event = MagicMock(return_value=False)
         self.parser.process_data()
         for mock_call in self.parser._populate_event.call_args_list:
             assert isinstance(mock_call[0][0], Event)
             assert mock_call[0][0].headline == ""
 
-    def test_process_data_deletes_an_event_if_there_are_duplicates(self):
-        """If there are duplicate events, delete one."""
-        EventFactory(
-            attributes={"eventbrite_event_id": self.raw_data[0].event_id.event_id},
-            last_updated=timezone.now() - timedelta(days=365),
-        )
-        EventFactory(
-            attributes={"eventbrite_event_id": self.raw_data[0].event_id.event_id},
-            last_updated=timezone.now() - timedelta(days=365),
-        )
-        assert Event.objects.count() == 2
-        self.parser._populate_event = MagicMock()
+    def test_process_data_updates_the_linked_event(self):
+        """The event linked to the EventBrite ID should be passed into _populate_event."""
+        raw_data = self.raw_data[0]
+        event = EventFactory(last_updated=timezone.now() - timedelta(days=365))
+        raw_data.event_id.search_event = event
+        raw_data.event_id.save()
+        self.parser._has_event_changed = MagicMock(return_value=True)
+        self.parser._populate_event = MagicMock(side_effect=save_complete_event)
         self.parser.process_data()
-        assert Event.objects.count() == 1
+        populated = {
+            args[1].id: args[0] for args, _kwargs in self.parser._populate_event.call_args_list
+        }
+        assert populated[raw_data.id] == event
+
+    def test_process_data_links_new_events_to_their_eventbrite_id(self):
+        """Events created by _populate_event should be linked to their EventBrite ID."""
+
+        def populate_event(event, raw_data):
+            save_complete_event(event, raw_data)
+            event.headline = "Archery"
+            event.save()
+            return True
+
+        self.parser._populate_event = MagicMock(side_effect=populate_event)
+        self.parser.process_data()
+        for raw_data in self.raw_data:
+            event_id = EventBriteEventID.objects.get(event_id=raw_data.event_id.event_id)
+            assert event_id.search_event.headline == "Archery"
+
+    def test_process_data_queries_do_not_grow_with_the_number_of_events(self):
+        """Raw data, events, venues and places should be fetched per batch, not per event."""
+        for rd in self.raw_data:
+            rd.event_id.search_event = EventFactory()
+            rd.event_id.save()
+        GoogleMapsVenue.objects.create(
+            venue_key=self.parser._venue_cache_key(self.raw_data[0].data["venue"]),
+            place_id="1234ABCD",
+            place_data=self.mock_google_maps_place,
+            resolved_at=timezone.now(),
+        )
+        PlaceFactory(google_maps_place_id="1234ABCD")
+        self.parser._has_event_changed = MagicMock(return_value=False)
+        self.parser._mark_parsed = MagicMock()
+
+        with CaptureQueriesContext(connection) as single_event_queries:
+            self.parser.process_data([str(self.raw_data[0].id)])
+        self.parser.venues_by_key = {}
+        self.parser.places_by_gmaps_id = {}
+        with CaptureQueriesContext(connection) as all_event_queries:
+            self.parser.process_data()
+        assert len(all_event_queries) == len(single_event_queries) + 1
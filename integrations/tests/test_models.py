@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Tests for the integrations models."""
+
+# 3rd-party
+from django.test import SimpleTestCase
+
+# Project
+from integrations.models import EventBriteRawEventData
+
+
+class TestEventBriteRawEventData(SimpleTestCase):
+    """Tests for EventBriteRawEventData."""
+
+    def test_hash_content_ignores_key_order(self):
+        """The same data should hash the same however its keys are ordered."""
+        assert EventBriteRawEventData.hash_content(
+            {"a": 1, "b": [1, 2]},
+            "desc",
+        ) == EventBriteRawEventData.hash_content({"b": [1, 2], "a": 1}, "desc")
+
+    def test_hash_content_changes_with_data_or_description(self):
+        """A change to the data or the description should change the hash."""
+        original = EventBriteRawEventData.hash_content({"a": 1}, "desc")
+        assert EventBriteRawEventData.hash_content({"a": 2}, "desc") != original
+        assert EventBriteRawEventData.hash_content({"a": 1}, "other") != original
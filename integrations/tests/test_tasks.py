@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Tests for the integrations tasks."""
+
+# Standard Library
+from unittest.mock import patch
+
+# 3rd-party
+from django.test import SimpleTestCase
+
+# Project
+from integrations import tasks
+
+
+class TestParseEventbriteDataIntoEvents(SimpleTestCase):
+    """Tests for the parse_eventbrite_data_into_events task."""
+
+    @patch("integrations.tasks.chord")
+    @patch("integrations.tasks.EventBriteEventParser")
+    def test_splits_raw_data_into_chunks(self, mock_parser, mock_chord):
+        """Each chunk should be a parse task, with the totals recorded by the chord callback."""
+        mock_parser.return_value.get_raw_data_ids_to_parse.return_value = ["a", "b", "c", "d", "e"]
+        with patch("integrations.tasks.EVENTBRITE_PARSE_CHUNK_SIZE", 2):
+            tasks.parse_eventbrite_data_into_events()
+
+        header = list(mock_chord.call_args[0][0])
+        assert [signature.args for signature in header] == [(["a", "b"],), (["c", "d"],), (["e"],)]
+        assert all(signature.task == tasks.parse_eventbrite_chunk.name for signature in header)
+        callback = mock_chord.return_value.call_args[0][0]
+        assert callback.task == tasks.record_eventbrite_parse_totals.name
+
+    @patch("integrations.tasks.chord")
+    @patch("integrations.tasks.EventBriteEventParser")
+    def test_does_nothing_if_there_is_nothing_to_parse(self, mock_parser, mock_chord):
+        """With no raw data to parse, no chord should be started."""
+        mock_parser.return_value.get_raw_data_ids_to_parse.return_value = []
+        tasks.parse_eventbrite_data_into_events()
+        mock_chord.assert_not_called()
+
+
+class TestParseEventbriteChunk(SimpleTestCase):
+    """Tests for the parse_eventbrite_chunk task."""
+
+    @patch("integrations.tasks.EventBriteEventParser")
+    def test_parses_only_the_chunk(self, mock_parser):
+        """The chunk's raw data ID's should be passed to the parser and the totals returned."""
+        mock_parser.return_value.process_data.return_value = {"parsed": 2}
+        assert tasks.parse_eventbrite_chunk(["a", "b"]) == {"parsed": 2}
+        mock_parser.return_value.process_data.assert_called_once_with(["a", "b"])
+
+    def test_failed_chunks_are_retried(self):
+        """A chunk that fails should be retried on its own, with a backoff."""
+        assert tasks.parse_eventbrite_chunk.autoretry_for == (Exception,)
+        assert tasks.parse_eventbrite_chunk.retry_backoff
+        assert tasks.parse_eventbrite_chunk.max_retries == 3
+
+
+class TestRecordEventbriteParseTotals(SimpleTestCase):
+    """Tests for the record_eventbrite_parse_totals task."""
+
+    def test_adds_up_the_chunk_totals(self):
+        """The totals from every chunk should be added together."""
+        assert tasks.record_eventbrite_parse_totals(
+            [
+                {"parsed": 2, "unchanged": 1, "failed": 0},
+                {"parsed": 3, "unchanged": 0, "failed": 1},
+            ],
+        ) == {"parsed": 5, "unchanged": 1, "failed": 1}
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Tests for the common integration utilities."""
+
+# Standard Library
+from http.client import INTERNAL_SERVER_ERROR
+from http.client import OK
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+# 3rd-party
+from django.test import SimpleTestCase
+
+# Project
+from integrations.exceptions import APIError
+from integrations.utils import RateLimiter
+from integrations.utils import http_request_with_backoff
+
+
+class TestHTTPRequestWithBackoff(SimpleTestCase):
+    """Tests for http_request_with_backoff."""
+
+    @patch("integrations.utils.time.sleep")
+    def test_retries_server_errors_through_the_session(self, _mock_sleep):
+        """Server errors should be retried with the same session until a response is returned."""
+        session = MagicMock()
+        session.get.side_effect = [
+            MagicMock(status_code=INTERNAL_SERVER_ERROR),
+            MagicMock(status_code=OK),
+        ]
+        response = http_request_with_backoff("get", "http://example.com", session=session)
+        assert response.status_code == OK
+        assert session.get.call_count == 2
+
+    @patch("integrations.utils.time.sleep")
+    def test_raises_apierror_after_retries(self, _mock_sleep):
+        """If every attempt is a server error, raise an APIError."""
+        session = MagicMock()
+        session.get.return_value = MagicMock(status_code=INTERNAL_SERVER_ERROR)
+        with self.assertRaises(APIError):
+            http_request_with_backoff("get", "http://example.com", retries=3, session=session)
+        assert session.get.call_count == 3
+
+    @patch("integrations.utils.time.sleep")
+    def test_waits_for_the_rate_limiter_before_each_attempt(self, _mock_sleep):
+        """The rate limiter should be asked for a slot on every attempt."""
+        session = MagicMock()
+        session.get.side_effect = [
+            MagicMock(status_code=INTERNAL_SERVER_ERROR),
+            MagicMock(status_code=OK),
+        ]
+        rate_limiter = MagicMock()
+        http_request_with_backoff(
+            "get",
+            "http://example.com",
+            session=session,
+            rate_limiter=rate_limiter,
+        )
+        assert rate_limiter.wait.call_count == 2
+
+
+class TestRateLimiter(SimpleTestCase):
+    """Tests for RateLimiter."""
+
+    @patch("integrations.utils.time.sleep")
+    @patch("integrations.utils.time.monotonic", return_value=100)
+    def test_spaces_requests_to_the_same_host(self, _mock_monotonic, mock_sleep):
+        """Requests to one host should each wait one interval longer than the last."""
+        rate_limiter = RateLimiter(requests_per_second=4)
+        for _ in range(3):
+            rate_limiter.wait("http://example.com/a")
+        assert [args[0] for args, _kwargs in mock_sleep.call_args_list] == [0, 0.25, 0.5]
+
+    @patch("integrations.utils.time.sleep")
+    @patch("integrations.utils.time.monotonic", return_value=100)
+    def test_hosts_are_limited_separately(self, _mock_monotonic, mock_sleep):
+        """A request to a different host should not wait for the first host."""
+        rate_limiter = RateLimiter(requests_per_second=4)
+        rate_limiter.wait("http://example.com/a")
+        rate_limiter.wait("http://example.org/a")
+        assert [args[0] for args, _kwargs in mock_sleep.call_args_list] == [0, 0]
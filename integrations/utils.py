@@ -1,23 +1,73 @@
 # -*- coding: utf-8 -*-
 """Common integration utilities."""
 # Standard Library
+import threading
 import time
 from http.client import INTERNAL_SERVER_ERROR
+from urllib.parse import urlparse
 
 # 3rd-party
 import requests
+from requests.adapters import HTTPAdapter
 
 # Project
 from integrations.exceptions import APIError
 
 
-def http_request_with_backoff(method, url, retries=5, start_backoff_seconds=1):
-    """Perform a HTTP request with backoff. Either returns response or raises an APIError."""
+class RateLimiter:
+    """
+    Space out requests to each host so that no host sees more than requests_per_second.
+
+    A single limiter can be shared between threads, each thread waits for its own slot.
+    """
+
+    def __init__(self, requests_per_second: float):  # noqa: D107
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.lock = threading.Lock()
+        self.next_request_times = {}
+
+    def wait(self, url: str):
+        """Block until a request to the url's host is allowed."""
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_request_times.get(host, now))
+            self.next_request_times[host] = request_time + self.interval
+        time.sleep(request_time - now)
+
+
+def pooled_session(pool_size: int):
+    """A requests session that keeps up to pool_size connections open per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def http_request_with_backoff(
+    method,
+    url,
+    retries=5,
+    start_backoff_seconds=1,
+    session: requests.Session = None,
+    rate_limiter: RateLimiter = None,
+):
+    """
+    Perform a HTTP request with backoff. Either returns response or raises an APIError.
+
+    Requests go through the session if one is given, so that connections are reused, and every
+    attempt waits for the rate limiter if one is given.
+    """
     current_failures = 0
     current_backoff = start_backoff_seconds
+    request = getattr(session or requests, method)
     while current_failures < retries:
-        method = getattr(requests, method)
-        response = method(url)
+        if rate_limiter:
+            rate_limiter.wait(url)
+        response = request(url)
         if response.status_code == INTERNAL_SERVER_ERROR:
             current_failures += 1
             time.sleep(current_backoff)
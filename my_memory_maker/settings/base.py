@@ -160,3 +160,28 @@ CELERY_BROKER_URL = getenv("CELERY_BROKER_URL")
 CELERYBEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 SEARCH_SHOW_UNMODERATED_RESULTS = False
+# Settle places near the edge of a distance search with their geodesic distance, see search.geo.
+SEARCH_DISTANCE_EXACT = True
+
+# Anonymous search results are cached in a file based cache so that the gunicorn workers and the
+# celery workers, which bump the cache version when entities change, all share it.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "search": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": getenv("SEARCH_CACHE_DIR", "/tmp/mymemorymaker_search_cache"),
+    },
+}
+SEARCH_CACHE_ALIAS = "search"
+SEARCH_CACHE_TIMEOUT = 60 * 60
+# Where the catalogue snapshot is written, see search.snapshot. Set to None to disable it.
+SEARCH_SNAPSHOT_DIR = getenv("SEARCH_SNAPSHOT_DIR", "/tmp/mymemorymaker_search_snapshot")
+SEARCH_SNAPSHOT_REBUILD_SECONDS = 5 * 60
+CELERY_BEAT_SCHEDULE = {
+    "build-catalogue-snapshot": {
+        "task": "search.tasks.build_catalogue_snapshot",
+        "schedule": SEARCH_SNAPSHOT_REBUILD_SECONDS,
+    },
+}
@@ -1,9 +1,25 @@
 # -*- coding: utf-8 -*-
 """Test settings."""
 
+# Standard Library
+import tempfile
+
 # Local
 from .base import *  # noqa: F403 F401
 
 AWS_S3_ACCESS_KEY_ID = "NOT_A_REAL_S3_KEY"
 AWS_S3_SECRET_ACCESS_KEY = "NOT_A_REAL_S3_SECRET"
 DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+# Uploaded test images go to a temporary directory, not the working tree.
+MEDIA_ROOT = tempfile.mkdtemp(prefix="my-memory-maker-test-media-")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Tests that need the search results cache switch it to a LocMemCache.
+    "search": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    },
+}
+# Tests that need the catalogue snapshot point this at a temporary directory.
+SEARCH_SNAPSHOT_DIR = None
@@ -10,3 +10,8 @@ class SearchConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "search"
+
+    def ready(self):
+        """Connect the signals that keep the search documents up to date."""
+        # Project
+        import search.signals  # noqa: F401
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for FilterQueryProcessor at realistic catalogue sizes.
+
+This is run through the benchmark_search management command, which rolls the seeded catalogue
+back once the timings are taken.
+"""
+
+# Standard Library
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+# 3rd-party
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+# Project
+from search import views
+from search.cache import bump_search_version
+from search.constants import FILTERS
+from search.constants import SEARCH_ENTITY_SOURCES
+from search.filters import FilterQueryProcessor
+from search.models import Activity
+from search.models import Event
+from search.models import EventOccurrence
+from search.models import Place
+from search.models import SearchDocument
+from search.snapshot import build_snapshot
+from users.models import CustomUser
+
+ALL_FILTERS = [filter_name for filter_list in FILTERS.values() for filter_name in filter_list]
+
+"""Words the seeded headlines, descriptions and synonyms are made from."""
+BENCHMARK_VOCABULARY = [
+    "music",
+    "comedy",
+    "climbing",
+    "pottery",
+    "festival",
+    "family",
+    "walk",
+    "market",
+    "theatre",
+    "cinema",
+    "pub",
+    "quiz",
+    "yoga",
+    "gallery",
+    "museum",
+    "concert",
+    "dinner",
+    "brunch",
+    "garden",
+    "river",
+    "workshop",
+    "tasting",
+    "cycling",
+    "football",
+    "dance",
+    "jazz",
+    "night",
+    "tour",
+    "history",
+    "art",
+]
+
+"""A typical search from the search_home sliders: a mid-range price near London next fortnight."""
+BENCHMARK_SEARCH_PARAMS = {
+    "price_lower": "10",
+    "price_upper": "60",
+    "duration_lower": "1",
+    "duration_upper": "6",
+    "people_lower": "2",
+    "people_upper": "4",
+    "keywords": "music festival",
+    "filter_concerts": "true",
+    "filter_outdoor": "true",
+    "filter_home": "false",
+    "location_lat": "51.5072",
+    "location_long": "-0.1276",
+    "distance_lower": "0",
+    "distance_upper": "25",
+}
+
+BENCHMARK_BATCH_SIZE = 5000
+
+BENCHMARK_USER_EMAIL = "benchmarks@mymemorymaker.com"
+
+
+def get_or_create_benchmark_user():
+    """The user that creates the seeded catalogue and makes the signed in searches."""
+    user, _ = CustomUser.objects.get_or_create(
+        email=BENCHMARK_USER_EMAIL,
+        first_name="MyMemoryMaker",
+        last_name="Benchmarks",
+    )
+    return user
+
+
+def _entity_fields(rng: random.Random, user):
+    """Field values shared by every kind of seeded entity."""
+    # Prices are skewed towards the cheap end, with a long tail of expensive entities.
+    price_lower = round(min(rng.lognormvariate(2.5, 1), 250), 2)
+    duration_lower = rng.choice([1, 1, 2, 2, 3, 4, 6, 8, 24])
+    people_lower = rng.choice([1, 1, 2, 2, 2, 4, 6])
+    active_filters = set(rng.sample(ALL_FILTERS, rng.randint(2, 8)))
+    attributes = {filter_name: filter_name in active_filters for filter_name in ALL_FILTERS}
+    return {
+        "created_by": user,
+        "approved_by": user if rng.random() < 0.9 else None,
+        "headline": " ".join(rng.sample(BENCHMARK_VOCABULARY, 5)).capitalize(),
+        "description": " ".join(rng.choices(BENCHMARK_VOCABULARY, k=40)),
+        "synonyms_keywords": rng.sample(BENCHMARK_VOCABULARY, 3),
+        "price_lower": price_lower,
+        "price_upper": round(price_lower * rng.uniform(1, 3), 2),
+        "duration_lower": duration_lower,
+        "duration_upper": duration_lower + rng.choice([0, 0, 1, 2, 4]),
+        "people_lower": people_lower,
+        "people_upper": people_lower + rng.choice([0, 1, 2, 4, 10]),
+        "source_type": rng.choice(SEARCH_ENTITY_SOURCES),
+        "attributes": attributes,
+    }
+
+
+def _event_dates(rng: random.Random):
+    """One to three occurrences, mostly in the next few months with some already past."""
+    dates = []
+    for _ in range(rng.randint(1, 3)):
+        start = timezone.now() + timedelta(days=rng.uniform(-30, 120))
+        dates.append([start, start + timedelta(hours=rng.choice([1, 2, 3, 4, 8]))])
+    return dates
+
+
+def _bulk_create(model, entities: list):
+    """Fill in the fields that save() would derive, then bulk create the entities."""
+    for entity in entities:
+        entity.clean_synonyms_keywords()
+        entity.filter_states = entity.build_filter_states()
+    model.objects.bulk_create(entities, batch_size=BENCHMARK_BATCH_SIZE)
+
+
+def seed_catalogue(size: int, random_seed: int = 0):
+    """
+    Create a catalogue of size entities, split evenly between activities, events and places.
+
+    Places are spread over Great Britain, and every event is linked to one of the places. The
+    entities are bulk created, so the search vectors, occurrences and search documents that
+    saving would maintain are built in bulk afterwards, and the search version is bumped so no
+    cached results from an earlier catalogue are used.
+    """
+    rng = random.Random(random_seed)
+    user = get_or_create_benchmark_user()
+    place_count = max(size // 3, 1)
+    event_count = max(size // 3, 1)
+    activity_count = max(size - place_count - event_count, 1)
+
+    places = [
+        Place(
+            **_entity_fields(rng, user),
+            location_lat=rng.uniform(50.0, 58.5),
+            location_long=rng.uniform(-5.5, 1.7),
+        )
+        for _ in range(place_count)
+    ]
+    _bulk_create(Place, places)
+    _bulk_create(
+        Activity,
+        [Activity(**_entity_fields(rng, user)) for _ in range(activity_count)],
+    )
+    events = [
+        Event(**_entity_fields(rng, user), dates=_event_dates(rng)) for _ in range(event_count)
+    ]
+    _bulk_create(Event, events)
+
+    EventOccurrence.objects.bulk_create(
+        [
+            EventOccurrence(event=event, start=start, end=end)
+            for event in events
+            for start, end in event.dates
+        ],
+        batch_size=BENCHMARK_BATCH_SIZE,
+    )
+    Event.places.through.objects.bulk_create(
+        [
+            Event.places.through(event_id=event.id, place_id=rng.choice(places).id)
+            for event in events
+        ],
+        batch_size=BENCHMARK_BATCH_SIZE,
+    )
+    for model in [Activity, Event, Place]:
+        model.objects.update(search_vector=SearchDocument.search_vector_expression())
+    SearchDocument.rebuild(batch_size=BENCHMARK_BATCH_SIZE)
+    bump_search_version()
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+class SearchBenchmark:
+    """Time each FilterQueryProcessor stage, the full page of results and the search view."""
+
+    def __init__(self, search_params: dict = None, repeats: int = 5):  # noqa: D107
+        self.search_params = search_params or BENCHMARK_SEARCH_PARAMS
+        self.repeats = repeats
+        self.processor = FilterQueryProcessor(self.search_params)
+        # Keyword searches need the database, so the snapshot is timed without them.
+        self.filter_processor = FilterQueryProcessor(
+            {key: value for key, value in self.search_params.items() if key != "keywords"},
+        )
+
+    def _time(self, stage):
+        """Run a stage once to count its queries, then time it repeats times."""
+        with CaptureQueriesContext(connection) as queries:
+            stage()
+        timings = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            stage()
+            timings.append((time.perf_counter() - start) * 1000)
+        return {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": len(queries),
+        }
+
+    def _stage(self, method_name: str, types: list):
+        """A callable that applies one processor stage to the search documents of each type."""
+
+        def stage():
+            for obj_type in types:
+                queryset = self.processor._get_document_base_queryset(obj_type)
+                if method_name == "_perform_distance_query":
+                    queryset = self.processor._perform_distance_query(queryset, obj_type)
+                else:
+                    queryset = getattr(self.processor, method_name)(queryset)
+                list(queryset.values_list("id", flat=True))
+
+        return stage
+
+    def _results_page(self):
+        """Fetch a full page of results."""
+        list(self.processor.get_results_page("benchmark").object_list)
+
+    def _filter_results_page(self):
+        """Fetch a full page of results for the search without keywords."""
+        list(self.filter_processor.get_results_page("benchmark").object_list)
+
+    def _time_filter_results_page(self):
+        """Time the search without keywords from the database, then from a catalogue snapshot."""
+        with override_settings(SEARCH_SNAPSHOT_DIR=None):
+            database_timings = self._time(self._filter_results_page)
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            with override_settings(SEARCH_SNAPSHOT_DIR=snapshot_dir):
+                build_snapshot()
+                snapshot_timings = self._time(self._filter_results_page)
+        return {
+            "filter_results_page": database_timings,
+            "filter_results_page_snapshot": snapshot_timings,
+        }
+
+    def _view(self, user):
+        """A callable that renders the search_results view for a user."""
+        request = RequestFactory().get(
+            reverse(views.search_results),
+            self.search_params | {"seed": "benchmark"},
+        )
+        request.user = user
+
+        def view():
+            views.search_results(request)
+
+        return view
+
+    def run(self):
+        """Time every stage and return the results as a dict."""
+        all_types = [Activity, Event, Place]
+        results = {
+            "slider": self._time(self._stage("_append_slider_queries", all_types)),
+            "keyword": self._time(self._stage("_append_search_queries", all_types)),
+            "hstore": self._time(self._stage("_append_null_boolean_filter_queries", all_types)),
+            "datetime": self._time(self._stage("_perform_datetime_query", [Event])),
+            "distance": self._time(self._stage("_perform_distance_query", [Event, Place])),
+            "results_page": self._time(self._results_page),
+            "search_results_view": self._time(self._view(get_or_create_benchmark_user())),
+            "search_results_view_anonymous": self._time(self._view(AnonymousUser())),
+        }
+        return results | self._time_filter_results_page()
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float):
+    """
+    List the stages that are more than tolerance times slower than the baseline, or that now run
+    more queries, for every catalogue size the two have in common.
+    """  # noqa: D205 D400
+    regressions = []
+    for size, stages in results.items():
+        for stage_name, timings in stages.items():
+            baseline_timings = baseline.get(size, {}).get(stage_name)
+            if not baseline_timings:
+                continue
+            if timings["median_ms"] > baseline_timings["median_ms"] * tolerance:
+                regressions.append(
+                    f"{size} {stage_name}: {timings['median_ms']}ms, "
+                    f"baseline {baseline_timings['median_ms']}ms",
+                )
+            if timings["queries"] > baseline_timings["queries"]:
+                regressions.append(
+                    f"{size} {stage_name}: {timings['queries']} queries, "
+                    f"baseline {baseline_timings['queries']}",
+                )
+    return regressions
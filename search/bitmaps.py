@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Bitmaps of the catalogue snapshot's rows, one per filter state.
+
+Each bitmap packs one bit per snapshot row into bytes, so a filter over the whole catalogue is a
+few kilobytes. Selected filters are combined with a bitwise AND, and facet counts are the popcount
+of each filter's bitmap ANDed with the results.
+"""
+
+# 3rd-party
+import numpy as np
+
+# The number of set bits in every byte value.
+POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def pack_rows(mask):
+    """Pack a boolean row mask into a bitmap."""
+    return np.packbits(mask)
+
+
+def unpack_rows(bitmap, size: int):
+    """Unpack a bitmap into a boolean row mask of size rows."""
+    return np.unpackbits(bitmap, count=size).astype(bool)
+
+
+def popcount(bitmaps, axis=None):
+    """The number of rows set in a bitmap, or in each of a stack of bitmaps along an axis."""
+    return POPCOUNT_TABLE[bitmaps].sum(axis=axis, dtype=np.int64)
+
+
+class FilterBitmapIndex:
+    """
+    The bitmaps of the rows with each filter stored as True, and with it stored as False.
+
+    A filter that must be false is matched against rows where it is stored as False, rather than
+    ANDNOT its True bitmap, as entities without the attribute match neither, as in the database.
+    """
+
+    def __init__(self, filters: list, true_bitmaps, false_bitmaps, size: int):  # noqa: D107
+        self.positions = {filter_name: position for position, filter_name in enumerate(filters)}
+        self.true_bitmaps = true_bitmaps
+        self.false_bitmaps = false_bitmaps
+        self.size = size
+
+    def bitmap(self, filter_name: str, value: bool):
+        """The bitmap of rows with the filter stored as value, empty for unknown filters."""
+        if filter_name not in self.positions:
+            return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        bitmaps = self.true_bitmaps if value else self.false_bitmaps
+        return bitmaps[self.positions[filter_name]]
+
+    def match(self, required_filters: list):
+        """The bitmap of rows matching every (filter, value) pair, or None if there are none."""
+        matched = None
+        for filter_name, value in required_filters:
+            bitmap = self.bitmap(filter_name, value)
+            if matched is None:
+                matched = bitmap.copy()
+            else:
+                np.bitwise_and(matched, bitmap, out=matched)
+        return matched
+
+    def counts(self, bitmap):
+        """How many rows of a bitmap have each filter stored as True."""
+        counts = popcount(np.bitwise_and(self.true_bitmaps, bitmap), axis=1)
+        return {
+            filter_name: int(counts[position]) for filter_name, position in self.positions.items()
+        }
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Caching of the result ids of anonymous searches."""
+
+# Standard Library
+import hashlib
+import uuid
+
+# 3rd-party
+from django.conf import settings
+from django.core.cache import caches
+from django.http import QueryDict
+
+# Project
+from search.constants import SEARCH_CACHE_LOCATION_DECIMAL_PLACES
+from search.constants import SEARCH_CACHE_UNCACHED_PARAMS
+from search.constants import SEARCH_CACHE_VERSION_KEY
+
+
+def search_cache():
+    """The cache that search results are stored in."""
+    return caches[settings.SEARCH_CACHE_ALIAS]
+
+
+def get_search_version():
+    """
+    The current version of the search results.
+
+    Every cache key includes the version, so bumping it invalidates every cached search at once.
+    """
+    version = search_cache().get(SEARCH_CACHE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        search_cache().set(SEARCH_CACHE_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def bump_search_version():
+    """Invalidate every cached search, called once a change to a search entity is committed."""
+    search_cache().set(SEARCH_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def normalise_search_params(request_get: QueryDict):
+    """
+    Strip the paging params and round the location to a grid.
+
+    The same params are used for the search itself, so the cached results are exactly the results
+    for the rounded location.
+    """
+    params = QueryDict(mutable=True)
+    for key, values in sorted(request_get.lists()):
+        if key in SEARCH_CACHE_UNCACHED_PARAMS:
+            continue
+        if key in ["location_lat", "location_long"]:
+            try:
+                values = [
+                    str(round(float(value), SEARCH_CACHE_LOCATION_DECIMAL_PLACES))
+                    for value in values
+                ]
+            except ValueError:
+                pass
+        params.setlist(key, values)
+    return params
+
+
+def search_cache_key(params: QueryDict):
+    """The cache key for a set of normalised search params."""
+    params_hash = hashlib.md5(params.urlencode().encode()).hexdigest()
+    return f"search_results:{get_search_version()}:{params_hash}"
+
+
+def get_cached_result_ids(processor):
+    """Get the result ids for a FilterQueryProcessor from the cache, or search and cache them."""
+    key = search_cache_key(processor.request_get)
+    result_ids = search_cache().get(key)
+    if result_ids is None:
+        result_ids = processor.get_result_ids()
+        search_cache().set(key, result_ids, timeout=settings.SEARCH_CACHE_TIMEOUT)
+    return result_ids
+
+
+def get_cached_ordered_result_ids(processor, seed: str):
+    """
+    Get the result ids for a FilterQueryProcessor in the order for the seed, sorting them once.
+
+    Every page of a search reuses its seed, so later pages read the ordered ids from the cache
+    rather than hashing and sorting every result again.
+    """
+    seed_hash = hashlib.md5(seed.encode()).hexdigest()
+    key = f"{search_cache_key(processor.request_get)}:{seed_hash}"
+    ordered_ids = search_cache().get(key)
+    if ordered_ids is None:
+        ordered_ids = processor.order_result_ids(get_cached_result_ids(processor), seed)
+        search_cache().set(key, ordered_ids, timeout=settings.SEARCH_CACHE_TIMEOUT)
+    return ordered_ids
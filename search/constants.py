@@ -109,3 +109,48 @@ GT_LT_FILTERS_UPPER_LOWER_BOUNDS = {
     "price": [0, 250],  # Pounds
     "people": [1, 50],
 }
+
+"""Number of search result cards rendered per page of the infinite scroll."""
+SEARCH_RESULTS_PAGE_SIZE = 20
+
+"""
+Search result caching. Locations are rounded to this many decimal places (roughly 1km) before
+searching, so that nearby anonymous searches share a cache entry.
+"""
+SEARCH_CACHE_LOCATION_DECIMAL_PLACES = 2
+SEARCH_CACHE_VERSION_KEY = "search_results_version"
+SEARCH_CACHE_UNCACHED_PARAMS = ["page", "seed"]
+
+"""Entity types that are copied into the SearchDocument table."""
+SEARCH_DOCUMENT_ENTITY_TYPES = ["Activity", "Event", "Place"]
+
+"""
+Catalogue snapshot building. Documents are read this many at a time. Updates re-read documents
+changed since a little before the last build, to catch saves still committing while it ran, and
+are replaced by a full build once this fraction of the rows belong to deleted documents.
+"""
+SEARCH_SNAPSHOT_CHUNK_SIZE = 10000
+SEARCH_SNAPSHOT_UPDATE_OVERLAP_SECONDS = 60
+SEARCH_SNAPSHOT_MAX_DELETED_FRACTION = 0.25
+
+"""
+Geographic constants used by the distance search. Haversine distances are within half a percent
+of the geodesic distance, so exact searches check the geodesic distance of rows within twice that
+of a bound.
+"""
+EARTH_RADIUS_MILES = 3958.8
+GEODESIC_REFINEMENT_MARGIN = 0.01
+
+"""
+The spatial grid over the catalogue snapshot's places, see search.spatial. Nearest neighbour
+searches start at a small radius and widen it until they have enough places.
+"""
+SPATIAL_GRID_CELL_DEGREES = 0.1
+SPATIAL_GRID_NEAREST_START_MILES = 5
+
+"""Places shown as nearby on the see more page, and how far away they can be."""
+SEE_MORE_NEARBY_PLACES = 6
+SEE_MORE_NEARBY_MILES = 25
+
+"""Postgres text search configuration used to build and query the search vectors."""
+SEARCH_CONFIG = "english"
@@ -2,12 +2,13 @@
 """Code relating to dealing with boolean filters stored in the attributes HStoreField."""
 
 # Standard Library
-import random
+import hashlib
 from datetime import datetime
 from typing import Type
 from typing import Union
 
 # 3rd-party
+import numpy as np
 import pytz
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import HTML
@@ -18,16 +19,85 @@ from crispy_forms.layout import Row
 from django import forms
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
+from django.core.paginator import Paginator
+from django.db.models import CharField
+from django.db.models import Exists
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import OuterRef
 from django.db.models import Q
 from django.db.models import QuerySet
+from django.db.models import Value
+from django.db.models.functions import MD5
+from django.db.models.functions import Cast
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Concat
 from django.utils import timezone
+from psycopg2.extras import NumericRange
 
 # Project
+from search.bitmaps import pack_rows
+from search.bitmaps import unpack_rows
+from search.cache import get_cached_ordered_result_ids
 from search.constants import FILTERS
 from search.constants import GT_LT_FILTERS_UPPER_LOWER_BOUNDS
+from search.constants import SEARCH_CONFIG
+from search.constants import SEARCH_DOCUMENT_ENTITY_TYPES
+from search.constants import SEARCH_RESULTS_PAGE_SIZE
+from search.constants import SEE_MORE_NEARBY_MILES
+from search.constants import SEE_MORE_NEARBY_PLACES
+from search.geo import filter_by_distance
 from search.models import Activity
 from search.models import Event
+from search.models import EventOccurrence
 from search.models import Place
+from search.models import SearchDocument
+from search.models import SliderRange
+from search.models import filter_state
+from search.snapshot import CatalogueSnapshot
+from search.snapshot import get_current_snapshot
+
+
+def seeded_sort_key(seed: str, entity_id):
+    """A sort key that matches the md5 of the seed and id that get_results_page orders by."""
+    return hashlib.md5(f"{seed}{entity_id}".encode()).hexdigest()
+
+
+def nearby_place_documents(
+    lat: float,
+    long: float,
+    exclude_ids: list = (),
+    count: int = SEE_MORE_NEARBY_PLACES,
+    max_distance: float = SEE_MORE_NEARBY_MILES,
+):
+    """
+    The documents of the places nearest to a location, nearest first.
+
+    The spatial grid of the catalogue snapshot answers this while it is up to date, otherwise the
+    places in the bounding box are ordered by their distance in the database.
+    """
+    snapshot = get_current_snapshot()
+    if snapshot is not None:
+        # The place grid only holds places, so approval is the only thing left to check.
+        allowed = None if settings.SEARCH_SHOW_UNMODERATED_RESULTS else snapshot["approved"]
+        rows = snapshot.place_grid.nearest(
+            lat,
+            long,
+            count + len(exclude_ids),
+            max_distance,
+            allowed,
+        )
+        ids = [entity_id for entity_id in snapshot.ids(rows) if entity_id not in exclude_ids]
+        documents = SearchDocument.objects.in_bulk(ids[:count])
+        return [documents[entity_id] for entity_id in ids[:count] if entity_id in documents]
+
+    queryset = SearchDocument.objects.filter(entity_type="Place").exclude(id__in=exclude_ids)
+    if not settings.SEARCH_SHOW_UNMODERATED_RESULTS:
+        queryset = queryset.filter(approved=True)
+    queryset = filter_by_distance(queryset, lat, long, 0, max_distance)
+    return list(queryset.order_by("distance")[:count])
 
 
 def format_field_or_category_name(input: str):
@@ -234,23 +304,8 @@ class FilterQueryProcessor:
         """Parse datetime picker return into datetime object."""
         return datetime.strptime(input, "%d/%m/%Y, %H:%M")
 
-    def _append_slider_queries(self, queryset: QuerySet):
-        """
-        Append any slider queries to the qs.
-
-        For slider queries, we want to provide any intersection between the upper and lower bounds
-        if the search entity and the user selection.
-        So...
-                |---User Selection ---|
-        |---Search entity 1 --|
-                                |---Search entity 2---|
-                                       |---Search entity 3---|
-        We want to provide search entities 1 and 2 and allow the user to make a decision as to the
-        suitability on their own.
-
-        Filters should always come in pairs but if they don't, add the upper and lower bounds
-        from constants.
-        """
+    def _slider_bounds(self):
+        """The lower field, upper field, and the selected lower and upper bounds of each slider."""
         filter_sets = [
             # [lower_name, upper_name, lower default, upper default]
             [
@@ -273,6 +328,7 @@ class FilterQueryProcessor:
             ],
         ]
 
+        bounds = []
         for filter_set in filter_sets:
             lower_selected = self.request_get.get(filter_set[0], None)
             upper_selected = self.request_get.get(filter_set[1], None)
@@ -281,37 +337,91 @@ class FilterQueryProcessor:
                     lower_selected = filter_set[2]
                 if not upper_selected:
                     upper_selected = filter_set[3]
+                bounds.append([filter_set[0], filter_set[1], lower_selected, upper_selected])
+        return bounds
+
+    def _append_slider_queries(self, queryset: QuerySet):
+        """
+        Append any slider queries to the qs.
+
+        For slider queries, we want to provide any intersection between the upper and lower bounds
+        if the search entity and the user selection.
+        So...
+                |---User Selection ---|
+        |---Search entity 1 --|
+                                |---Search entity 2---|
+                                       |---Search entity 3---|
+        We want to provide search entities 1 and 2 and allow the user to make a decision as to the
+        suitability on their own.
+
+        Filters should always come in pairs but if they don't, add the upper and lower bounds
+        from constants.
+
+        Each slider is an overlap (&&) query between the entity's range and the selection, which
+        the search documents answer from a GiST index on the same range expression.
+        """
+        for lower_field, upper_field, lower_selected, upper_selected in self._slider_bounds():
+            lower_selected = float(lower_selected)
+            upper_selected = float(upper_selected)
+            if lower_selected > upper_selected:
+                # Not a valid range, so fall back to comparing the columns.
                 # User selected low needs to be less than entity high
                 # AND
                 # User selected high needs to be more than entity low
-                queryset = queryset.filter(**{f"{filter_set[1]}__gte": lower_selected})
-                queryset = queryset.filter(**{f"{filter_set[0]}__lte": upper_selected})
+                queryset = queryset.filter(**{f"{upper_field}__gte": lower_selected})
+                queryset = queryset.filter(**{f"{lower_field}__lte": upper_selected})
+                continue
+            slider = lower_field.removesuffix("_lower")
+            queryset = queryset.alias(**{f"{slider}_range": SliderRange(slider)}).filter(
+                **{f"{slider}_range__overlap": NumericRange(lower_selected, upper_selected, "[]")},
+            )
 
         return queryset
 
     def _append_search_queries(self, queryset: QuerySet):
-        # TODO - This feels a bit limited, are there any search packages we can use?
+        """
+        Match the keywords against the stored search vector or the synonyms.
+
+        Both lookups are backed by GIN indexes. Matches are annotated with search_rank, so that
+        better matches can be shown first.
+        """
         keywords_filters = self.request_get.get("keywords")
         if keywords_filters:
+            search_query = SearchQuery(keywords_filters, config=SEARCH_CONFIG)
             queryset = queryset.filter(
                 Q(synonyms_keywords__overlap=[x.lower() for x in keywords_filters.split()])
-                | Q(headline__search=keywords_filters)
-                | Q(description__search=keywords_filters),
-            )
+                | Q(search_vector=search_query),
+            ).annotate(search_rank=SearchRank(F("search_vector"), search_query))
         return queryset
 
-    def _append_null_boolean_filter_queries(self, queryset: QuerySet):
-        """Append a HStoreField query for each of the returned filter status'."""
+    def _required_filters(self):
+        """The name and required value of each selected filter."""
+        required_filters = []
         for _category, filter_list in FILTERS.items():
             for nb_filter in filter_list:
                 boolean_filter = self.request_get.get(f"filter_{nb_filter}")
                 if boolean_filter is not None:
                     boolean_filter = True if boolean_filter == "true" else False
-                    queryset = queryset.filter(**{f"attributes__{nb_filter}": str(boolean_filter)})
+                    required_filters.append((nb_filter, boolean_filter))
+        return required_filters
+
+    def _append_null_boolean_filter_queries(self, queryset: QuerySet):
+        """
+        Append a single indexed containment query for all of the returned filter status'.
+
+        The selected filters are matched against the filter_states array, so that adding filters
+        narrows one GIN index lookup instead of adding a scan of the attributes per filter.
+        """
+        required_states = [
+            filter_state(nb_filter, boolean_filter)
+            for nb_filter, boolean_filter in self._required_filters()
+        ]
+        if required_states:
+            queryset = queryset.filter(filter_states__contains=required_states)
         return queryset
 
-    def _perform_datetime_query(self, list_of_results: list):
-        """Pythonically (for now) filter queryset for event datetimes and place opening times."""
+    def _datetime_bounds(self):
+        """The selected datetime_from and datetime_to, or None for each that isn't valid."""
         datetime_from = self.request_get.get("datetime_from", None)
         datetime_to = self.request_get.get("datetime_to", None)
 
@@ -330,44 +440,38 @@ class FilterQueryProcessor:
         except (ValueError, TypeError):
             datetime_to = None
 
-        date_match = []
-        for event in list_of_results:
-            # Only show events in the future
-            final_date = sorted([x[1] for x in event.dates])[-1]
-            if final_date > timezone.now():
-                date_match.append(event)
-        list_of_results = date_match
+        return datetime_from, datetime_to
+
+    def _perform_datetime_query(self, queryset: QuerySet):
+        """
+        Filter events down to those in the future that match the selected datetimes.
+
+        An event matches if any of its occurrences ends after datetime_from or starts before
+        datetime_to. Both rules run against the indexed EventOccurrence table.
+        """
+        datetime_from, datetime_to = self._datetime_bounds()
+
+        # Only show events in the future
+        future_occurrences = EventOccurrence.objects.filter(
+            event=OuterRef("pk"),
+            end__gt=timezone.now(),
+        )
+        queryset = queryset.filter(Exists(future_occurrences))
 
         if not datetime_from and not datetime_to:
-            return list_of_results
+            return queryset
 
-        date_match = []
-        for event in list_of_results:
-            added = False
+        date_match = Q()
+        if datetime_from:
+            date_match |= Q(end__gt=datetime_from)
+        if datetime_to:
+            date_match |= Q(start__lt=datetime_to)
+        matching_occurrences = EventOccurrence.objects.filter(date_match, event=OuterRef("pk"))
 
-            # Only show events in the future
-            final_date = sorted([x[1] for x in event.dates])[-1]
-            if final_date < timezone.now():
-                continue
+        return queryset.filter(Exists(matching_occurrences))
 
-            for date_set in event.dates:
-                if added:
-                    continue
-                if datetime_from:
-                    if datetime_from < date_set[1]:
-                        date_match.append(event)
-                        added = True
-                        continue
-                if datetime_to:
-                    if datetime_to > date_set[0]:
-                        date_match.append(event)
-                        added = True
-                        continue
-
-        return date_match
-
-    def _perform_distance_query(self, list_of_results: list):
-        """Do this in Python for now. It's expensive though."""
+    def _distance_params(self):
+        """The selected lat, long, lower and upper distance, or None if any are missing or bad."""
         lat_selected = self.request_get.get("location_lat", None)
         long_selected = self.request_get.get("location_long", None)
         distance_lower = self.request_get.get("distance_lower", None)
@@ -375,21 +479,55 @@ class FilterQueryProcessor:
 
         if not lat_selected or not long_selected or not distance_lower or not distance_upper:
             if distance_lower != 0:
-                return list_of_results
+                return None
 
         try:
-            lat_selected = float(lat_selected)
-            long_selected = float(long_selected)
-            distance_lower = int(distance_lower)
-            distance_upper = int(distance_upper)
+            return (
+                float(lat_selected),
+                float(long_selected),
+                int(distance_lower),
+                int(distance_upper),
+            )
         except ValueError:
-            return list_of_results
+            return None
 
-        return [
-            x
-            for x in list_of_results
-            if distance_lower <= x.distance_from(lat_selected, long_selected) <= distance_upper
-        ]
+    def _perform_distance_query(
+        self,
+        queryset: QuerySet,
+        query_obj: Type[Union[Event, Place]] = None,
+    ):
+        """
+        Filter places, or events through their places, by distance from the selected location.
+
+        The indexed place coordinates are narrowed down with a bounding box first and the
+        distance is then checked in the database. With SEARCH_DISTANCE_EXACT, only the few places
+        near the edge of the range are pulled into Python for their geodesic distance. query_obj
+        says which type the rows are when the queryset is of search documents.
+        """
+        distance_params = self._distance_params()
+        if distance_params is None:
+            return queryset
+        lat_selected, long_selected, distance_lower, distance_upper = distance_params
+
+        if (query_obj or queryset.model) == Place:
+            return filter_by_distance(
+                queryset,
+                lat_selected,
+                long_selected,
+                distance_lower,
+                distance_upper,
+                exact=settings.SEARCH_DISTANCE_EXACT,
+            )
+
+        places_in_range = filter_by_distance(
+            Place.objects.filter(event=OuterRef("pk")),
+            lat_selected,
+            long_selected,
+            distance_lower,
+            distance_upper,
+            exact=settings.SEARCH_DISTANCE_EXACT,
+        )
+        return queryset.filter(Exists(places_in_range))
 
     def _get_base_queryset(self, query_obj: Type[Union[Activity, Event, Place]]):
         """Gets the base queryset either for all results or the users wishlist."""
@@ -413,30 +551,220 @@ class FilterQueryProcessor:
 
         return queryset
 
-    def _get_results_for_object_type(self, query_obj: Type[Union[Activity, Event, Place]]):
-        """Run the query and get the results for each type."""
-        queryset = self._get_base_queryset(query_obj)
+    def _get_document_base_queryset(self, query_obj: Type[Union[Activity, Event, Place]]):
+        """Gets the base queryset of search documents for a type, limited as _get_base_queryset."""
+        queryset = SearchDocument.objects.filter(entity_type=query_obj.__name__)
+        if not self.wishlist_user:
+            if not settings.SEARCH_SHOW_UNMODERATED_RESULTS:
+                queryset = queryset.filter(approved=True)
+            return queryset
+        return queryset.filter(id__in=self._get_base_queryset(query_obj).values("id"))
+
+    def _get_queryset_for_object_type(self, query_obj: Type[Union[Activity, Event, Place]]):
+        """Build the filtered queryset of search documents for each type."""
+        queryset = self._get_document_base_queryset(query_obj)
         queryset = self._append_slider_queries(queryset)
         queryset = self._append_search_queries(queryset)
         queryset = self._append_null_boolean_filter_queries(queryset)
 
-        # These bits are done in Python until I can figure out how to use the SQL better
-        # Making them more computationally expensive
-        # Do them last so they have a smaller qs to work with
-        list_of_results = list(queryset.all())
         if query_obj == Event:
-            list_of_results = self._perform_datetime_query(list_of_results)
+            queryset = self._perform_datetime_query(queryset)
         if query_obj in [Event, Place]:
-            list_of_results = self._perform_distance_query(list_of_results)
+            queryset = self._perform_distance_query(queryset, query_obj)
 
-        return list_of_results
+        return queryset
+
+    def _get_result_rank(self):
+        """The search rank of keyword searches, all results rank equally otherwise."""
+        if self.request_get.get("keywords"):
+            return Coalesce(F("search_rank"), 0.0)
+        return Value(0.0, output_field=FloatField())
 
-    def get_results(self):
-        """Return all results."""
-        all_results = []
+    def _get_union_queryset(self, seed: str):
+        """
+        Combine the filtered search documents for every required type into one UNION ALL query.
 
+        Each row is annotated with its search rank and a sort key seeded by the md5 of the seed
+        and id, so the ordering and any limit are applied in the database.
+        """
+        querysets = []
         for obj_type in self._types_required():
-            all_results += list(self._get_results_for_object_type(obj_type))
-        random.shuffle(all_results)
+            querysets.append(
+                self._get_queryset_for_object_type(obj_type).annotate(
+                    result_rank=self._get_result_rank(),
+                    sort_key=MD5(Concat(Value(seed), Cast("id", output_field=CharField()))),
+                ),
+            )
+        return querysets[0].union(*querysets[1:], all=True).order_by("-result_rank", "sort_key")
+
+    def _get_snapshot(self):
+        """
+        The catalogue snapshot, if this search can be answered from it.
+
+        Keyword searches need the search vectors and wishlists need the user's wishlist, so they
+        always go to the database, as do searches made while the snapshot is out of date.
+        """
+        if self.wishlist_user or self.request_get.get("keywords"):
+            return None
+        return get_current_snapshot()
 
-        return all_results
+    def _get_snapshot_mask(self, snapshot: CatalogueSnapshot):
+        """
+        Evaluate the slider, filter, datetime and distance stages against the snapshot.
+
+        Each stage is a vectorised mask over every row, matching the rules of the queryset
+        stages above. The selected filters are ANDed together as bitmaps first.
+        """
+        filter_bitmap = snapshot.filter_index.match(self._required_filters())
+        if filter_bitmap is None:
+            mask = np.ones(len(snapshot), dtype=bool)
+        else:
+            mask = unpack_rows(filter_bitmap, len(snapshot))
+        if not settings.SEARCH_SHOW_UNMODERATED_RESULTS:
+            mask &= snapshot["approved"]
+        for lower_field, upper_field, lower_selected, upper_selected in self._slider_bounds():
+            lower_bounds, upper_bounds = snapshot[lower_field], snapshot[upper_field]
+            if float(lower_selected) <= float(upper_selected):
+                # Entity bounds saved the wrong way round are swapped, as in SliderRange.
+                lower_bounds, upper_bounds = (
+                    np.fmin(lower_bounds, upper_bounds),
+                    np.fmax(lower_bounds, upper_bounds),
+                )
+            mask &= upper_bounds >= float(lower_selected)
+            mask &= lower_bounds <= float(upper_selected)
+
+        type_mask = np.zeros(len(snapshot), dtype=bool)
+        for obj_type in self._types_required():
+            type_mask |= snapshot["entity_type"] == SEARCH_DOCUMENT_ENTITY_TYPES.index(
+                obj_type.__name__,
+            )
+        mask &= type_mask
+
+        is_event = snapshot["entity_type"] == SEARCH_DOCUMENT_ENTITY_TYPES.index("Event")
+        is_place = snapshot["entity_type"] == SEARCH_DOCUMENT_ENTITY_TYPES.index("Place")
+        datetime_from, datetime_to = self._datetime_bounds()
+        event_dates_match = snapshot["date_end"] > timezone.now().timestamp()
+        if datetime_from or datetime_to:
+            date_match = np.zeros(len(snapshot), dtype=bool)
+            if datetime_from:
+                date_match |= snapshot["date_end"] > datetime_from.timestamp()
+            if datetime_to:
+                date_match |= snapshot["date_start"] < datetime_to.timestamp()
+            event_dates_match &= date_match
+        mask &= ~is_event | event_dates_match
+
+        distance_params = self._distance_params()
+        if distance_params is not None:
+            # Only the grid cells around the location are looked at.
+            distance_range = [*distance_params, settings.SEARCH_DISTANCE_EXACT]
+            in_range = np.zeros(len(snapshot), dtype=bool)
+            in_range[snapshot.place_grid.within(*distance_range)] = True
+            # Events are in range if any of their places are.
+            events_in_range = np.zeros(len(snapshot), dtype=bool)
+            events_in_range[
+                snapshot["event_place_rows"][snapshot.event_place_grid.within(*distance_range)]
+            ] = True
+            mask &= (is_place & in_range) | (is_event & events_in_range) | ~(is_place | is_event)
+
+        return mask
+
+    def _get_snapshot_result_ids(self, snapshot: CatalogueSnapshot):
+        """The (id, search rank) of every result, from the snapshot."""
+        return [(entity_id, 0.0) for entity_id in snapshot.ids(self._get_snapshot_mask(snapshot))]
+
+    def get_filter_counts(self):
+        """
+        How many of the results have each filter set to True, or None without a snapshot.
+
+        Each count is the popcount of the results ANDed with the filter's bitmap.
+        """
+        snapshot = self._get_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.filter_index.counts(pack_rows(self._get_snapshot_mask(snapshot)))
+
+    def get_results_page(self, seed: str, page_number=1, page_size=SEARCH_RESULTS_PAGE_SIZE):
+        """
+        Return a single page of SearchDocuments, shuffled in an order that is fixed by the seed.
+
+        All of the required types are searched in a single query against the search document
+        table, which returns only the requested page of rows with everything a card needs.
+        Reusing the seed for the following pages keeps the "random" order consistent as the user
+        scrolls. Keyword searches are ordered by search rank first, with the seed only breaking
+        ties. Searches the snapshot can answer are put in order once per seed and cached, so each
+        page only fetches its documents from the database.
+        """
+        if self._get_snapshot() is not None:
+            return self.get_results_page_for_ids(
+                get_cached_ordered_result_ids(self, seed),
+                page_number,
+                page_size,
+            )
+        return Paginator(self._get_union_queryset(seed), page_size).get_page(page_number)
+
+    def get_result_ids(self):
+        """The (id, search rank) of every result, in a single query, ready to be cached."""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return self._get_snapshot_result_ids(snapshot)
+        querysets = []
+        for obj_type in self._types_required():
+            querysets.append(
+                self._get_queryset_for_object_type(obj_type)
+                .annotate(result_rank=self._get_result_rank())
+                .values_list("id", "result_rank"),
+            )
+        return list(querysets[0].union(*querysets[1:], all=True))
+
+    @staticmethod
+    def order_result_ids(result_ids: list, seed: str):
+        """The entity ids from the output of get_result_ids, in the order of get_results_page."""
+        ordered_ids = sorted(
+            result_ids,
+            key=lambda result_id: (-result_id[1], seeded_sort_key(seed, result_id[0])),
+        )
+        return [entity_id for entity_id, _ in ordered_ids]
+
+    @staticmethod
+    def get_results_page_for_ids(
+        ordered_ids: list,
+        page_number=1,
+        page_size=SEARCH_RESULTS_PAGE_SIZE,
+    ):
+        """
+        Return a single page of SearchDocuments from the output of order_result_ids.
+
+        The ids are already in order, so only the documents for the requested page are fetched.
+        """
+        page = Paginator(ordered_ids, page_size).get_page(page_number)
+        documents = SearchDocument.objects.in_bulk(page.object_list)
+        page.object_list = [
+            documents[entity_id] for entity_id in page.object_list if entity_id in documents
+        ]
+        return page
+
+    @staticmethod
+    def get_wishlist_ids(user, results: list):
+        """
+        Work out which of the results are in the user's wishlist in one query per type.
+
+        Returns a set of ids per entity type name, ready for the is_in_users_wishlist tag.
+        """
+        wishlist_ids = {"Activity": set(), "Event": set(), "Place": set()}
+        if not user or isinstance(user, AnonymousUser):
+            return wishlist_ids
+
+        ids_by_type = {}
+        for result in results:
+            ids_by_type.setdefault(result.class_name, []).append(result.id)
+
+        wishlists = {
+            "Activity": user.wishlist_activities,
+            "Event": user.wishlist_events,
+            "Place": user.wishlist_places,
+        }
+        for class_name, entity_ids in ids_by_type.items():
+            wishlist_ids[class_name] = set(
+                wishlists[class_name].filter(id__in=entity_ids).values_list("id", flat=True),
+            )
+        return wishlist_ids
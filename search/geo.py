@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Geographic queries for the distance search, in the database and over arrays.
+
+Distances are haversine distances on a sphere, which are within half a percent of the geodesic
+distance on the WGS-84 ellipsoid. Exact searches settle the rows close enough to a bound for that
+error to matter with geopy's geodesic distance, which is far slower but only needed for a few rows.
+"""
+
+# Standard Library
+import math
+
+# 3rd-party
+import numpy as np
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.db.models import Value
+from django.db.models.functions import ASin
+from django.db.models.functions import Cos
+from django.db.models.functions import Least
+from django.db.models.functions import Power
+from django.db.models.functions import Radians
+from django.db.models.functions import Sin
+from django.db.models.functions import Sqrt
+from geopy.distance import distance
+
+# Project
+from search.constants import EARTH_RADIUS_MILES
+from search.constants import GEODESIC_REFINEMENT_MARGIN
+
+
+def bounding_box(lat: float, long: float, radius_miles: float):
+    """
+    The lat / long box that contains every point within radius_miles.
+
+    Returns the min and max latitude and a list of (min, max) longitude ranges, or None for the
+    longitudes if every longitude is in range. The box errs on the side of being too big. It is
+    widened to the poles when the circle reaches one, and split in two when it crosses the
+    antimeridian.
+    """
+    angular_radius = radius_miles / EARTH_RADIUS_MILES
+    min_lat = lat - math.degrees(angular_radius)
+    max_lat = lat + math.degrees(angular_radius)
+
+    # If the circle contains a pole, every longitude is in range.
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), None
+
+    # Widest longitude offset reached by the circle, which is wider than the offset at lat itself.
+    ratio = math.sin(angular_radius) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return min_lat, max_lat, None
+    long_delta = math.degrees(math.asin(ratio))
+    min_long = long - long_delta
+    max_long = long + long_delta
+
+    if min_long < -180:
+        return min_lat, max_lat, [(min_long + 360, 180), (-180, max_long)]
+    if max_long > 180:
+        return min_lat, max_lat, [(min_long, 180), (-180, max_long - 360)]
+    return min_lat, max_lat, [(min_long, max_long)]
+
+
+def bounding_box_query(
+    lat: float,
+    long: float,
+    radius_miles: float,
+    lat_field: str = "location_lat",
+    long_field: str = "location_long",
+):
+    """Build a Q object for the bounding_box, a prefilter that the (lat, long) index can serve."""
+    min_lat, max_lat, long_ranges = bounding_box(lat, long, radius_miles)
+    query = Q(**{f"{lat_field}__gte": min_lat, f"{lat_field}__lte": max_lat})
+    if long_ranges is None:
+        return query
+
+    long_query = Q()
+    for min_long, max_long in long_ranges:
+        long_query |= Q(**{f"{long_field}__gte": min_long, f"{long_field}__lte": max_long})
+    return query & long_query
+
+
+def great_circle_distance(
+    lat: float,
+    long: float,
+    lat_field: str = "location_lat",
+    long_field: str = "location_long",
+):
+    """An expression for the haversine distance in miles between a row and a fixed point."""
+    half_delta_lat = (Radians(F(lat_field)) - math.radians(lat)) / 2
+    half_delta_long = (Radians(F(long_field)) - math.radians(long)) / 2
+    haversine = Power(Sin(half_delta_lat), 2) + Cos(Radians(F(lat_field))) * math.cos(
+        math.radians(lat),
+    ) * Power(Sin(half_delta_long), 2)
+    # Floating point error can push the haversine a hair over 1 for antipodal points.
+    return 2 * EARTH_RADIUS_MILES * ASin(Sqrt(Least(haversine, Value(1.0))))
+
+
+def _refinement_bounds(distance_lower: float, distance_upper: float):
+    """The distances around each bound where rows are settled by their geodesic distance."""
+    return [
+        (bound * (1 - GEODESIC_REFINEMENT_MARGIN), bound * (1 + GEODESIC_REFINEMENT_MARGIN))
+        for bound in [distance_lower, distance_upper]
+    ]
+
+
+def _geodesically_out_of_range(
+    model,
+    lat: float,
+    long: float,
+    distance_lower: float,
+    distance_upper: float,
+    lat_field: str,
+    long_field: str,
+):
+    """The pks of the model's rows near a bound whose geodesic distance is out of range."""
+    near_bounds = Q()
+    for lower, upper in _refinement_bounds(distance_lower, distance_upper):
+        near_bounds |= Q(distance__gte=lower, distance__lte=upper)
+    rows = list(
+        model.objects.filter(
+            bounding_box_query(
+                lat,
+                long,
+                distance_upper * (1 + GEODESIC_REFINEMENT_MARGIN),
+                lat_field,
+                long_field,
+            ),
+        )
+        .alias(distance=great_circle_distance(lat, long, lat_field, long_field))
+        .filter(near_bounds)
+        .values_list("pk", lat_field, long_field),
+    )
+    if not rows:
+        return []
+    pks, lats, longs = zip(*rows)
+    distances = geodesic_miles(lat, long, lats, longs)
+    in_range = (distances >= distance_lower) & (distances <= distance_upper)
+    return [pk for pk, row_in_range in zip(pks, in_range) if not row_in_range]
+
+
+def filter_by_distance(
+    queryset: QuerySet,
+    lat: float,
+    long: float,
+    distance_lower: float,
+    distance_upper: float,
+    lat_field: str = "location_lat",
+    long_field: str = "location_long",
+    exact: bool = False,
+):
+    """
+    Filter a queryset of located rows to those between distance_lower and distance_upper.
+
+    If exact, rows near a bound are settled by their geodesic distance. Those rows are looked up
+    across the whole table when the filter is built, so the queryset can still be a correlated
+    subquery.
+    """
+    if not exact:
+        return (
+            queryset.filter(bounding_box_query(lat, long, distance_upper, lat_field, long_field))
+            .alias(distance=great_circle_distance(lat, long, lat_field, long_field))
+            .filter(distance__gte=distance_lower, distance__lte=distance_upper)
+        )
+
+    (widest_lower, _), (_, widest_upper) = _refinement_bounds(distance_lower, distance_upper)
+    return (
+        queryset.filter(bounding_box_query(lat, long, widest_upper, lat_field, long_field))
+        .alias(distance=great_circle_distance(lat, long, lat_field, long_field))
+        .filter(distance__gte=widest_lower, distance__lte=widest_upper)
+        .exclude(
+            pk__in=_geodesically_out_of_range(
+                queryset.model,
+                lat,
+                long,
+                distance_lower,
+                distance_upper,
+                lat_field,
+                long_field,
+            ),
+        )
+    )
+
+
+def haversine_miles(lat: float, long: float, lats, longs):
+    """
+    The haversine distance in miles between a fixed point and arrays of coordinates.
+
+    This is the same formula as great_circle_distance, so the snapshot and database agree on which
+    rows are in range. Rows with no coordinates are NaN.
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    half_delta_lat = (lats - math.radians(lat)) / 2
+    half_delta_long = (np.radians(np.asarray(longs, dtype=np.float64)) - math.radians(long)) / 2
+    haversine = np.sin(half_delta_lat) ** 2 + np.cos(lats) * math.cos(math.radians(lat)) * (
+        np.sin(half_delta_long) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(haversine, 1.0)))
+
+
+def geodesic_miles(lat: float, long: float, lats, longs):
+    """
+    The WGS-84 geodesic distance in miles between a fixed point and arrays of coordinates.
+
+    Each row is a separate geopy calculation, so only use it for a few rows.
+    """
+    return np.array(
+        [
+            distance((lat, long), (row_lat, row_long)).miles
+            if not (np.isnan(row_lat) or np.isnan(row_long))
+            else np.nan
+            for row_lat, row_long in zip(
+                np.asarray(lats, dtype=np.float64),
+                np.asarray(longs, dtype=np.float64),
+            )
+        ],
+        dtype=np.float64,
+    )
+
+
+def distances_miles(lat: float, long: float, lats, longs, exact_near: list = ()):
+    """
+    The distance in miles between a fixed point and arrays of coordinates, for a whole batch.
+
+    Every row gets its haversine distance. Rows close enough to one of the distances in exact_near
+    for the spherical error to change which side of it they are on get their geodesic distance
+    instead, so comparisons against those distances are exact. Rows with no coordinates are NaN.
+    """
+    distances = haversine_miles(lat, long, lats, longs)
+    near = np.zeros(len(distances), dtype=bool)
+    for bound in exact_near:
+        near |= np.abs(distances - bound) <= bound * GEODESIC_REFINEMENT_MARGIN
+    rows = np.flatnonzero(near)
+    if len(rows):
+        distances[rows] = geodesic_miles(
+            lat,
+            long,
+            np.asarray(lats, dtype=np.float64)[rows],
+            np.asarray(longs, dtype=np.float64)[rows],
+        )
+    return distances
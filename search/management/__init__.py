@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Management commands for the search app."""
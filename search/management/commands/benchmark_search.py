@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Benchmark FilterQueryProcessor against seeded catalogues of different sizes."""
+
+# Standard Library
+import json
+
+# 3rd-party
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+
+# Project
+from search.benchmarks import SearchBenchmark
+from search.benchmarks import compare_to_baseline
+from search.benchmarks import seed_catalogue
+from search.cache import bump_search_version
+
+
+class Command(BaseCommand):
+    """
+    Seed a catalogue for each size, time the search stages against it and roll it back.
+
+    Results are written as JSON, keyed by catalogue size then stage, so they can be kept as a
+    baseline and passed back in with --baseline to check for regressions.
+    """
+
+    help = "Time the search stages against seeded catalogues."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument("--output", help="File to write the JSON results to.")
+        parser.add_argument("--baseline", help="JSON results from a previous run to compare to.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=1.2,
+            help="How many times slower than the baseline a stage can be before failing.",
+        )
+
+    def handle(self, *args, **options):  # noqa: D102
+        results = {}
+        for size in options["sizes"]:
+            with transaction.atomic():
+                seed_catalogue(size)
+                results[str(size)] = SearchBenchmark(repeats=options["repeats"]).run()
+                transaction.set_rollback(True)
+            # Results cached for the rolled back catalogue must not be used again.
+            bump_search_version()
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                output_file.write(output)
+        self.stdout.write(output)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_to_baseline(results, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Search performance regressed:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions against the baseline.")
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the SearchDocument table from the search entities."""
+
+# 3rd-party
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Project
+from search.cache import bump_search_version
+from search.models import SearchDocument
+from search.tasks import build_catalogue_snapshot
+
+
+class Command(BaseCommand):
+    """Rebuild every search document."""
+
+    help = "Delete and rebuild every SearchDocument from the Activities, Events and Places."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):  # noqa: D102
+        SearchDocument.rebuild(batch_size=options["batch_size"])
+        bump_search_version()
+        # The rebuilt documents are older than the rebuild's commit, so an update would miss them.
+        if settings.SEARCH_SNAPSHOT_DIR:
+            build_catalogue_snapshot.delay(full=True)
+        self.stdout.write(f"Rebuilt {SearchDocument.objects.count()} search documents.")
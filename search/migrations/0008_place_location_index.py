@@ -0,0 +1,21 @@
+# Generated by Django 4.0.4 on 2026-10-17 15:49
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0007_alter_searchimage_uploaded_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="place",
+            index=models.Index(
+                fields=["location_lat", "location_long"], name="search_place_location_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.4 on 2026-10-17 15:52
+
+# 3rd-party
+import django.db.models.deletion
+from django.db import migrations
+from django.db import models
+
+
+def populate_event_occurrences(apps, schema_editor):
+    """Create occurrence rows for the dates of every existing event."""
+    Event = apps.get_model("search", "Event")
+    EventOccurrence = apps.get_model("search", "EventOccurrence")
+    for event in Event.objects.only("id", "dates").iterator():
+        EventOccurrence.objects.bulk_create(
+            [EventOccurrence(event=event, start=start, end=end) for start, end in event.dates],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0008_place_location_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("start", models.DateTimeField(db_index=True)),
+                ("end", models.DateTimeField(db_index=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="search.event",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(populate_event_occurrences, migrations.RunPython.noop),
+    ]
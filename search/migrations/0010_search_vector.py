@@ -0,0 +1,87 @@
+# Generated by Django 4.0.4 on 2026-10-17 15:58
+
+# 3rd-party
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db import models
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Build the search vector for every existing entity."""
+    keywords = models.Func(
+        models.F("synonyms_keywords"),
+        models.Value(" "),
+        function="array_to_string",
+        output_field=models.TextField(),
+    )
+    search_vector = (
+        SearchVector("headline", weight="A", config="english")
+        + SearchVector(keywords, weight="B", config="english")
+        + SearchVector("description", weight="C", config="english")
+    )
+    for model_name in ["Activity", "Event", "Place"]:
+        apps.get_model("search", model_name).objects.update(search_vector=search_vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0009_eventoccurrence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activity",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="activity",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="search_activity_search_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activity",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["synonyms_keywords"], name="search_activity_synonyms_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="search_event_search_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["synonyms_keywords"], name="search_event_synonyms_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="place",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="search_place_search_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="place",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["synonyms_keywords"], name="search_place_synonyms_idx"
+            ),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
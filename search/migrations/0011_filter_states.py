@@ -0,0 +1,76 @@
+# Generated by Django 4.0.4 on 2026-10-17 15:59
+
+# 3rd-party
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations
+from django.db import models
+
+# Project
+from search.constants import FILTERS
+
+
+def populate_filter_states(apps, schema_editor):
+    """Build the filter states for every existing entity from its attributes."""
+    all_filters = {filter_name for filter_list in FILTERS.values() for filter_name in filter_list}
+    for model_name in ["Activity", "Event", "Place"]:
+        model = apps.get_model("search", model_name)
+        entities = []
+        for entity in model.objects.only("id", "attributes").iterator():
+            entity.filter_states = sorted(
+                f"{filter_name}={value}"
+                for filter_name, value in (entity.attributes or {}).items()
+                if filter_name in all_filters
+            )
+            entities.append(entity)
+        model.objects.bulk_update(entities, ["filter_states"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0010_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activity",
+            name="filter_states",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=256), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="filter_states",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=256), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="filter_states",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=256), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activity",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["filter_states"], name="search_activity_filters_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["filter_states"], name="search_event_filters_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="place",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["filter_states"], name="search_place_filters_idx"
+            ),
+        ),
+        migrations.RunPython(populate_filter_states, migrations.RunPython.noop),
+    ]
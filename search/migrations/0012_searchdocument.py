@@ -0,0 +1,167 @@
+# Generated by Django 4.0.4 on 2026-10-17 16:01
+
+# 3rd-party
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db import models
+
+# Project
+from search.constants import FILTERS
+
+
+def populate_search_documents(apps, schema_editor):
+    """Build a search document for every existing entity."""
+    all_filters = {filter_name for filter_list in FILTERS.values() for filter_name in filter_list}
+    SearchDocument = apps.get_model("search", "SearchDocument")
+
+    for model_name in ["Activity", "Event", "Place"]:
+        queryset = apps.get_model("search", model_name).objects.prefetch_related("images")
+        if model_name == "Event":
+            queryset = queryset.prefetch_related("places")
+        documents = []
+        for entity in queryset.iterator(chunk_size=500):
+            attributes = entity.attributes or {}
+            images = sorted(entity.images.all(), key=lambda image: image.pk)
+            image_url = None
+            if images:
+                image_url = (
+                    images[0].uploaded_image.url if images[0].uploaded_image else images[0].link_url
+                )
+            document = SearchDocument(
+                id=entity.id,
+                entity_type=model_name,
+                approved=entity.approved_by_id is not None,
+                headline=entity.headline,
+                description=entity.description,
+                price_lower=entity.price_lower,
+                price_upper=entity.price_upper,
+                duration_lower=entity.duration_lower,
+                duration_upper=entity.duration_upper,
+                people_lower=entity.people_lower,
+                people_upper=entity.people_upper,
+                source_type=entity.source_type,
+                synonyms_keywords=entity.synonyms_keywords,
+                filter_states=sorted(
+                    f"{filter_name}={value}"
+                    for filter_name, value in attributes.items()
+                    if filter_name in all_filters
+                ),
+                active_filters=[
+                    filter_name for filter_name, value in attributes.items() if value == "True"
+                ],
+                image_url=image_url,
+            )
+            if model_name == "Place":
+                document.location_lat = entity.location_lat
+                document.location_long = entity.location_long
+            if model_name == "Event":
+                places = sorted(entity.places.all(), key=lambda place: place.pk)
+                if places:
+                    document.location_lat = places[0].location_lat
+                    document.location_long = places[0].location_long
+                if entity.dates:
+                    document.date_start = min(start for start, _end in entity.dates)
+                    document.date_end = max(end for _start, end in entity.dates)
+            documents.append(document)
+        SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+    keywords = models.Func(
+        models.F("synonyms_keywords"),
+        models.Value(" "),
+        function="array_to_string",
+        output_field=models.TextField(),
+    )
+    SearchDocument.objects.update(
+        search_vector=(
+            SearchVector("headline", weight="A", config="english")
+            + SearchVector(keywords, weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0011_filter_states"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                ("id", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                (
+                    "entity_type",
+                    models.CharField(
+                        choices=[("Activity", "Activity"), ("Event", "Event"), ("Place", "Place")],
+                        max_length=32,
+                    ),
+                ),
+                ("approved", models.BooleanField(default=False)),
+                ("headline", models.CharField(max_length=2048)),
+                ("description", models.TextField()),
+                ("price_lower", models.FloatField()),
+                ("price_upper", models.FloatField()),
+                ("duration_lower", models.IntegerField()),
+                ("duration_upper", models.IntegerField()),
+                ("people_lower", models.IntegerField()),
+                ("people_upper", models.IntegerField()),
+                ("source_type", models.CharField(max_length=256)),
+                (
+                    "synonyms_keywords",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=1024),
+                        blank=True,
+                        null=True,
+                        size=None,
+                    ),
+                ),
+                ("search_vector", django.contrib.postgres.search.SearchVectorField(null=True)),
+                (
+                    "filter_states",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=256), default=list, size=None
+                    ),
+                ),
+                (
+                    "active_filters",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=256), default=list, size=None
+                    ),
+                ),
+                ("image_url", models.CharField(blank=True, max_length=2048, null=True)),
+                ("location_lat", models.FloatField(null=True)),
+                ("location_long", models.FloatField(null=True)),
+                ("date_start", models.DateTimeField(null=True)),
+                ("date_end", models.DateTimeField(null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["entity_type", "approved"], name="search_document_type_idx"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="search_document_search_idx"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["synonyms_keywords"], name="search_document_synonyms_idx"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["filter_states"], name="search_document_filters_idx"
+                    ),
+                    models.Index(
+                        fields=["location_lat", "location_long"],
+                        name="search_document_location_idx",
+                    ),
+                    models.Index(
+                        fields=["date_start", "date_end"], name="search_document_dates_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
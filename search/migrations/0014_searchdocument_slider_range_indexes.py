@@ -0,0 +1,39 @@
+# Generated by Django 4.0.4 on 2026-10-17 19:03
+
+# 3rd-party
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+# Project
+import search.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0013_searchdocument_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="searchdocument",
+            index=django.contrib.postgres.indexes.GistIndex(
+                search.models.SliderRange("price"),
+                name="search_document_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchdocument",
+            index=django.contrib.postgres.indexes.GistIndex(
+                search.models.SliderRange("duration"),
+                name="search_document_duration_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchdocument",
+            index=django.contrib.postgres.indexes.GistIndex(
+                search.models.SliderRange("people"),
+                name="search_document_people_idx",
+            ),
+        ),
+    ]
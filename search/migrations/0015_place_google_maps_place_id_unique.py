@@ -0,0 +1,40 @@
+# Generated by Django 4.0.4 on 2026-10-17 21:12
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+def clear_duplicate_google_maps_place_ids(apps, schema_editor):
+    """Keep the Google Maps place ID on the oldest place with it, and clear it on the others."""
+    place_model = apps.get_model("search", "Place")
+    seen = set()
+    duplicates = []
+    places = place_model.objects.exclude(google_maps_place_id__isnull=True).exclude(
+        google_maps_place_id="",
+    )
+    for place in places.only("id", "google_maps_place_id").order_by("creation_timestamp", "id"):
+        if place.google_maps_place_id in seen:
+            place.google_maps_place_id = None
+            duplicates.append(place)
+        seen.add(place.google_maps_place_id)
+    place_model.objects.bulk_update(duplicates, ["google_maps_place_id"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0014_searchdocument_slider_range_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_google_maps_place_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="place",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("google_maps_place_id", ""), _negated=True),
+                fields=("google_maps_place_id",),
+                name="search_place_google_maps_place_id_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.0.4 on 2026-10-17 22:05
+
+# 3rd-party
+from django.db import migrations
+from django.db import models
+
+
+def store_uploaded_image_names(apps, schema_editor):
+    """Store the names of uploaded primary images, rather than URLs that can expire."""
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    for model_name in ["Activity", "Event", "Place"]:
+        entity_field = f"{model_name.lower()}_id"
+        links = (
+            apps.get_model("search", model_name)
+            .images.through.objects.order_by(entity_field, "searchimage_id")
+            .values_list(entity_field, "searchimage__uploaded_image")
+        )
+        primary_image_names = {}
+        for entity_id, image_name in links.iterator(chunk_size=2000):
+            primary_image_names.setdefault(entity_id, image_name)
+        for entity_id, image_name in primary_image_names.items():
+            if image_name:
+                SearchDocument.objects.filter(id=entity_id).update(
+                    image_name=image_name,
+                    image_link_url=None,
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0015_place_google_maps_place_id_unique"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="searchdocument",
+            old_name="image_url",
+            new_name="image_link_url",
+        ),
+        migrations.AddField(
+            model_name="searchdocument",
+            name="image_name",
+            field=models.CharField(blank=True, max_length=2048, null=True),
+        ),
+        migrations.RunPython(store_uploaded_image_names, migrations.RunPython.noop),
+    ]
@@ -7,16 +7,54 @@ from datetime import datetime
 
 # 3rd-party
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import DecimalRangeField
 from django.contrib.postgres.fields import HStoreField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import Q
 from django.utils import timezone
 from geopy.distance import distance
 
 # Project
+from search.constants import FILTERS
+from search.constants import SEARCH_CONFIG
+from search.constants import SEARCH_DOCUMENT_ENTITY_TYPES
 from search.constants import SEARCH_ENTITY_SOURCES
 from users.models import CustomUser
 
+ALL_FILTERS = {filter_name for filter_list in FILTERS.values() for filter_name in filter_list}
+
+
+def filter_state(filter_name: str, value):
+    """The entry in SearchEntity.filter_states for a filter attribute and its value."""
+    return f"{filter_name}={value}"
+
+
+class SliderRange(Func):
+    """
+    The closed numrange between a slider's lower and upper columns, e.g. price_lower/price_upper.
+
+    The search documents index this expression, so slider overlap queries use a GiST index rather
+    than comparing both columns of every row. Bounds saved the wrong way round are swapped, so
+    they build a valid range rather than failing to save.
+    """
+
+    function = "numrange"
+    template = (
+        "%(function)s(LEAST(%(expressions)s)::numeric, GREATEST(%(expressions)s)::numeric, '[]')"
+    )
+    output_field = DecimalRangeField()
+
+    def __init__(self, slider: str):  # noqa: D107
+        super().__init__(F(f"{slider}_lower"), F(f"{slider}_upper"))
+
 
 def search_image_upload_path(instance, filename):
     """Change the filename of an image on upload."""
@@ -105,9 +143,16 @@ class SearchEntity(models.Model):
     )
     images = models.ManyToManyField(SearchImage)
     attributes = HStoreField()
+    search_vector = SearchVectorField(null=True, editable=False)
+    filter_states = ArrayField(models.CharField(max_length=256), default=list, editable=False)
 
     class Meta:  # noqa: D106
         abstract = True
+        indexes = [
+            GinIndex(fields=["search_vector"], name="%(app_label)s_%(class)s_search_idx"),
+            GinIndex(fields=["synonyms_keywords"], name="%(app_label)s_%(class)s_synonyms_idx"),
+            GinIndex(fields=["filter_states"], name="%(app_label)s_%(class)s_filters_idx"),
+        ]
 
     def clean_synonyms_keywords(self):
         """Make all synonyms lower case."""
@@ -115,10 +160,49 @@ class SearchEntity(models.Model):
             self.synonyms_keywords = [x.lower() for x in self.synonyms_keywords]
 
     def save(self, **kwargs):
-        """Call clean method on save."""
+        """Call clean method on save and keep the derived search fields up to date."""
         self.clean_synonyms_keywords()
+        self.search_vector = self.build_search_vector()
+        self.filter_states = self.build_filter_states()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {"headline", "description", "synonyms_keywords"} & update_fields:
+                update_fields.add("search_vector")
+            if "attributes" in update_fields:
+                update_fields.add("filter_states")
+            kwargs["update_fields"] = update_fields
         super(SearchEntity, self).save(**kwargs)
 
+    def build_search_vector(self):
+        """
+        The weighted tsvector stored against the entity for keyword searches.
+
+        Headline matches rank above synonyms, which rank above the description.
+        """
+        return (
+            SearchVector(models.Value(self.headline), weight="A", config=SEARCH_CONFIG)
+            + SearchVector(
+                models.Value(" ".join(self.synonyms_keywords or [])),
+                weight="B",
+                config=SEARCH_CONFIG,
+            )
+            + SearchVector(models.Value(self.description), weight="C", config=SEARCH_CONFIG)
+        )
+
+    def build_filter_states(self):
+        """
+        The filter attributes as "<filter>=<value>" strings.
+
+        Stored in an indexed array so that any number of selected filters can be matched with a
+        single containment query, rather than one HStore lookup per filter.
+        """
+        return sorted(
+            filter_state(filter_name, value)
+            for filter_name, value in (self.attributes or {}).items()
+            if filter_name in ALL_FILTERS
+        )
+
     @property
     def active_filters(self):
         """Returns the list of active filters as strings."""
@@ -133,6 +217,16 @@ class SearchEntity(models.Model):
         """Return the class name."""
         return self.__class__.__name__
 
+    @property
+    def primary_image(self):
+        """
+        The image shown on the entity's card.
+
+        Equivalent to images.first(), but reads from prefetched images when they are available.
+        """
+        images = sorted(self.images.all(), key=lambda image: image.pk)
+        return images[0] if images else None
+
 
 class Activity(SearchEntity):
     """Something to do, without a specific date or place."""
@@ -150,6 +244,23 @@ class Place(SearchEntity):
     location_long = models.FloatField(null=True, max_length=40)
     activities = models.ManyToManyField(Activity)
 
+    class Meta(SearchEntity.Meta):  # noqa: D106
+        indexes = [
+            *SearchEntity.Meta.indexes,
+            models.Index(
+                fields=["location_lat", "location_long"],
+                name="search_place_location_idx",
+            ),
+        ]
+        constraints = [
+            # EventBrite events at the same venue are parsed concurrently, and share one place.
+            models.UniqueConstraint(
+                fields=["google_maps_place_id"],
+                condition=~Q(google_maps_place_id=""),
+                name="search_place_google_maps_place_id_unique",
+            ),
+        ]
+
     def __str__(self):
         """String representation."""
         return f"Place: {self.headline}"
@@ -173,9 +284,213 @@ class Event(SearchEntity):
         """String representation."""
         return f"Event: {self.headline}"
 
+    def save(self, **kwargs):
+        """Keep the occurrence rows in step with the dates on save."""
+        super(Event, self).save(**kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "dates" in update_fields:
+            self.sync_occurrences()
+
+    def sync_occurrences(self):
+        """Replace this event's EventOccurrence rows with one per start / end pair in dates."""
+        self.occurrences.all().delete()
+        EventOccurrence.objects.bulk_create(
+            [EventOccurrence(event=self, start=start, end=end) for start, end in self.dates],
+        )
+
     def distance_from(self, from_lat, from_long):
         """Distance from in this case should be from the place."""
         place = self.places.first()
         if not place:
             raise ValueError("This event does not have a place attached!")
         return place.distance_from(from_lat, from_long)
+
+
+class EventOccurrence(models.Model):
+    """
+    A single start / end pair from Event.dates.
+
+    Event.dates stays the source of truth, these rows are rebuilt from it whenever the event is
+    saved so that date range searches can use indexed columns instead of unpacking the array.
+    """
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="occurrences")
+    start = models.DateTimeField(db_index=True)
+    end = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        """String representation."""
+        return f"Event Occurrence: {self.event_id} {self.start} - {self.end}"
+
+
+class SearchDocument(models.Model):
+    """
+    A flat, read only copy of an Activity, Event or Place holding what searches and cards need.
+
+    The id is the id of the entity itself. Documents are kept up to date by the signals in
+    search.signals, and can be rebuilt in full with the rebuild_search_documents command.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    entity_type = models.CharField(
+        max_length=32,
+        choices=[(choice, choice) for choice in SEARCH_DOCUMENT_ENTITY_TYPES],
+    )
+    approved = models.BooleanField(default=False)
+    headline = models.CharField(max_length=2048)
+    description = models.TextField()
+    price_lower = models.FloatField()
+    price_upper = models.FloatField()
+    duration_lower = models.IntegerField()
+    duration_upper = models.IntegerField()
+    people_lower = models.IntegerField()
+    people_upper = models.IntegerField()
+    source_type = models.CharField(max_length=256)
+    synonyms_keywords = ArrayField(models.CharField(max_length=1024), null=True, blank=True)
+    search_vector = SearchVectorField(null=True)
+    filter_states = ArrayField(models.CharField(max_length=256), default=list)
+    active_filters = ArrayField(models.CharField(max_length=256), default=list)
+    # Uploaded images are stored by name, as their URLs can be signed and expire.
+    image_name = models.CharField(max_length=2048, null=True, blank=True)
+    image_link_url = models.CharField(max_length=2048, null=True, blank=True)
+    location_lat = models.FloatField(null=True)
+    location_long = models.FloatField(null=True)
+    date_start = models.DateTimeField(null=True)
+    date_end = models.DateTimeField(null=True)
+    # When the document last changed, so the catalogue snapshot only has to re-read changed rows.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:  # noqa: D106
+        indexes = [
+            models.Index(fields=["entity_type", "approved"], name="search_document_type_idx"),
+            GinIndex(fields=["search_vector"], name="search_document_search_idx"),
+            GinIndex(fields=["synonyms_keywords"], name="search_document_synonyms_idx"),
+            GinIndex(fields=["filter_states"], name="search_document_filters_idx"),
+            models.Index(
+                fields=["location_lat", "location_long"],
+                name="search_document_location_idx",
+            ),
+            models.Index(fields=["date_start", "date_end"], name="search_document_dates_idx"),
+            GistIndex(SliderRange("price"), name="search_document_price_idx"),
+            GistIndex(SliderRange("duration"), name="search_document_duration_idx"),
+            GistIndex(SliderRange("people"), name="search_document_people_idx"),
+        ]
+
+    def __str__(self):
+        """String representation."""
+        return f"Search Document: {self.entity_type}: {self.headline}"
+
+    @property
+    def class_name(self):
+        """The class name of the entity, so documents can stand in for entities on cards."""
+        return self.entity_type
+
+    @property
+    def image_url(self):
+        """The URL of the primary image, made when the card is rendered for uploaded images."""
+        if self.image_name:
+            return SearchImage._meta.get_field("uploaded_image").storage.url(self.image_name)
+        return self.image_link_url
+
+    @staticmethod
+    def document_fields(entity: SearchEntity):
+        """The field values of the document for an entity, apart from the search vector."""
+        primary_image = entity.primary_image
+        uploaded_image = primary_image.uploaded_image if primary_image else None
+        link_url = primary_image.link_url if primary_image and not uploaded_image else None
+        fields = {
+            "entity_type": entity.class_name,
+            "approved": entity.approved_by_id is not None,
+            "headline": entity.headline,
+            "description": entity.description,
+            "price_lower": entity.price_lower,
+            "price_upper": entity.price_upper,
+            "duration_lower": entity.duration_lower,
+            "duration_upper": entity.duration_upper,
+            "people_lower": entity.people_lower,
+            "people_upper": entity.people_upper,
+            "source_type": entity.source_type,
+            "synonyms_keywords": entity.synonyms_keywords,
+            "filter_states": entity.build_filter_states(),
+            # Attributes set since the entity was loaded can still be booleans rather than strings.
+            "active_filters": [
+                filter_name
+                for filter_name, value in (entity.attributes or {}).items()
+                if str(value) == "True"
+            ],
+            "image_name": uploaded_image.name if uploaded_image else None,
+            "image_link_url": link_url,
+            "location_lat": None,
+            "location_long": None,
+            "date_start": None,
+            "date_end": None,
+        }
+        if isinstance(entity, Place):
+            fields["location_lat"] = entity.location_lat
+            fields["location_long"] = entity.location_long
+        if isinstance(entity, Event):
+            places = sorted(entity.places.all(), key=lambda place: place.pk)
+            if places:
+                fields["location_lat"] = places[0].location_lat
+                fields["location_long"] = places[0].location_long
+            if entity.dates:
+                fields["date_start"] = min(start for start, _end in entity.dates)
+                fields["date_end"] = max(end for _start, end in entity.dates)
+        return fields
+
+    @classmethod
+    def update_for_entity(cls, entity: SearchEntity):
+        """Create or update the document for a saved entity."""
+        cls.objects.update_or_create(
+            id=entity.id,
+            defaults=cls.document_fields(entity) | {"search_vector": entity.build_search_vector()},
+        )
+
+    @classmethod
+    def update_place_locations(cls, place: Place):
+        """
+        Rebuild the documents of a place's events after the place has moved.
+
+        An event's location comes from its first place, so each event is rebuilt the same way as
+        a full rebuild would build it.
+        """
+        for event in place.event_set.prefetch_related("images", "places"):
+            cls.update_for_entity(event)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, batch_size: int = 500):
+        """Delete every document and build them all again from the entities."""
+        cls.objects.all().delete()
+        for entity_model in [Activity, Event, Place]:
+            queryset = entity_model.objects.prefetch_related("images")
+            if entity_model == Event:
+                queryset = queryset.prefetch_related("places")
+            # iterator() skips prefetching before Django 4.1, so prefetch each batch by pk instead.
+            queryset = queryset.order_by("pk")
+            last_pk = None
+            while True:
+                batch = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+                entities = list(batch[:batch_size])
+                if not entities:
+                    break
+                cls.objects.bulk_create(
+                    [cls(id=entity.id, **cls.document_fields(entity)) for entity in entities]
+                )
+                last_pk = entities[-1].pk
+        cls.objects.update(search_vector=cls.search_vector_expression())
+
+    @staticmethod
+    def search_vector_expression():
+        """The expression for the search vector from the document's own columns."""
+        keywords = models.Func(
+            models.F("synonyms_keywords"),
+            models.Value(" "),
+            function="array_to_string",
+            output_field=models.TextField(),
+        )
+        return (
+            SearchVector("headline", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(keywords, weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        )
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Signals that keep the SearchDocument table in step with the search entities."""
+
+# 3rd-party
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+# Project
+from search.cache import bump_search_version
+from search.models import Activity
+from search.models import Event
+from search.models import Place
+from search.models import SearchDocument
+from search.models import SearchEntity
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Place)
+def update_search_document(sender, instance: SearchEntity, **kwargs):
+    """Rebuild the document of a saved entity, and the documents of a moved place's events."""
+    moved = (
+        isinstance(instance, Place)
+        and not SearchDocument.objects.filter(
+            id=instance.id,
+            location_lat=instance.location_lat,
+            location_long=instance.location_long,
+        ).exists()
+    )
+    SearchDocument.update_for_entity(instance)
+    if moved:
+        SearchDocument.update_place_locations(instance)
+    transaction.on_commit(bump_search_version)
+
+
+@receiver(post_delete, sender=Activity)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Place)
+def delete_search_document(sender, instance: SearchEntity, **kwargs):
+    """Remove the document of a deleted entity."""
+    SearchDocument.objects.filter(id=instance.id).delete()
+    transaction.on_commit(bump_search_version)
+
+
+@receiver(pre_delete, sender=Place)
+def remember_place_events(sender, instance: Place, **kwargs):
+    """Note the events of a place about to be deleted, as its links are deleted without signals."""
+    instance._search_event_ids = list(instance.event_set.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Place)
+def update_deleted_place_events(sender, instance: Place, **kwargs):
+    """Rebuild the documents of a deleted place's events, which may have moved to another place."""
+    event_ids = getattr(instance, "_search_event_ids", [])
+    for event in Event.objects.filter(id__in=event_ids).prefetch_related("images", "places"):
+        SearchDocument.update_for_entity(event)
+
+
+@receiver(m2m_changed, sender=Activity.images.through)
+@receiver(m2m_changed, sender=Event.images.through)
+@receiver(m2m_changed, sender=Place.images.through)
+@receiver(m2m_changed, sender=Event.places.through)
+def update_search_document_relations(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Rebuild the documents of entities whose images or places have changed."""
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        SearchDocument.update_for_entity(instance)
+    elif pk_set:
+        # Changed from the image or place side, so the entities are the other end of the relation.
+        for entity in model.objects.filter(pk__in=pk_set):
+            SearchDocument.update_for_entity(entity)
+    transaction.on_commit(bump_search_version)
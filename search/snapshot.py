@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+A read-only, columnar snapshot of the search documents, shared between processes with mmap.
+
+The catalogue only changes a few times a day, so rather than asking Postgres on every search, the
+build_catalogue_snapshot task writes the columns that searches filter on to .npy files. Each
+process memory-maps the current snapshot, so every gunicorn worker shares one physical copy
+through the page cache. A snapshot records the search version it was built at, and is only used
+while that is still the current version.
+
+Filters are stored as a bitmap per filter, see search.bitmaps, and the coordinates of places and
+of events' places are indexed by a spatial grid, see search.spatial. A new snapshot is built from
+the previous one, re-reading only the documents saved since and clearing the rows of deleted ones.
+"""
+
+# Standard Library
+import json
+import os
+import pathlib
+import shutil
+import uuid
+from datetime import datetime
+from datetime import timedelta
+
+# 3rd-party
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+# Project
+from search.bitmaps import FilterBitmapIndex
+from search.cache import get_search_version
+from search.constants import SEARCH_DOCUMENT_ENTITY_TYPES
+from search.constants import SEARCH_SNAPSHOT_CHUNK_SIZE
+from search.constants import SEARCH_SNAPSHOT_MAX_DELETED_FRACTION
+from search.constants import SEARCH_SNAPSHOT_UPDATE_OVERLAP_SECONDS
+from search.models import ALL_FILTERS
+from search.models import Event
+from search.models import SearchDocument
+from search.models import filter_state
+from search.spatial import SpatialGrid
+from search.spatial import build_grid
+
+SNAPSHOT_FILTERS = sorted(ALL_FILTERS)
+SNAPSHOT_POINTER = "CURRENT"
+SNAPSHOT_METADATA = "metadata.json"
+# The entity_type of rows whose document has been deleted.
+SNAPSHOT_DELETED_ROW = -1
+SNAPSHOT_RANGE_COLUMNS = [
+    "price_lower",
+    "price_upper",
+    "duration_lower",
+    "duration_upper",
+    "people_lower",
+    "people_upper",
+    "location_lat",
+    "location_long",
+]
+SNAPSHOT_EVENT_PLACE_COLUMNS = ["event_place_rows", "event_place_lat", "event_place_long"]
+SNAPSHOT_GRID_COLUMNS = [
+    "place_grid_keys",
+    "place_grid_points",
+    "event_place_grid_keys",
+    "event_place_grid_points",
+]
+SNAPSHOT_COLUMNS = [
+    "ids",
+    "entity_type",
+    "approved",
+    *SNAPSHOT_RANGE_COLUMNS,
+    "date_start",
+    "date_end",
+    "filter_true",
+    "filter_false",
+    *SNAPSHOT_EVENT_PLACE_COLUMNS,
+    *SNAPSHOT_GRID_COLUMNS,
+]
+SNAPSHOT_DOCUMENT_FIELDS = [
+    "id",
+    "entity_type",
+    "approved",
+    "filter_states",
+    *SNAPSHOT_RANGE_COLUMNS,
+    "date_start",
+    "date_end",
+]
+
+_current_snapshot = None
+
+
+def _timestamp(value):
+    """Seconds since the epoch of an aware datetime, or NaN if there isn't one."""
+    return value.timestamp() if value else np.nan
+
+
+def _empty_rows(size: int):
+    """The row columns for size empty rows, with the filters unpacked to one bool per filter."""
+    rows = {
+        "ids": np.zeros((size, 16), dtype=np.uint8),
+        "entity_type": np.full(size, SNAPSHOT_DELETED_ROW, dtype=np.int8),
+        "approved": np.zeros(size, dtype=bool),
+        "filter_true": np.zeros((size, len(SNAPSHOT_FILTERS)), dtype=bool),
+        "filter_false": np.zeros((size, len(SNAPSHOT_FILTERS)), dtype=bool),
+    }
+    for name in [*SNAPSHOT_RANGE_COLUMNS, "date_start", "date_end"]:
+        rows[name] = np.full(size, np.nan)
+    return rows
+
+
+def _read_pointer(directory: pathlib.Path):
+    """The path of the published snapshot in a directory, or None if there isn't one."""
+    try:
+        return directory / (directory / SNAPSHOT_POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+class _SnapshotWriter:
+    """
+    The columns of a snapshot being built, either from scratch or from the previous snapshot.
+
+    Documents keep their row from one snapshot to the next. Deleted documents leave an empty row
+    behind, and new documents are added at the end.
+    """
+
+    def __init__(self, previous=None):  # noqa: D107
+        self.state_positions = {}
+        for position, filter_name in enumerate(SNAPSHOT_FILTERS):
+            self.state_positions[filter_state(filter_name, True)] = ("filter_true", position)
+            self.state_positions[filter_state(filter_name, False)] = ("filter_false", position)
+
+        self.row_ids = {}
+        self.deleted_rows = 0
+        if previous is None:
+            self.size = 0
+            self.columns = _empty_rows(0)
+            self.event_places = {
+                "event_place_rows": np.zeros(0, dtype=np.int64),
+                "event_place_lat": np.zeros(0),
+                "event_place_long": np.zeros(0),
+            }
+            return
+
+        self.size = len(previous)
+        self.columns = {}
+        for name in _empty_rows(0):
+            if name in ["filter_true", "filter_false"]:
+                unpacked = np.unpackbits(previous[name], axis=1, count=self.size)
+                self.columns[name] = unpacked.T.astype(bool)
+            else:
+                self.columns[name] = np.array(previous[name])
+        self.event_places = {
+            name: np.array(previous[name]) for name in SNAPSHOT_EVENT_PLACE_COLUMNS
+        }
+        live_rows = np.flatnonzero(self.columns["entity_type"] != SNAPSHOT_DELETED_ROW)
+        self.row_ids = dict(zip(previous.ids(live_rows), live_rows.tolist()))
+        self.deleted_rows = self.size - len(self.row_ids)
+
+    def _add_rows(self, count: int):
+        """Add count empty rows at the end, growing the columns if they are full."""
+        capacity = len(self.columns["entity_type"])
+        if self.size + count > capacity:
+            padding = _empty_rows(max(self.size + count, 2 * capacity) - capacity)
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate([column, padding[name]])
+        self.size += count
+
+    def _drop_event_places(self, rows: list):
+        """Remove the place coordinates of the events in rows."""
+        keep = ~np.isin(self.event_places["event_place_rows"], rows)
+        for name, column in self.event_places.items():
+            self.event_places[name] = column[keep]
+
+    def delete(self, ids: set):
+        """Empty the rows of deleted documents."""
+        rows = [self.row_ids.pop(document_id) for document_id in ids]
+        for name, column in _empty_rows(len(rows)).items():
+            self.columns[name][rows] = column
+        self._drop_event_places(rows)
+        self.deleted_rows += len(rows)
+
+    def write_chunk(self, documents: list):
+        """Write the documents, as dicts of their field values, to their rows."""
+        new_ids = [document["id"] for document in documents if document["id"] not in self.row_ids]
+        first_new_row = self.size
+        self._add_rows(len(new_ids))
+        self.row_ids.update(zip(new_ids, range(first_new_row, self.size)))
+        rows = [self.row_ids[document["id"]] for document in documents]
+
+        self.columns["ids"][rows] = np.frombuffer(
+            b"".join(document["id"].bytes for document in documents),
+            dtype=np.uint8,
+        ).reshape(-1, 16)
+        self.columns["entity_type"][rows] = [
+            SEARCH_DOCUMENT_ENTITY_TYPES.index(document["entity_type"]) for document in documents
+        ]
+        self.columns["approved"][rows] = [document["approved"] for document in documents]
+        for name in SNAPSHOT_RANGE_COLUMNS:
+            self.columns[name][rows] = np.array(
+                [document[name] for document in documents],
+                dtype=np.float64,
+            )
+        for name in ["date_start", "date_end"]:
+            self.columns[name][rows] = [_timestamp(document[name]) for document in documents]
+
+        for column in ["filter_true", "filter_false"]:
+            self.columns[column][rows] = False
+        for row, document in zip(rows, documents):
+            for state in document["filter_states"]:
+                if state in self.state_positions:
+                    column, position = self.state_positions[state]
+                    self.columns[column][row, position] = True
+
+        self._write_event_places(
+            [document["id"] for document in documents if document["entity_type"] == "Event"],
+        )
+
+    def _write_event_places(self, event_ids: list):
+        """Replace the place coordinates of events, so events can match on any of their places."""
+        self._drop_event_places([self.row_ids[event_id] for event_id in event_ids])
+        rows, lats, longs = [], [], []
+        for event_id, lat, long in Event.places.through.objects.filter(
+            event_id__in=event_ids,
+            place__location_lat__isnull=False,
+            place__location_long__isnull=False,
+        ).values_list("event_id", "place__location_lat", "place__location_long"):
+            rows.append(self.row_ids[event_id])
+            lats.append(lat)
+            longs.append(long)
+        for name, values in [
+            ("event_place_rows", rows),
+            ("event_place_lat", lats),
+            ("event_place_long", longs),
+        ]:
+            column = self.event_places[name]
+            self.event_places[name] = np.concatenate([column, np.array(values, dtype=column.dtype)])
+
+    def _grids(self):
+        """The spatial grids over the places' rows and the events' places."""
+        is_place = self.columns["entity_type"][: self.size] == SEARCH_DOCUMENT_ENTITY_TYPES.index(
+            "Place",
+        )
+        place_grid = build_grid(
+            np.where(is_place, self.columns["location_lat"][: self.size], np.nan),
+            np.where(is_place, self.columns["location_long"][: self.size], np.nan),
+        )
+        event_place_grid = build_grid(
+            self.event_places["event_place_lat"],
+            self.event_places["event_place_long"],
+        )
+        return dict(zip(SNAPSHOT_GRID_COLUMNS, [*place_grid, *event_place_grid]))
+
+    def save(self, snapshot_path: pathlib.Path, metadata: dict):
+        """Write the columns to a snapshot directory, packing each filter into a bitmap."""
+        snapshot_path.mkdir(parents=True)
+        for name, column in self.columns.items():
+            column = column[: self.size]
+            if name in ["filter_true", "filter_false"]:
+                column = np.packbits(column.T, axis=1)
+            np.save(snapshot_path / f"{name}.npy", column)
+        for name, column in [*self.event_places.items(), *self._grids().items()]:
+            np.save(snapshot_path / f"{name}.npy", column)
+        with open(snapshot_path / SNAPSHOT_METADATA, "w") as metadata_file:
+            json.dump(metadata | {"deleted_rows": self.deleted_rows}, metadata_file)
+
+
+def _updatable_writer(previous):
+    """A writer continuing from the previous snapshot, or None if it is better to start again."""
+    if previous is None or previous.filters != SNAPSHOT_FILTERS:
+        return None
+    writer = _SnapshotWriter(previous)
+    document_ids = SearchDocument.objects.values_list("id", flat=True).iterator(
+        chunk_size=SEARCH_SNAPSHOT_CHUNK_SIZE,
+    )
+    writer.delete(set(writer.row_ids).difference(document_ids))
+    if writer.deleted_rows > SEARCH_SNAPSHOT_MAX_DELETED_FRACTION * writer.size:
+        return None
+    return writer
+
+
+def build_snapshot(directory: str = None, full: bool = False):
+    """
+    Write a snapshot of every search document, publish it and return it.
+
+    The previous snapshot is updated with the documents changed since it was built, unless full is
+    set. Documents written by a transaction that commits long after it started, like a rebuild of
+    every document, can be older than that, so those need a full build.
+
+    Each snapshot is written to its own directory and published by replacing the pointer file, so
+    processes never see a half written snapshot. Older snapshots are removed, processes that still
+    have them mapped keep their copy until they move on to the new one.
+    """
+    directory = pathlib.Path(directory or settings.SEARCH_SNAPSHOT_DIR)
+    # Read the version first, so changes made during the build make the snapshot out of date.
+    search_version = get_search_version()
+    built_at = timezone.now()
+
+    previous_path = _read_pointer(directory)
+    try:
+        previous = CatalogueSnapshot(previous_path) if previous_path else None
+    except (OSError, ValueError):
+        previous = None
+    writer = None if full else _updatable_writer(previous)
+    documents = SearchDocument.objects.order_by("id")
+    if writer is None:
+        writer = _SnapshotWriter()
+    else:
+        documents = documents.filter(
+            updated_at__gte=previous.built_at
+            - timedelta(seconds=SEARCH_SNAPSHOT_UPDATE_OVERLAP_SECONDS),
+        )
+
+    chunk = []
+    values = documents.values_list(*SNAPSHOT_DOCUMENT_FIELDS)
+    for document in values.iterator(chunk_size=SEARCH_SNAPSHOT_CHUNK_SIZE):
+        chunk.append(dict(zip(SNAPSHOT_DOCUMENT_FIELDS, document)))
+        if len(chunk) == SEARCH_SNAPSHOT_CHUNK_SIZE:
+            writer.write_chunk(chunk)
+            chunk = []
+    writer.write_chunk(chunk)
+
+    snapshot_path = directory / f"{search_version}-{uuid.uuid4().hex[:8]}"
+    writer.save(
+        snapshot_path,
+        {
+            "search_version": search_version,
+            "built_at": built_at.isoformat(),
+            "filters": SNAPSHOT_FILTERS,
+        },
+    )
+
+    pointer_path = directory / f"{SNAPSHOT_POINTER}.{snapshot_path.name}"
+    pointer_path.write_text(snapshot_path.name)
+    os.replace(pointer_path, directory / SNAPSHOT_POINTER)
+
+    for old_path in directory.iterdir():
+        if old_path.is_dir() and old_path != snapshot_path:
+            shutil.rmtree(old_path, ignore_errors=True)
+    return CatalogueSnapshot(snapshot_path)
+
+
+class CatalogueSnapshot:
+    """A published snapshot, with every column memory-mapped read only."""
+
+    def __init__(self, path: pathlib.Path):  # noqa: D107
+        self.path = path
+        with open(path / SNAPSHOT_METADATA) as metadata_file:
+            metadata = json.load(metadata_file)
+        self.search_version = metadata["search_version"]
+        self.built_at = datetime.fromisoformat(metadata["built_at"])
+        self.filters = metadata["filters"]
+        self.deleted_rows = metadata["deleted_rows"]
+        self.columns = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r") for name in SNAPSHOT_COLUMNS
+        }
+        self.filter_index = FilterBitmapIndex(
+            self.filters,
+            self.columns["filter_true"],
+            self.columns["filter_false"],
+            len(self),
+        )
+        # Points of the place grid are rows, points of the event place grid are event places.
+        self.place_grid = SpatialGrid(
+            self.columns["place_grid_keys"],
+            self.columns["place_grid_points"],
+            self.columns["location_lat"],
+            self.columns["location_long"],
+        )
+        self.event_place_grid = SpatialGrid(
+            self.columns["event_place_grid_keys"],
+            self.columns["event_place_grid_points"],
+            self.columns["event_place_lat"],
+            self.columns["event_place_long"],
+        )
+
+    def __len__(self):  # noqa: D105
+        return len(self.columns["entity_type"])
+
+    def __getitem__(self, name: str):  # noqa: D105
+        return self.columns[name]
+
+    def ids(self, rows):
+        """The ids of the rows, given as a boolean mask or as row numbers, in row order."""
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        raw_ids = self["ids"][rows].tobytes()
+        ids = []
+        for start in range(0, len(raw_ids), 16):
+            end = start + 16
+            ids.append(uuid.UUID(bytes=raw_ids[start:end]))
+        return ids
+
+
+def get_snapshot():
+    """
+    The current snapshot for this process, or None if there isn't one.
+
+    The pointer file is checked on every call, and a newly published snapshot replaces the old one
+    in a single assignment, so searches in flight keep using the snapshot they started with.
+    """
+    global _current_snapshot
+    if not settings.SEARCH_SNAPSHOT_DIR:
+        return None
+    path = _read_pointer(pathlib.Path(settings.SEARCH_SNAPSHOT_DIR))
+    if path is None:
+        return None
+    if _current_snapshot is None or _current_snapshot.path != path:
+        try:
+            _current_snapshot = CatalogueSnapshot(path)
+        except (OSError, ValueError):
+            # Removed by a newer build between reading the pointer and loading it.
+            return None
+    return _current_snapshot
+
+
+def get_current_snapshot():
+    """The snapshot for this process, if it is up to date with the search results."""
+    snapshot = get_snapshot()
+    if snapshot is None or snapshot.search_version != get_search_version():
+        return None
+    return snapshot
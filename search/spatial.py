@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+A grid index over coordinates, for radius and nearest neighbour searches without a full scan.
+
+Points are bucketed into cells of SPATIAL_GRID_CELL_DEGREES and stored sorted by cell, with the
+cells of a latitude band next to each other. A search only looks at the cells covering the
+bounding box of its radius, which is one binary search per band per longitude range.
+"""
+
+# Standard Library
+import math
+
+# 3rd-party
+import numpy as np
+
+# Project
+from search.constants import EARTH_RADIUS_MILES
+from search.constants import GEODESIC_REFINEMENT_MARGIN
+from search.constants import SPATIAL_GRID_CELL_DEGREES
+from search.constants import SPATIAL_GRID_NEAREST_START_MILES
+from search.geo import bounding_box
+from search.geo import distances_miles
+
+LONG_CELLS = round(360 / SPATIAL_GRID_CELL_DEGREES) + 1
+# Any radius of at least half the circumference covers the whole globe.
+HALF_CIRCUMFERENCE_MILES = math.pi * EARTH_RADIUS_MILES
+
+
+def _cells(values, offset: float):
+    """The cell number of each latitude or longitude."""
+    return np.floor((np.asarray(values, dtype=np.float64) + offset) / SPATIAL_GRID_CELL_DEGREES)
+
+
+def build_grid(lats, longs):
+    """
+    The sorted cell keys and point numbers of the located points, ready for SpatialGrid.
+
+    Points without coordinates are left out.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    points = np.flatnonzero(~(np.isnan(lats) | np.isnan(longs)))
+    keys = (_cells(lats[points], 90) * LONG_CELLS + _cells(longs[points], 180)).astype(np.int64)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], points[order]
+
+
+class SpatialGrid:
+    """Radius and nearest neighbour searches over the points of build_grid."""
+
+    def __init__(self, keys, points, lats, longs):  # noqa: D107
+        self.keys = keys
+        self.points = points
+        self.lats = lats
+        self.longs = longs
+
+    def _candidates(self, lat: float, long: float, radius_miles: float):
+        """The points in the cells covering the bounding box of the radius."""
+        min_lat, max_lat, long_ranges = bounding_box(lat, long, radius_miles)
+        if long_ranges is None:
+            long_ranges = [(-180, 180)]
+        band_keys = LONG_CELLS * np.arange(
+            int(_cells(max(min_lat, -90), 90)),
+            int(_cells(min(max_lat, 90), 90)) + 1,
+            dtype=np.int64,
+        )
+        starts, ends = [], []
+        for min_long, max_long in long_ranges:
+            first_keys = band_keys + int(_cells(min_long, 180))
+            last_keys = band_keys + int(_cells(max_long, 180))
+            starts.append(np.searchsorted(self.keys, first_keys, "left"))
+            ends.append(np.searchsorted(self.keys, last_keys, "right"))
+        runs = [
+            self.points[start:end]
+            for start, end in zip(np.concatenate(starts), np.concatenate(ends))
+            if end > start
+        ]
+        return np.concatenate(runs) if runs else np.zeros(0, dtype=np.int64)
+
+    def _distances(self, lat: float, long: float, points, exact_near: list = ()):
+        """The distance to each of the points, see distances_miles."""
+        return distances_miles(lat, long, self.lats[points], self.longs[points], exact_near)
+
+    def within(
+        self,
+        lat: float,
+        long: float,
+        distance_lower: float,
+        distance_upper: float,
+        exact: bool = False,
+    ):
+        """The points between distance_lower and distance_upper, in no particular order."""
+        exact_near = [distance_lower, distance_upper] if exact else []
+        points = self._candidates(lat, long, distance_upper * (1 + GEODESIC_REFINEMENT_MARGIN))
+        distances = self._distances(lat, long, points, exact_near)
+        return points[(distances >= distance_lower) & (distances <= distance_upper)]
+
+    def nearest(self, lat: float, long: float, count: int, max_distance: float, allowed=None):
+        """
+        Up to count points within max_distance, nearest first.
+
+        allowed is an optional boolean array over the points, to skip points that don't qualify.
+        The radius starts small and grows until it holds enough points, so a crowded area only
+        looks at a few cells.
+        """
+        radius = min(SPATIAL_GRID_NEAREST_START_MILES, max_distance)
+        while True:
+            points = self._candidates(lat, long, radius)
+            if allowed is not None:
+                points = points[allowed[points]]
+            distances = self._distances(lat, long, points)
+            in_radius = distances <= radius
+            points, distances = points[in_radius], distances[in_radius]
+            if len(points) >= count or radius >= min(max_distance, HALF_CIRCUMFERENCE_MILES):
+                return points[np.argsort(distances, kind="stable")[:count]]
+            radius = min(radius * 4, max_distance)
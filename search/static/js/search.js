@@ -197,6 +197,19 @@ function parseSearch() {
     return getParams
 }
 
+function updateFilterCounts() {
+    // Show how many of the results have each filter set on the filter buttons.
+    // The counts are only sent when the catalogue snapshot answered the search,
+    // so clear them otherwise.
+    const countsScript = document.getElementById("filter-result-counts")
+    const filterCounts = countsScript ? JSON.parse(countsScript.textContent) : {}
+    const countBadges = document.getElementsByClassName("filter-result-count")
+    for (let i = 0; i < countBadges.length; i++) {
+        const filterName = countBadges[i].id.replace("filter-result-count-", "")
+        countBadges[i].innerHTML = filterName in filterCounts ? filterCounts[filterName] : ""
+    }
+}
+
 function runSearch(force=false) {
     const getParams = parseSearch()
     const resultsTarget = document.getElementById("search-results-target")
@@ -206,6 +219,7 @@ function runSearch(force=false) {
     // Except if we wanna force load, such as for wishlist
     if (Object.keys(getParams).length === 0 && !force)  {
         resultsTarget.innerHTML = ""
+        updateFilterCounts()
         document.getElementById("welcome-banner").classList.add("active")
         document.getElementById("search-results-column-select").innerHTML = `Results`
         return
@@ -225,8 +239,11 @@ function runSearch(force=false) {
         .then(response => response.text())
         .then(html => {
                 resultsTarget.innerHTML = html;
+                // Let htmx pick up the infinite scroll loader at the bottom of the results.
+                htmx.process(resultsTarget)
                 const totalResults = document.getElementById("total-number-of-results").innerHTML
                 document.getElementById("search-results-column-select").innerHTML = `Results (${totalResults})`
+                updateFilterCounts()
             }
         )
 
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Search tasks."""
+# 3rd-party
+from celery import shared_task
+
+# Project
+from search.cache import get_search_version
+from search.snapshot import build_snapshot
+from search.snapshot import get_snapshot
+
+
+@shared_task
+def build_catalogue_snapshot(full: bool = False):
+    """
+    Rebuild the catalogue snapshot if the search results have changed since it was built.
+
+    A full build starts again from every document, even if the snapshot is up to date.
+    """
+    snapshot = get_snapshot()
+    if not full and snapshot is not None and snapshot.search_version == get_search_version():
+        return
+    build_snapshot(full=full)
@@ -10,9 +10,17 @@ register = template.Library()
 
 @register.simple_tag(takes_context=True)
 def is_in_users_wishlist(context, entity_type: str, entity_id):
-    """Turns a string into a dict."""
+    """
+    Is the entity in the requesting user's wishlist.
+
+    Lists of results can pass in wishlist_ids, a set of ids per entity type worked out up front,
+    to save a query per card.
+    """
     if isinstance(context.request.user, AnonymousUser):
         return False
+    wishlist_ids = context.get("wishlist_ids")
+    if isinstance(wishlist_ids, dict):
+        return entity_id in wishlist_ids.get(entity_type, set())
     if entity_type == "Activity":
         if context.request.user.wishlist_activities.filter(id=entity_id).exists():
             return True
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Tests for the search benchmarks."""
+
+# Standard Library
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+# 3rd-party
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test import override_settings
+
+# Project
+from search.benchmarks import SearchBenchmark
+from search.benchmarks import compare_to_baseline
+from search.benchmarks import seed_catalogue
+from search.cache import get_search_version
+from search.cache import search_cache
+from search.models import Activity
+from search.models import Event
+from search.models import EventOccurrence
+from search.models import Place
+from search.models import SearchDocument
+from search.tests.test_cache import LOCMEM_CACHES
+
+
+class TestSeedCatalogue(TestCase):
+    """Tests for seed_catalogue."""
+
+    def test_seeds_the_entities_and_their_derived_data(self):
+        """Entities should be split between the types, with documents and occurrences built."""
+        seed_catalogue(30)
+        assert Activity.objects.count() == 10
+        assert Event.objects.count() == 10
+        assert Place.objects.count() == 10
+        assert SearchDocument.objects.count() == 30
+        assert EventOccurrence.objects.count() >= 10
+        assert not Event.objects.filter(places__isnull=True).exists()
+        assert not Activity.objects.filter(filter_states=[]).exists()
+        assert not SearchDocument.objects.filter(search_vector__isnull=True).exists()
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_bumps_the_search_version(self):
+        """Results cached for an earlier catalogue should not be used for the new one."""
+        version = get_search_version()
+        seed_catalogue(3)
+        assert get_search_version() != version
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSearchBenchmark(TestCase):
+    """Tests for SearchBenchmark."""
+
+    def setUp(self) -> None:  # noqa: D102
+        search_cache().clear()
+
+    def test_run_times_every_stage(self):
+        """Every stage should report its timings and query count."""
+        seed_catalogue(30)
+        results = SearchBenchmark(repeats=2).run()
+        assert set(results) == {
+            "slider",
+            "keyword",
+            "hstore",
+            "datetime",
+            "distance",
+            "results_page",
+            "search_results_view",
+            "search_results_view_anonymous",
+            "filter_results_page",
+            "filter_results_page_snapshot",
+        }
+        for timings in results.values():
+            assert timings["min_ms"] <= timings["median_ms"] <= timings["max_ms"]
+            assert timings["queries"] >= 0
+        # The count and the page, and the places near the edge of the distance range.
+        assert results["results_page"]["queries"] == 3
+        # The snapshot answers the search, so at most the page of documents is fetched.
+        assert results["filter_results_page_snapshot"]["queries"] <= 1
+
+
+class TestCompareToBaseline(TestCase):
+    """Tests for compare_to_baseline."""
+
+    def test_reports_slower_stages_and_extra_queries(self):
+        """Stages outside the tolerance or with more queries should be reported."""
+        baseline = {"10": {"slider": {"median_ms": 10, "queries": 3}}}
+        within_tolerance = {"10": {"slider": {"median_ms": 11, "queries": 3}}}
+        slower = {"10": {"slider": {"median_ms": 13, "queries": 4}}}
+        assert compare_to_baseline(within_tolerance, baseline, 1.2) == []
+        assert len(compare_to_baseline(slower, baseline, 1.2)) == 2
+
+
+class TestBenchmarkSearchCommand(TestCase):
+    """Tests for the benchmark_search command."""
+
+    def test_outputs_json_and_rolls_back_the_catalogue(self):
+        """The command should print JSON results and leave no seeded rows behind."""
+        stdout = StringIO()
+        call_command("benchmark_search", "--sizes", "9", "--repeats", "1", stdout=stdout)
+        assert set(json.loads(stdout.getvalue())["9"]) >= {"slider", "results_page"}
+        assert SearchDocument.objects.count() == 0
+
+    @mock.patch("search.management.commands.benchmark_search.bump_search_version")
+    def test_bumps_the_search_version_after_each_rollback(self, mock_bump):
+        """Results cached for a rolled back catalogue should not be used again."""
+        call_command("benchmark_search", "--sizes", "3", "6", "--repeats", "1", stdout=StringIO())
+        assert mock_bump.call_count == 2
+
+    def test_fails_on_regression(self):
+        """A baseline that is much faster than the run should fail the command."""
+        baseline = {"9": {"results_page": {"median_ms": 0, "queries": 0}}}
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as baseline_file:
+            json.dump(baseline, baseline_file)
+            baseline_file.flush()
+            with self.assertRaises(CommandError):
+                call_command(
+                    "benchmark_search",
+                    "--sizes",
+                    "9",
+                    "--repeats",
+                    "1",
+                    "--baseline",
+                    baseline_file.name,
+                    stdout=StringIO(),
+                )
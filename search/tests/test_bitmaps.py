@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Tests for the filter bitmaps."""
+
+# 3rd-party
+import numpy as np
+from django.test import SimpleTestCase
+
+# Project
+from search.bitmaps import FilterBitmapIndex
+from search.bitmaps import pack_rows
+from search.bitmaps import popcount
+from search.bitmaps import unpack_rows
+
+
+class TestBitmaps(SimpleTestCase):
+    """Tests for packing, counting and combining bitmaps."""
+
+    def setUp(self) -> None:  # noqa: D102
+        # Rows 0-10, dog friendly rows 0, 2 and 9, wheelchair accessible rows 2 and 3.
+        self.true_bits = np.zeros((2, 11), dtype=bool)
+        self.true_bits[0, [0, 2, 9]] = True
+        self.true_bits[1, [2, 3]] = True
+        self.false_bits = np.zeros((2, 11), dtype=bool)
+        self.false_bits[0, [1, 3]] = True
+        self.index = FilterBitmapIndex(
+            ["dog_friendly", "wheelchair_accessible"],
+            np.packbits(self.true_bits, axis=1),
+            np.packbits(self.false_bits, axis=1),
+            11,
+        )
+
+    def test_pack_and_unpack_rows_round_trip(self):
+        """Unpacking should give back the rows that were packed, without the padding bits."""
+        mask = np.array([True, False, True] * 5)
+        assert (unpack_rows(pack_rows(mask), len(mask)) == mask).all()
+
+    def test_popcount_counts_set_rows(self):
+        """Popcount should count the set rows of one bitmap, or each of a stack of them."""
+        assert popcount(pack_rows(np.ones(13, dtype=bool))) == 13
+        assert list(popcount(np.packbits(self.true_bits, axis=1), axis=1)) == [3, 2]
+
+    def test_match_ands_the_selected_filters(self):
+        """Rows should match only if every selected filter has the selected value."""
+        assert self.index.match([]) is None
+        matched = self.index.match([("dog_friendly", True), ("wheelchair_accessible", True)])
+        assert list(np.flatnonzero(unpack_rows(matched, 11))) == [2]
+        matched = self.index.match([("dog_friendly", False)])
+        assert list(np.flatnonzero(unpack_rows(matched, 11))) == [1, 3]
+
+    def test_match_does_not_change_the_stored_bitmaps(self):
+        """Combining bitmaps should work on a copy."""
+        self.index.match([("dog_friendly", True), ("wheelchair_accessible", True)])
+        assert popcount(self.index.bitmap("dog_friendly", True)) == 3
+
+    def test_unknown_filters_match_nothing(self):
+        """Filters that are not in the index should not match any rows."""
+        assert popcount(self.index.match([("not_a_filter", True)])) == 0
+
+    def test_counts_counts_each_filter_within_the_results(self):
+        """Each count should be the number of results with the filter set to True."""
+        results = pack_rows(np.arange(11) < 3)
+        assert self.index.counts(results) == {"dog_friendly": 2, "wheelchair_accessible": 1}
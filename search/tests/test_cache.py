@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Tests for the search results cache."""
+
+# Standard Library
+from unittest import mock
+
+# 3rd-party
+from django.http import QueryDict
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+
+# Project
+from search.cache import bump_search_version
+from search.cache import get_cached_ordered_result_ids
+from search.cache import get_cached_result_ids
+from search.cache import get_search_version
+from search.cache import normalise_search_params
+from search.cache import search_cache
+from search.cache import search_cache_key
+from search.filters import FilterQueryProcessor
+from search.tests.factories import ActivityFactory
+from users.tests.factories import CustomUserFactory
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "search": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-search",
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSearchCache(TestCase):
+    """Tests for the search results cache."""
+
+    def setUp(self) -> None:  # noqa: D102
+        search_cache().clear()
+
+    def test_bump_search_version_changes_the_version(self):
+        """Bumping the version should change it, and it should be stable otherwise."""
+        version = get_search_version()
+        assert get_search_version() == version
+        bump_search_version()
+        assert get_search_version() != version
+
+    def test_normalise_search_params_drops_paging_and_rounds_location(self):
+        """Paging params should not be part of the key and locations snap to a grid."""
+        params = normalise_search_params(
+            QueryDict("seed=abc&page=2&location_lat=51.50712&location_long=-0.12781&keywords=x"),
+        )
+        assert params.dict() == {
+            "keywords": "x",
+            "location_lat": "51.51",
+            "location_long": "-0.13",
+        }
+
+    def test_nearby_searches_share_a_cache_key(self):
+        """Searches from a few metres apart, in any param order, should share a key."""
+        first = normalise_search_params(QueryDict("location_lat=51.50712&location_long=-0.12781"))
+        second = normalise_search_params(QueryDict("location_long=-0.12779&location_lat=51.50709"))
+        assert search_cache_key(first) == search_cache_key(second)
+
+    def test_get_cached_result_ids_only_searches_once(self):
+        """The second search with the same params should not touch the database."""
+        user = CustomUserFactory()
+        activity = ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
+        processor = FilterQueryProcessor(normalise_search_params(QueryDict("")))
+        assert [entity_id for entity_id, _ in get_cached_result_ids(processor)] == [activity.id]
+        with self.assertNumQueries(0):
+            assert get_cached_result_ids(processor) == [(activity.id, 0.0)]
+
+    def test_get_cached_ordered_result_ids_only_sorts_once_per_seed(self):
+        """Later pages with the same seed should reuse the ordered ids, other seeds sort again."""
+        user = CustomUserFactory()
+        activities = ActivityFactory.create_batch(
+            5,
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+        )
+        processor = FilterQueryProcessor(normalise_search_params(QueryDict("")))
+        ordered_ids = get_cached_ordered_result_ids(processor, "seed")
+        assert ordered_ids == processor.order_result_ids(get_cached_result_ids(processor), "seed")
+        assert sorted(ordered_ids) == sorted(activity.id for activity in activities)
+        with mock.patch.object(processor, "order_result_ids") as mock_order:
+            assert get_cached_ordered_result_ids(processor, "seed") == ordered_ids
+            mock_order.assert_not_called()
+            get_cached_ordered_result_ids(processor, "another seed")
+            mock_order.assert_called_once()
+
+    def test_saving_an_entity_invalidates_the_cache(self):
+        """Approving an entity should bump the version so it shows up in cached searches."""
+        user = CustomUserFactory()
+        processor = FilterQueryProcessor(normalise_search_params(QueryDict("")))
+        activity = ActivityFactory()
+        assert get_cached_result_ids(processor) == []
+        activity.approved_by = user
+        activity.approval_timestamp = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.save()
+        assert [entity_id for entity_id, _ in get_cached_result_ids(processor)] == [activity.id]
+
+    def test_the_version_is_only_bumped_once_the_change_is_committed(self):
+        """Searches made before the commit can't see the change, so they must not use the bump."""
+        version = get_search_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            ActivityFactory()
+            assert get_search_version() == version
+        assert get_search_version() != version
@@ -5,13 +5,11 @@
 import datetime
 import random
 from unittest.mock import MagicMock
-from unittest.mock import call
 from unittest.mock import patch
 
 # 3rd-party
 from crispy_forms.helper import FormHelper
 from django import forms
-from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.test import SimpleTestCase
 from django.test import TestCase
@@ -27,9 +25,11 @@ from search.filters import format_field_or_category_name
 from search.models import Activity
 from search.models import Event
 from search.models import Place
+from search.models import SearchDocument
 from search.tests.factories import ActivityFactory
 from search.tests.factories import EventFactory
 from search.tests.factories import PlaceFactory
+from search.tests.factories import SearchImageFactory
 from users.tests.factories import CustomUserFactory
 
 
@@ -287,6 +287,40 @@ class TestFilterQueryProcessor(TestCase):
         results = list(self.processor(get_params)._append_slider_queries(qs).all())
         assert results == [activity]
 
+    def test_append_slider_queries_is_an_overlap_query_on_the_slider_range(self):
+        """Sliders should query the indexed range expression rather than both columns."""
+        qs = SearchDocument.objects.filter()
+        get_params = {"price_lower": 10, "price_upper": 50}
+        sql = str(self.processor(get_params)._append_slider_queries(qs).query)
+        assert "numrange" in sql
+        assert "&&" in sql
+
+    def test_append_slider_queries_swaps_entity_bounds_saved_the_wrong_way_round(self):
+        """An entity saved with its bounds reversed should be treated as the range between them."""
+        activity = ActivityFactory(price_lower=100, price_upper=20)
+        qs = Activity.objects.filter()
+
+        get_params = {"price_lower": 10, "price_upper": 50}
+        results = list(self.processor(get_params)._append_slider_queries(qs).all())
+        assert results == [activity]
+
+        get_params = {"price_lower": 150, "price_upper": 170}
+        results = list(self.processor(get_params)._append_slider_queries(qs).all())
+        assert results == []
+
+    def test_append_slider_queries_compares_columns_for_a_reversed_selection(self):
+        """A reversed selection is not a valid range, so the columns are compared directly."""
+        activity = ActivityFactory(price_lower=20, price_upper=100)
+        qs = Activity.objects.filter()
+
+        get_params = {"price_lower": 50, "price_upper": 30}
+        results = list(self.processor(get_params)._append_slider_queries(qs).all())
+        assert results == [activity]
+
+        get_params = {"price_lower": 150, "price_upper": 120}
+        results = list(self.processor(get_params)._append_slider_queries(qs).all())
+        assert results == []
+
     def test_append_search_queries_returns_headline_match(self):
         """Search queries should return a direct word match in headline."""
         activity = ActivityFactory(headline="I love pasta")
@@ -307,6 +341,32 @@ class TestFilterQueryProcessor(TestCase):
         activity.save()
         assert list(self.processor(get_param)._append_search_queries(qs).all()) == []
 
+    def test_append_search_queries_matches_stemmed_words(self):
+        """Search queries should match different forms of the same word."""
+        activity = ActivityFactory(headline="Pottery classes for beginners")
+        qs = Activity.objects.filter()
+        get_param = {"keywords": "pottery class"}
+        assert list(self.processor(get_param)._append_search_queries(qs).all()) == [activity]
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_orders_keyword_searches_by_rank(self):
+        """Headline matches should come before synonym matches, then description matches."""
+        description_match = ActivityFactory(headline="Something", description="Climbing wall")
+        headline_match = ActivityFactory(headline="Climbing wall", description="Something")
+        synonym_match = ActivityFactory(
+            headline="Something",
+            description="Something",
+            synonyms_keywords=["climbing"],
+        )
+        ActivityFactory(headline="Something", description="Something")
+        processor = FilterQueryProcessor({"keywords": "climbing"})
+        for seed in ["seed", "another seed"]:
+            assert [result.id for result in processor.get_results_page(seed).object_list] == [
+                headline_match.id,
+                synonym_match.id,
+                description_match.id,
+            ]
+
     def test_append_search_queries_returns_description_match(self):
         """Search queries should return a direct word match in description."""
         activity = ActivityFactory(description="I am starlord")
@@ -331,25 +391,42 @@ class TestFilterQueryProcessor(TestCase):
                     activity,
                 ]
 
+    def test_append_null_boolean_filter_queries_requires_all_selected_filters(self):
+        """Every selected filter must match, whether it is selected as true or false."""
+        filter_a, filter_b, filter_c = list(FILTERS.values())[0][:3]
+        match = ActivityFactory(attributes={filter_a: "True", filter_b: "True", filter_c: "False"})
+        ActivityFactory(attributes={filter_a: "True", filter_b: "False", filter_c: "False"})
+        ActivityFactory(attributes={filter_a: "True", filter_b: "True", filter_c: "True"})
+        get_data = {
+            f"filter_{filter_a}": "true",
+            f"filter_{filter_b}": "true",
+            f"filter_{filter_c}": "false",
+        }
+        qs = Activity.objects.filter()
+        assert list(self.processor(get_data)._append_null_boolean_filter_queries(qs)) == [match]
+
     def test__perform_distance_query_returns_all_results_if_all_params_unfilled(self):
         """If the 4 search params are not received, return all objects."""
-        places = [PlaceFactory(), PlaceFactory()]
+        PlaceFactory()
+        PlaceFactory()
+        places = Place.objects.all()
 
         get_param = {"location_lat": "1234"}
         assert self.processor(get_param)._perform_distance_query(places) is places
 
     def test__perform_datetime_query_filters_objects_by_datetimes(self):
         """If the datetimes cannot be parsed or do not exist, return all results."""
-        events = [EventFactory()]
+        event = EventFactory()
+        events = Event.objects.all()
 
-        date_from = events[0].dates[0][0]
-        date_to = events[0].dates[0][1]
+        date_from = event.dates[0][0]
+        date_to = event.dates[0][1]
 
         get_param = {
             "datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M"),
             "datetime_to": datetime.datetime.strftime(date_to, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == events
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
 
         date_from += datetime.timedelta(minutes=5)
         date_to += datetime.timedelta(minutes=5)
@@ -357,7 +434,7 @@ class TestFilterQueryProcessor(TestCase):
             "datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M"),
             "datetime_to": datetime.datetime.strftime(date_to, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == events
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
 
         date_from -= datetime.timedelta(minutes=10)
         date_to -= datetime.timedelta(minutes=10)
@@ -365,34 +442,35 @@ class TestFilterQueryProcessor(TestCase):
             "datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M"),
             "datetime_to": datetime.datetime.strftime(date_to, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == events
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
 
         # Totally after
-        date_from = events[0].dates[0][1] + datetime.timedelta(hours=36)
+        date_from = event.dates[0][1] + datetime.timedelta(hours=36)
         get_param = {
             "datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == []
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == []
 
         # Totally before
-        date_to = events[0].dates[0][0] - datetime.timedelta(hours=36)
+        date_to = event.dates[0][0] - datetime.timedelta(hours=36)
         get_param = {
             "datetime_to": datetime.datetime.strftime(date_to, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == []
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == []
 
-        date_to = events[0].dates[0][0] - datetime.timedelta(hours=36)
+        date_to = event.dates[0][0] - datetime.timedelta(hours=36)
         get_param = {
             "datetime_to": datetime.datetime.strftime(date_to, "%d/%m/%Y, %H:%M"),
         }
-        assert self.processor(get_param)._perform_datetime_query(events) == []
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == []
 
     def test__perform_datetime_query_returns_all_results_if_bad_request(self):
         """If the function can't convert the types, just return everything."""
-        events = [EventFactory()]
+        event = EventFactory()
+        events = Event.objects.all()
 
         get_param = {}
-        assert self.processor(get_param)._perform_datetime_query(events) == events
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
 
     def test__perform_datetime_query_does_not_show_past_events(self):
         """Function should always filter out past events."""
@@ -402,18 +480,40 @@ class TestFilterQueryProcessor(TestCase):
                 timezone.now() - datetime.timedelta(days=4),
             ],
         ]
-        events = [EventFactory(), EventFactory(dates=past_dates)]
+        event = EventFactory()
+        EventFactory(dates=past_dates)
+        events = Event.objects.all()
 
         get_param = {}
-        assert self.processor(get_param)._perform_datetime_query(events) == [events[0]]
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
+
+    def test__perform_datetime_query_matches_any_of_an_events_dates(self):
+        """An event with several dates should match if any one of them is in the range."""
+        now = timezone.now()
+        event = EventFactory(
+            dates=[
+                [now - datetime.timedelta(days=3), now - datetime.timedelta(days=2)],
+                [now + datetime.timedelta(days=20), now + datetime.timedelta(days=21)],
+            ],
+        )
+        events = Event.objects.all()
+
+        date_from = now + datetime.timedelta(days=10)
+        get_param = {"datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M")}
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == [event]
+
+        date_from = now + datetime.timedelta(days=30)
+        get_param = {"datetime_from": datetime.datetime.strftime(date_from, "%d/%m/%Y, %H:%M")}
+        assert list(self.processor(get_param)._perform_datetime_query(events)) == []
 
     def test__perform_distance_query_filters_objects_by_distance(self):
         """If the 4 search params are not received, return all objects."""
-        places = [PlaceFactory()]
+        place = PlaceFactory()
+        places = Place.objects.all()
 
-        lat, long = places[0].location_lat, places[0].location_long
+        lat, long = place.location_lat, place.location_long
         lat += 0.5
-        actual_distance = places[0].distance_from(lat, long)
+        actual_distance = place.distance_from(lat, long)
 
         get_param = {
             "location_lat": lat,
@@ -421,13 +521,36 @@ class TestFilterQueryProcessor(TestCase):
             "distance_lower": 0,
             "distance_upper": actual_distance + 5,
         }
-        assert self.processor(get_param)._perform_distance_query(places) == places
+        assert list(self.processor(get_param)._perform_distance_query(places)) == [place]
         get_param["distance_upper"] = actual_distance - 5
-        assert self.processor(get_param)._perform_distance_query(places) == []
+        assert list(self.processor(get_param)._perform_distance_query(places)) == []
+        get_param["distance_lower"] = actual_distance + 5
+        get_param["distance_upper"] = actual_distance + 10
+        assert list(self.processor(get_param)._perform_distance_query(places)) == []
+
+    def test__perform_distance_query_filters_events_by_the_distance_of_their_places(self):
+        """Events should be matched on the distance of any of their places."""
+        place = PlaceFactory(location_lat=51.5, location_long=-0.12)
+        far_place = PlaceFactory(location_lat=55.95, location_long=-3.19)
+        event = EventFactory()
+        event.places.add(place, far_place)
+        far_event = EventFactory()
+        far_event.places.add(far_place)
+        EventFactory()
+
+        get_param = {
+            "location_lat": 51.45,
+            "location_long": -0.97,
+            "distance_lower": 0,
+            "distance_upper": 50,
+        }
+        events = self.processor(get_param)._perform_distance_query(Event.objects.all())
+        assert list(events) == [event]
 
     def test__perform_distance_query_returns_all_results_if_bad_request(self):
         """If the function can't convert the types, just return everything."""
-        places = [PlaceFactory()]
+        PlaceFactory()
+        places = Place.objects.all()
 
         get_param = {
             "location_lat": "tomatos",
@@ -491,53 +614,181 @@ class TestFilterQueryProcessor(TestCase):
         assert list(processor._get_base_queryset(Event)) == []
 
     @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=False)
-    def test_get_results_for_object_type_does_not_show_unapproved_items_if_settings(self):
+    def test_get_result_ids_does_not_show_unapproved_items_if_settings(self):
         """Filters should not show unapproved items if SEARCH_SHOW_UNMODERATED_RESULTS=False."""
         activity = ActivityFactory()
-        processor = self.processor({})
-        result = processor._get_results_for_object_type(Activity)
-        assert activity not in result
+        result_ids = [entity_id for entity_id, _ in self.processor({}).get_result_ids()]
+        assert activity.id not in result_ids
 
-    def test_get_results_for_object_type_does_show_unapproved_items_if_settings(self):
-        """Filters should ot show unapproved items if SEARCH_SHOW_UNMODERATED_RESULTS=True."""
-        settings.SEARCH_SHOW_UNMODERATED_RESULTS = True
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_result_ids_does_show_unapproved_items_if_settings(self):
+        """Filters should show unapproved items if SEARCH_SHOW_UNMODERATED_RESULTS=True."""
         activity = ActivityFactory()
-        processor = self.processor({})
-        result = processor._get_results_for_object_type(Activity)
-        assert activity in result
+        result_ids = [entity_id for entity_id, _ in self.processor({}).get_result_ids()]
+        assert activity.id in result_ids
 
-    def test_get_results_for_object_type_calls_correct_functions_for_activity(self):
+    def test_get_queryset_for_object_type_calls_correct_functions_for_activity(self):
         """Function should call all correct functions."""
         processor = self.processor({})
         processor._append_slider_queries = MagicMock(return_value=1)
         processor._append_search_queries = MagicMock(return_value=2)
         processor._append_null_boolean_filter_queries = MagicMock(
-            return_value=Activity.objects.filter(),
+            return_value=SearchDocument.objects.filter(entity_type="Activity"),
         )
-        result = processor._get_results_for_object_type(Activity)
+        result = processor._get_queryset_for_object_type(Activity)
         processor._append_slider_queries.assert_called_once()
-        assert processor._append_slider_queries.call_args_list[0][0][0].model == Activity
+        assert processor._append_slider_queries.call_args_list[0][0][0].model == SearchDocument
         processor._append_search_queries.assert_called_once_with(1)
         processor._append_null_boolean_filter_queries.assert_called_once_with(2)
-        assert result == []
-
-    def test_get_results_calls__get_results_for_object_type_for_each_object_in_types_required(self):
-        """Function should get results for each specified type."""
-        processor = self.processor({})
-        processor._get_results_for_object_type = MagicMock()
-        processor.get_results()
-        processor._get_results_for_object_type.assert_has_calls(
-            [call(Activity), call(Event), call(Place)],
-            any_order=True,
-        )
+        assert list(result) == []
 
-    def test_get_results_returns_randomised_results_list(self):
-        """Function should return randomised results list."""
+    def test_get_result_ids_returns_every_type_required(self):
+        """Function should return results of each type."""
         user = CustomUserFactory()
         activity = ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
         event = EventFactory(approved_by=user, approval_timestamp=timezone.now())
         place = PlaceFactory(approved_by=user, approval_timestamp=timezone.now())
-        results = FilterQueryProcessor({}).get_results()
-        assert activity in results
-        assert event in results
-        assert place in results
+        result_ids = [entity_id for entity_id, _ in FilterQueryProcessor({}).get_result_ids()]
+        assert sorted(result_ids) == sorted([activity.id, event.id, place.id])
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_returns_a_page_of_results(self):
+        """Function should return a Page with page_size results and the total count."""
+        activities = [ActivityFactory() for _ in range(5)]
+        page = FilterQueryProcessor({"activity_select": True}).get_results_page("seed", 1, 2)
+        assert page.paginator.count == 5
+        assert len(page.object_list) == 2
+        assert page.has_next()
+        for result in page.object_list:
+            assert isinstance(result, SearchDocument)
+            assert result.id in [activity.id for activity in activities]
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_order_is_stable_for_a_seed(self):
+        """Pages for the same seed should not overlap and should cover every result."""
+        ActivityFactory()
+        ActivityFactory()
+        EventFactory()
+        PlaceFactory()
+        PlaceFactory()
+        processor = FilterQueryProcessor({})
+
+        first_run = []
+        for page_number in [1, 2, 3]:
+            first_run += processor.get_results_page("seed", page_number, 2).object_list
+        second_run = []
+        for page_number in [1, 2, 3]:
+            second_run += processor.get_results_page("seed", page_number, 2).object_list
+
+        assert [result.id for result in first_run] == [result.id for result in second_run]
+        assert len({result.id for result in first_run}) == 5
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_order_changes_with_the_seed(self):
+        """Different seeds should shuffle the results differently."""
+        for _ in range(10):
+            ActivityFactory()
+        processor = FilterQueryProcessor({})
+        first_order = [r.id for r in processor.get_results_page("seed", 1, 10).object_list]
+        second_order = [r.id for r in processor.get_results_page("another seed", 1, 10).object_list]
+        assert first_order != second_order
+        assert set(first_order) == set(second_order)
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_searches_every_type_in_one_query(self):
+        """One count and one union query for the page, whatever the number of results."""
+        for _ in range(3):
+            ActivityFactory()
+            EventFactory()
+            PlaceFactory()
+        with self.assertNumQueries(2):
+            page = FilterQueryProcessor({}).get_results_page("seed", 1, 9)
+            for result in page.object_list:
+                assert result.headline
+                assert result.image_url is None
+        assert {result.class_name for result in page.object_list} == {"Activity", "Event", "Place"}
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=True)
+    def test_get_results_page_includes_the_card_image(self):
+        """The image url should come with the document rather than from a query per result."""
+        activity = ActivityFactory()
+        image = SearchImageFactory()
+        activity.images.add(image)
+        page = FilterQueryProcessor({"activity_select": True}).get_results_page("seed")
+        assert page.object_list[0].image_url == image.display_url
+
+    @override_settings(SEARCH_SHOW_UNMODERATED_RESULTS=False)
+    def test_get_results_page_applies_the_filters_to_the_documents(self):
+        """Approval, sliders and distance should all be applied to the documents."""
+        user = CustomUserFactory()
+        PlaceFactory(location_lat=51.5, location_long=-0.12)
+        near = PlaceFactory(
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+            location_lat=51.5,
+            location_long=-0.12,
+            price_lower=5,
+            price_upper=10,
+        )
+        PlaceFactory(
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+            location_lat=55.95,
+            location_long=-3.19,
+            price_lower=5,
+            price_upper=10,
+        )
+        PlaceFactory(
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+            location_lat=51.5,
+            location_long=-0.12,
+            price_lower=100,
+            price_upper=200,
+        )
+        get_params = {
+            "place_select": True,
+            "location_lat": "51.5",
+            "location_long": "-0.12",
+            "distance_lower": "0",
+            "distance_upper": "10",
+            "price_lower": "0",
+            "price_upper": "20",
+        }
+        page = FilterQueryProcessor(get_params).get_results_page("seed")
+        assert [result.id for result in page.object_list] == [near.id]
+
+    def test_get_wishlist_ids_returns_ids_in_the_wishlist_per_type(self):
+        """Only results in the user's wishlist should be returned, grouped by type name."""
+        user = CustomUserFactory()
+        activity = ActivityFactory()
+        event = EventFactory()
+        place = PlaceFactory()
+        other_activity = ActivityFactory()
+        user.wishlist_activities.add(activity)
+        user.wishlist_events.add(event)
+        user.wishlist_places.add(place)
+
+        wishlist_ids = FilterQueryProcessor.get_wishlist_ids(
+            user,
+            [activity, event, place, other_activity],
+        )
+        assert wishlist_ids == {
+            "Activity": {activity.id},
+            "Event": {event.id},
+            "Place": {place.id},
+        }
+
+    def test_get_wishlist_ids_runs_one_query_per_type(self):
+        """The number of queries should not grow with the number of results."""
+        user = CustomUserFactory()
+        activities = [ActivityFactory() for _ in range(5)]
+        with self.assertNumQueries(1):
+            FilterQueryProcessor.get_wishlist_ids(user, activities)
+
+    def test_get_wishlist_ids_does_not_query_for_anonymous_users(self):
+        """Anonymous users have no wishlist, so no queries should be run."""
+        activity = ActivityFactory()
+        with self.assertNumQueries(0):
+            wishlist_ids = FilterQueryProcessor.get_wishlist_ids(AnonymousUser(), [activity])
+        assert wishlist_ids == {"Activity": set(), "Event": set(), "Place": set()}
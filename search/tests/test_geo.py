@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Tests for the geographic queries."""
+
+# 3rd-party
+import numpy as np
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.test import SimpleTestCase
+from django.test import TestCase
+from geopy.distance import distance
+
+# Project
+from search.geo import bounding_box_query
+from search.geo import distances_miles
+from search.geo import filter_by_distance
+from search.geo import geodesic_miles
+from search.geo import great_circle_distance
+from search.geo import haversine_miles
+from search.models import Event
+from search.models import Place
+from search.tests.factories import EventFactory
+from search.tests.factories import PlaceFactory
+
+# London to Manchester is 163.30 miles on the sphere and 163.54 miles on the ellipsoid.
+LONDON = (51.5, -0.12)
+MANCHESTER = (53.48, -2.24)
+BETWEEN_SPHERE_AND_ELLIPSOID = 163.4
+
+
+class TestBoundingBoxQuery(TestCase):
+    """Tests for bounding_box_query."""
+
+    def test_box_contains_points_on_the_edge_of_the_radius(self):
+        """Points due north, south, east and west at the radius should be inside the box."""
+        PlaceFactory(location_lat=51.5, location_long=-0.12)
+        PlaceFactory(location_lat=52.22, location_long=-0.12)
+        PlaceFactory(location_lat=50.78, location_long=-0.12)
+        PlaceFactory(location_lat=51.5, location_long=1.03)
+        PlaceFactory(location_lat=51.5, location_long=-1.27)
+        assert Place.objects.filter(bounding_box_query(51.5, -0.12, 50)).count() == 5
+
+    def test_box_excludes_points_outside_the_radius(self):
+        """Points well outside the radius should be excluded by the box."""
+        PlaceFactory(location_lat=55.95, location_long=-3.19)
+        PlaceFactory(location_lat=51.5, location_long=10)
+        assert Place.objects.filter(bounding_box_query(51.5, -0.12, 50)).count() == 0
+
+    def test_box_wraps_around_the_antimeridian(self):
+        """A circle crossing the antimeridian should include points on either side of it."""
+        east = PlaceFactory(location_lat=0, location_long=179.9)
+        west = PlaceFactory(location_lat=0, location_long=-179.9)
+        PlaceFactory(location_lat=0, location_long=0)
+        results = Place.objects.filter(bounding_box_query(0, 179.95, 50))
+        assert set(results) == {east, west}
+
+    def test_box_covers_all_longitudes_near_the_poles(self):
+        """If the circle contains a pole, longitude should not be constrained."""
+        PlaceFactory(location_lat=89.9, location_long=0)
+        PlaceFactory(location_lat=89.9, location_long=180)
+        assert Place.objects.filter(bounding_box_query(89.9, 0, 50)).count() == 2
+
+
+class TestGreatCircleDistance(TestCase):
+    """Tests for great_circle_distance."""
+
+    def test_distance_is_close_to_geodesic_distance(self):
+        """The spherical distance should be within half a percent of the geodesic distance."""
+        PlaceFactory(location_lat=51.5, location_long=-0.12)
+        result = Place.objects.annotate(distance=great_circle_distance(53.48, -2.24)).first()
+        expected = distance((51.5, -0.12), (53.48, -2.24)).miles
+        assert abs(result.distance - expected) < expected * 0.005
+
+    def test_distance_does_not_error_for_antipodal_points(self):
+        """Rounding errors for antipodal points should not raise a domain error."""
+        PlaceFactory(location_lat=0, location_long=0)
+        result = Place.objects.annotate(distance=great_circle_distance(0, 180)).first()
+        assert result.distance > 12000
+
+
+class TestFilterByDistance(TestCase):
+    """Tests for filter_by_distance."""
+
+    def test_only_places_within_the_distance_band_are_returned(self):
+        """Places nearer than the lower bound or further than the upper bound are excluded."""
+        PlaceFactory(location_lat=51.5, location_long=-0.12)
+        reading = PlaceFactory(location_lat=51.45, location_long=-0.97)
+        PlaceFactory(location_lat=55.95, location_long=-3.19)
+        results = filter_by_distance(Place.objects.all(), 51.5, -0.12, 10, 100)
+        assert list(results) == [reading]
+
+    def test_exact_filter_settles_rows_near_a_bound_with_the_geodesic_distance(self):
+        """Rows the sphere puts on the wrong side of a bound should be moved to the right side."""
+        manchester = PlaceFactory(location_lat=MANCHESTER[0], location_long=MANCHESTER[1])
+        places = Place.objects.all()
+
+        inside_sphere = filter_by_distance(places, *LONDON, 0, BETWEEN_SPHERE_AND_ELLIPSOID)
+        assert list(inside_sphere) == [manchester]
+        inside_sphere = filter_by_distance(
+            places,
+            *LONDON,
+            0,
+            BETWEEN_SPHERE_AND_ELLIPSOID,
+            exact=True,
+        )
+        assert list(inside_sphere) == []
+
+        outside_sphere = filter_by_distance(places, *LONDON, BETWEEN_SPHERE_AND_ELLIPSOID, 200)
+        assert list(outside_sphere) == []
+        outside_sphere = filter_by_distance(
+            places,
+            *LONDON,
+            BETWEEN_SPHERE_AND_ELLIPSOID,
+            200,
+            exact=True,
+        )
+        assert list(outside_sphere) == [manchester]
+
+    def test_exact_filter_works_in_a_correlated_subquery(self):
+        """Events should be filtered on the exact distance of their places."""
+        event = EventFactory()
+        event.places.add(PlaceFactory(location_lat=MANCHESTER[0], location_long=MANCHESTER[1]))
+        places_in_range = filter_by_distance(
+            Place.objects.filter(event=OuterRef("pk")),
+            *LONDON,
+            BETWEEN_SPHERE_AND_ELLIPSOID,
+            200,
+            exact=True,
+        )
+        assert list(Event.objects.filter(Exists(places_in_range))) == [event]
+
+
+class TestDistancesMiles(SimpleTestCase):
+    """Tests for the batch distance functions."""
+
+    def test_haversine_miles_matches_the_spherical_distance(self):
+        """The batch haversine distance should match the distance on a sphere."""
+        distances = haversine_miles(*LONDON, [MANCHESTER[0], np.nan], [MANCHESTER[1], 0])
+        assert abs(distances[0] - 163.296) < 0.01
+        assert np.isnan(distances[1])
+
+    def test_geodesic_miles_matches_geopy(self):
+        """The geodesic distance should be geopy's, with NaN for rows without coordinates."""
+        distances = geodesic_miles(*LONDON, [MANCHESTER[0], None], [MANCHESTER[1], None])
+        assert distances[0] == distance(LONDON, MANCHESTER).miles
+        assert np.isnan(distances[1])
+
+    def test_distances_miles_only_refines_rows_near_a_bound(self):
+        """Rows near a bound should get their geodesic distance, the rest their haversine one."""
+        lats = [MANCHESTER[0], 55.95]
+        longs = [MANCHESTER[1], -3.19]
+        spherical = haversine_miles(*LONDON, lats, longs)
+        assert list(distances_miles(*LONDON, lats, longs)) == list(spherical)
+
+        distances = distances_miles(*LONDON, lats, longs, [BETWEEN_SPHERE_AND_ELLIPSOID])
+        assert distances[0] == distance(LONDON, MANCHESTER).miles
+        assert distances[1] == spherical[1]
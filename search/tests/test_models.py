@@ -3,6 +3,7 @@
 
 # Standard Library
 import datetime
+from unittest.mock import MagicMock
 
 # 3rd-party
 from django.core.exceptions import ValidationError
@@ -11,6 +12,8 @@ from django.utils import timezone
 from geopy.distance import distance
 
 # Project
+from search.models import Activity
+from search.models import SearchDocument
 from search.models import search_image_upload_path
 from search.tests.factories import ActivityFactory
 from search.tests.factories import EventFactory
@@ -89,6 +92,35 @@ class TestActivity(TestCase):
         )
         assert entity.active_filters == ["filter", "selected"]
 
+    def test_save_updates_search_vector(self):
+        """Save should rebuild the search vector from the headline, synonyms and description."""
+        entity = ActivityFactory(headline="Archery", description="Bows", synonyms_keywords=["Aim"])
+        for keyword in ["archery", "bows", "aim"]:
+            assert Activity.objects.filter(id=entity.id, search_vector=keyword).exists()
+        entity.headline = "Fencing"
+        entity.save(update_fields=["headline"])
+        assert Activity.objects.filter(id=entity.id, search_vector="fencing").exists()
+        assert not Activity.objects.filter(id=entity.id, search_vector="archery").exists()
+
+    def test_save_updates_filter_states(self):
+        """Save should store the filter attributes, ignoring any other attributes."""
+        entity = ActivityFactory(attributes={"comedy": True, "outdoor": False, "other": "x"})
+        assert entity.filter_states == ["comedy=True", "outdoor=False"]
+        entity.attributes["outdoor"] = "True"
+        entity.save(update_fields=["attributes"])
+        entity.refresh_from_db()
+        assert entity.filter_states == ["comedy=True", "outdoor=True"]
+
+    def test_primary_image_returns_first_image(self):
+        """Property should return the same image as images.first()."""
+        entity = ActivityFactory()
+        entity.images.add(SearchImageFactory(), SearchImageFactory())
+        assert entity.primary_image == entity.images.first()
+
+    def test_primary_image_returns_none_if_no_images(self):
+        """Property should return None if the entity has no images."""
+        assert ActivityFactory().primary_image is None
+
 
 class TestPlace(TestCase):
     """Tests for Place."""
@@ -137,3 +169,94 @@ class TestEvent(TestCase):
             (new_lat, new_long),
         ).miles
         assert event.distance_from(new_lat, new_long) == expected_distance
+
+    def test_save_creates_an_occurrence_for_each_date(self):
+        """Saving an event should create one EventOccurrence per start / end pair."""
+        event = EventFactory()
+        occurrences = list(event.occurrences.order_by("start").values_list("start", "end"))
+        assert occurrences == [tuple(date_set) for date_set in sorted(event.dates)]
+
+    def test_save_replaces_occurrences_when_dates_change(self):
+        """Old occurrences should be removed when the event dates are edited."""
+        event = EventFactory()
+        new_start = timezone.now() + datetime.timedelta(days=3)
+        new_end = new_start + datetime.timedelta(hours=2)
+        event.dates = [[new_start, new_end]]
+        event.save()
+        assert list(event.occurrences.values_list("start", "end")) == [(new_start, new_end)]
+
+    def test_save_does_not_touch_occurrences_if_dates_not_in_update_fields(self):
+        """Saves limited to other fields should leave the occurrences alone."""
+        event = EventFactory()
+        event.sync_occurrences = MagicMock()
+        event.headline = "A new headline"
+        event.save(update_fields=["headline"])
+        event.sync_occurrences.assert_not_called()
+
+
+class TestSearchDocument(TestCase):
+    """Tests for SearchDocument."""
+
+    def test_str(self):
+        """Test string representation."""
+        activity = ActivityFactory()
+        document = SearchDocument.objects.get(id=activity.id)
+        assert str(document) == f"Search Document: Activity: {activity.headline}"
+
+    def test_update_for_entity_copies_the_card_fields(self):
+        """The document should hold the entity's card fields, image and filters."""
+        activity = ActivityFactory(
+            headline="Archery",
+            attributes={"comedy": True, "outdoor": False},
+        )
+        image = SearchImageFactory()
+        activity.images.add(image)
+        SearchDocument.update_for_entity(activity)
+        document = SearchDocument.objects.get(id=activity.id)
+        assert document.class_name == "Activity"
+        assert not document.approved
+        assert document.headline == activity.headline
+        assert document.price_upper == activity.price_upper
+        assert document.image_url == image.display_url
+        assert document.active_filters == ["comedy"]
+        assert document.filter_states == ["comedy=True", "outdoor=False"]
+        assert SearchDocument.objects.filter(id=activity.id, search_vector="archery").exists()
+
+    def test_update_for_entity_copies_event_dates_and_location(self):
+        """Event documents should hold the span of their dates and their place's location."""
+        place = PlaceFactory()
+        event = EventFactory()
+        event.places.add(place)
+        document = SearchDocument.objects.get(id=event.id)
+        assert document.date_start == min(start for start, _end in event.dates)
+        assert document.date_end == max(end for _start, end in event.dates)
+        assert document.location_lat == place.location_lat
+        assert document.location_long == place.location_long
+
+    def test_rebuild_rebuilds_every_document(self):
+        """Rebuild should replace the documents with fresh copies of every entity."""
+        activity = ActivityFactory(headline="Archery")
+        event = EventFactory()
+        place = PlaceFactory()
+        SearchDocument.objects.all().delete()
+        SearchDocument.objects.create(
+            id=activity.id,
+            entity_type="Activity",
+            headline="Out of date",
+            description="",
+            price_lower=0,
+            price_upper=0,
+            duration_lower=0,
+            duration_upper=0,
+            people_lower=0,
+            people_upper=0,
+            source_type="",
+        )
+        SearchDocument.rebuild()
+        assert set(SearchDocument.objects.values_list("id", flat=True)) == {
+            activity.id,
+            event.id,
+            place.id,
+        }
+        assert SearchDocument.objects.get(id=activity.id).headline == "Archery"
+        assert SearchDocument.objects.filter(id=activity.id, search_vector="archery").exists()
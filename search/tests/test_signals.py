@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Tests for the search document signals."""
+
+# Standard Library
+from io import StringIO
+from unittest import mock
+
+# 3rd-party
+from django.core.management import call_command
+from django.test import TestCase
+from django.test import override_settings
+
+# Project
+from search.models import SearchDocument
+from search.tests.factories import ActivityFactory
+from search.tests.factories import EventFactory
+from search.tests.factories import PlaceFactory
+from search.tests.factories import SearchImageFactory
+
+
+class TestSearchDocumentSignals(TestCase):
+    """Search documents should follow changes to the entities."""
+
+    def test_saving_an_entity_updates_its_document(self):
+        """Creating and editing an entity should create and update its document."""
+        activity = ActivityFactory(headline="Archery")
+        assert SearchDocument.objects.get(id=activity.id).headline == "Archery"
+        activity.headline = "Fencing"
+        activity.save()
+        assert SearchDocument.objects.get(id=activity.id).headline == "Fencing"
+
+    def test_deleting_an_entity_deletes_its_document(self):
+        """The document should go when the entity does."""
+        place = PlaceFactory()
+        place_id = place.id
+        place.delete()
+        assert not SearchDocument.objects.filter(id=place_id).exists()
+
+    def test_adding_an_image_updates_the_document(self):
+        """Images are added after the entity is saved, so the m2m change must update it."""
+        activity = ActivityFactory()
+        image = SearchImageFactory()
+        activity.images.add(image)
+        assert SearchDocument.objects.get(id=activity.id).image_url == image.display_url
+        activity.images.clear()
+        assert SearchDocument.objects.get(id=activity.id).image_url is None
+
+    def test_adding_an_event_from_the_place_side_updates_the_document(self):
+        """Reverse m2m changes should update the documents of the entities involved."""
+        place = PlaceFactory()
+        event = EventFactory()
+        place.event_set.add(event)
+        assert SearchDocument.objects.get(id=event.id).location_lat == place.location_lat
+
+    def test_moving_a_place_updates_its_events(self):
+        """A place's new location should be copied to the documents of its events."""
+        place = PlaceFactory()
+        event = EventFactory()
+        event.places.add(place)
+        place.location_lat = 12.5
+        place.location_long = 45.25
+        place.save()
+        for entity_id in [place.id, event.id]:
+            document = SearchDocument.objects.get(id=entity_id)
+            assert (document.location_lat, document.location_long) == (12.5, 45.25)
+
+    def test_moving_an_events_second_place_keeps_the_first_places_location(self):
+        """An event's location comes from its first place, as it would after a rebuild."""
+        first_place, second_place = sorted([PlaceFactory(), PlaceFactory()], key=lambda p: p.pk)
+        event = EventFactory()
+        event.places.add(first_place, second_place)
+        second_place.location_lat = 12.5
+        second_place.location_long = 45.25
+        second_place.save()
+        document = SearchDocument.objects.get(id=event.id)
+        assert (document.location_lat, document.location_long) == (
+            first_place.location_lat,
+            first_place.location_long,
+        )
+
+    def test_saving_a_place_without_moving_it_leaves_its_events(self):
+        """Only a change of location needs the place's events rebuilding."""
+        place = PlaceFactory()
+        event = EventFactory()
+        event.places.add(place)
+        place.headline = "The Pub"
+        with mock.patch.object(SearchDocument, "update_place_locations") as update_events:
+            place.save()
+        update_events.assert_not_called()
+
+    def test_deleting_a_place_updates_its_events(self):
+        """Deleting a place removes its event links without m2m signals, so events need updating."""
+        deleted_place = PlaceFactory(location_lat=12.5, location_long=45.25)
+        other_place = PlaceFactory(location_lat=51.5, location_long=-0.12)
+        event = EventFactory()
+        lone_event = EventFactory()
+        event.places.add(deleted_place, other_place)
+        lone_event.places.add(deleted_place)
+        deleted_place.delete()
+        document = SearchDocument.objects.get(id=event.id)
+        assert (document.location_lat, document.location_long) == (51.5, -0.12)
+        document = SearchDocument.objects.get(id=lone_event.id)
+        assert (document.location_lat, document.location_long) == (None, None)
+
+    def test_rebuild_search_documents_command(self):
+        """The management command should rebuild the documents in full."""
+        activity = ActivityFactory()
+        SearchDocument.objects.all().delete()
+        call_command("rebuild_search_documents", stdout=StringIO())
+        assert SearchDocument.objects.filter(id=activity.id).exists()
+
+    @mock.patch("search.management.commands.rebuild_search_documents.build_catalogue_snapshot")
+    def test_rebuild_search_documents_command_rebuilds_the_snapshot_in_full(self, mock_build):
+        """An update of the snapshot would miss the rebuilt documents, so it starts again."""
+        call_command("rebuild_search_documents", stdout=StringIO())
+        mock_build.delay.assert_not_called()
+        with override_settings(SEARCH_SNAPSHOT_DIR="/tmp/snapshots"):
+            call_command("rebuild_search_documents", stdout=StringIO())
+        mock_build.delay.assert_called_once_with(full=True)
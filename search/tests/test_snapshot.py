@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Tests for the catalogue snapshot."""
+
+# Standard Library
+import tempfile
+from unittest import mock
+
+# 3rd-party
+from django.http import QueryDict
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+
+# Project
+from search import snapshot as snapshot_module
+from search.bitmaps import pack_rows
+from search.bitmaps import unpack_rows
+from search.cache import bump_search_version
+from search.cache import search_cache
+from search.filters import FilterQueryProcessor
+from search.filters import nearby_place_documents
+from search.models import SearchDocument
+from search.snapshot import build_snapshot
+from search.snapshot import get_snapshot
+from search.tasks import build_catalogue_snapshot
+from search.tests.factories import ActivityFactory
+from search.tests.factories import EventFactory
+from search.tests.factories import PlaceFactory
+from search.tests.test_cache import LOCMEM_CACHES
+from users.tests.factories import CustomUserFactory
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCatalogueSnapshot(TestCase):
+    """Tests for building, loading and searching the catalogue snapshot."""
+
+    def setUp(self) -> None:  # noqa: D102
+        search_cache().clear()
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_dir.cleanup)
+        settings_override = override_settings(SEARCH_SNAPSHOT_DIR=self.snapshot_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        snapshot_module._current_snapshot = None
+        # Later tests must not see this test's snapshot or search version.
+        self.addCleanup(setattr, snapshot_module, "_current_snapshot", None)
+        self.addCleanup(search_cache().clear)
+        self.user = CustomUserFactory()
+
+    def approved(self, factory, **kwargs):
+        """Make an approved entity with the factory."""
+        return factory(approved_by=self.user, approval_timestamp=timezone.now(), **kwargs)
+
+    def test_build_snapshot_round_trips_the_search_documents(self):
+        """Every document's id, type and filters should be readable from the snapshot."""
+        activity = self.approved(ActivityFactory, attributes={"dog_friendly": "True"})
+        place = self.approved(PlaceFactory, location_lat=51.5, location_long=-0.12)
+        event = self.approved(EventFactory)
+        event.places.add(place)
+
+        snapshot = build_snapshot()
+
+        assert sorted(snapshot.ids(snapshot["approved"])) == sorted(
+            [activity.id, place.id, event.id],
+        )
+        assert len(snapshot["event_place_rows"]) == 1
+        dog_friendly = unpack_rows(
+            snapshot.filter_index.bitmap("dog_friendly", True),
+            len(snapshot),
+        )
+        assert snapshot.ids(dog_friendly) == [activity.id]
+
+    def test_get_snapshot_returns_none_without_a_published_snapshot(self):
+        """Searches should go to the database until the first snapshot is published."""
+        assert get_snapshot() is None
+        with override_settings(SEARCH_SNAPSHOT_DIR=None):
+            assert get_snapshot() is None
+
+    def test_get_snapshot_loads_a_newly_published_snapshot(self):
+        """Each process should move on to a snapshot as soon as it is published."""
+        first = build_snapshot()
+        assert get_snapshot().path == first.path
+        second = build_snapshot()
+        assert get_snapshot().path == second.path
+        assert not first.path.exists()
+
+    def test_snapshot_results_match_the_database(self):
+        """The snapshot should agree with the database for filter, slider and distance searches."""
+        self.approved(ActivityFactory, price_lower=0, price_upper=10)
+        self.approved(ActivityFactory, price_lower=50, price_upper=100)
+        self.approved(ActivityFactory, attributes={"dog_friendly": "True"})
+        near_place = self.approved(PlaceFactory, location_lat=51.5, location_long=-0.12)
+        far_place = self.approved(PlaceFactory, location_lat=55.95, location_long=-3.19)
+        near_event = self.approved(EventFactory)
+        near_event.places.add(near_place, far_place)
+        far_event = self.approved(EventFactory)
+        far_event.places.add(far_place)
+        ActivityFactory()
+
+        searches = [
+            "",
+            "price_lower=20&price_upper=200",
+            "filter_dog_friendly=true",
+            "filter_dog_friendly=false",
+            "activity_select=on&place_select=on",
+            "location_lat=51.5&location_long=-0.12&distance_lower=0&distance_upper=20",
+        ]
+        database_results = {
+            params: sorted(
+                str(entity_id)
+                for entity_id, _ in FilterQueryProcessor(QueryDict(params)).get_result_ids()
+            )
+            for params in searches
+        }
+        build_snapshot()
+        for params in searches:
+            processor = FilterQueryProcessor(QueryDict(params))
+            snapshot = processor._get_snapshot()
+            assert snapshot is not None
+            snapshot_results = sorted(
+                str(entity_id) for entity_id, _ in processor._get_snapshot_result_ids(snapshot)
+            )
+            assert snapshot_results == database_results[params], params
+
+    def test_build_snapshot_updates_the_previous_snapshot(self):
+        """A rebuild should keep every row, update saved documents and clear deleted ones."""
+        place = self.approved(PlaceFactory, location_lat=51.5, location_long=-0.12)
+        event = self.approved(EventFactory)
+        event.places.add(place)
+        deleted = self.approved(ActivityFactory)
+        unchanged = self.approved(ActivityFactory)
+        first = build_snapshot()
+
+        place.location_lat = 55.95
+        place.save()
+        deleted.delete()
+        added = self.approved(ActivityFactory, attributes={"dog_friendly": "True"})
+        second = build_snapshot()
+
+        assert second.deleted_rows == 1
+        assert len(second) == len(first) + 1
+        assert sorted(second.ids(second["entity_type"] >= 0)) == sorted(
+            [place.id, event.id, unchanged.id, added.id],
+        )
+        assert list(second["event_place_lat"]) == [55.95]
+        assert second.filter_index.counts(pack_rows(second["approved"]))["dog_friendly"] == 1
+
+    def test_build_snapshot_updates_the_events_of_a_deleted_place(self):
+        """An event should stop matching on the location of a deleted place."""
+        self.approved(ActivityFactory)
+        deleted_place = self.approved(PlaceFactory, location_lat=55.95, location_long=-3.19)
+        other_place = self.approved(PlaceFactory, location_lat=51.5, location_long=-0.12)
+        event = self.approved(EventFactory)
+        event.places.add(deleted_place, other_place)
+        build_snapshot()
+
+        deleted_place.delete()
+        snapshot = build_snapshot()
+        assert snapshot.deleted_rows == 1
+        assert list(snapshot["event_place_lat"]) == [51.5]
+        processor = FilterQueryProcessor(
+            QueryDict("location_lat=55.95&location_long=-3.19&distance_lower=0&distance_upper=20"),
+        )
+        result_ids = [entity_id for entity_id, _ in processor._get_snapshot_result_ids(snapshot)]
+        assert event.id not in result_ids
+
+    def test_full_build_snapshot_starts_again(self):
+        """A full build should read every document rather than updating the previous snapshot."""
+        activities = [self.approved(ActivityFactory) for _ in range(4)]
+        build_snapshot()
+        activities[0].delete()
+        snapshot = build_snapshot(full=True)
+        assert snapshot.deleted_rows == 0
+        assert len(snapshot) == 3
+
+    def test_build_snapshot_starts_again_once_enough_rows_are_deleted(self):
+        """Snapshots with too many deleted rows should be rebuilt from scratch."""
+        activities = [self.approved(ActivityFactory) for _ in range(4)]
+        build_snapshot()
+        activities[0].delete()
+        activities[1].delete()
+        snapshot = build_snapshot()
+        assert snapshot.deleted_rows == 0
+        assert len(snapshot) == 2
+
+    def test_nearby_place_documents_are_answered_from_the_snapshot(self):
+        """The snapshot's place grid should give the same nearby places as the database."""
+        # Around Lerwick, well away from the places other tests make around London.
+        near = self.approved(PlaceFactory, location_lat=60.165, location_long=-1.145)
+        nearer = self.approved(PlaceFactory, location_lat=60.155, location_long=-1.146)
+        self.approved(PlaceFactory, location_lat=55.95, location_long=-3.19)
+        PlaceFactory(location_lat=60.155, location_long=-1.145)
+        excluded = self.approved(PlaceFactory, location_lat=60.155, location_long=-1.145)
+
+        database_places = nearby_place_documents(60.155, -1.145, exclude_ids=[excluded.id])
+        build_snapshot()
+        with mock.patch.object(SearchDocument.objects, "filter") as database_filter:
+            snapshot_places = nearby_place_documents(60.155, -1.145, exclude_ids=[excluded.id])
+        database_filter.assert_not_called()
+        assert [document.id for document in snapshot_places] == [nearer.id, near.id]
+        assert [document.id for document in database_places] == [nearer.id, near.id]
+
+    def test_get_filter_counts_counts_the_results_with_each_filter(self):
+        """Facet counts should only count the results of the search."""
+        self.approved(
+            ActivityFactory,
+            attributes={"dog_friendly": "True"},
+            price_lower=0,
+            price_upper=10,
+        )
+        self.approved(
+            ActivityFactory,
+            attributes={"dog_friendly": "True"},
+            price_lower=150,
+            price_upper=200,
+        )
+        assert FilterQueryProcessor(QueryDict("")).get_filter_counts() is None
+        build_snapshot()
+        processor = FilterQueryProcessor(QueryDict("price_lower=0&price_upper=100"))
+        assert processor.get_filter_counts()["dog_friendly"] == 1
+
+    def test_out_of_date_snapshots_are_not_used(self):
+        """Once the search results change, searches should go back to the database."""
+        build_snapshot()
+        processor = FilterQueryProcessor(QueryDict(""))
+        assert processor._get_snapshot() is not None
+        activity = self.approved(ActivityFactory)
+        bump_search_version()
+        assert processor._get_snapshot() is None
+        assert [entity_id for entity_id, _ in processor.get_result_ids()] == [activity.id]
+
+    def test_keyword_and_wishlist_searches_are_not_answered_from_the_snapshot(self):
+        """Keyword ranks and wishlists are only in the database."""
+        build_snapshot()
+        assert FilterQueryProcessor(QueryDict("keywords=walk"))._get_snapshot() is None
+        assert FilterQueryProcessor(QueryDict(""), self.user)._get_snapshot() is None
+
+    def test_build_catalogue_snapshot_only_rebuilds_when_the_results_change(self):
+        """The scheduled task should leave an up to date snapshot alone."""
+        build_catalogue_snapshot()
+        first = get_snapshot()
+        build_catalogue_snapshot()
+        assert get_snapshot().path == first.path
+        bump_search_version()
+        build_catalogue_snapshot()
+        assert get_snapshot().path != first.path
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for the spatial grid."""
+
+# 3rd-party
+import numpy as np
+from django.test import SimpleTestCase
+
+# Project
+from search.geo import haversine_miles
+from search.spatial import SpatialGrid
+from search.spatial import build_grid
+
+
+def make_grid(lats, longs):
+    """A grid over the given coordinates."""
+    lats = np.array(lats, dtype=np.float64)
+    longs = np.array(longs, dtype=np.float64)
+    return SpatialGrid(*build_grid(lats, longs), lats, longs)
+
+
+class TestSpatialGrid(SimpleTestCase):
+    """Tests for build_grid and SpatialGrid."""
+
+    def setUp(self) -> None:  # noqa: D102
+        random = np.random.default_rng(0)
+        self.lats = random.uniform(49, 59, 2000)
+        self.longs = random.uniform(-8, 2, 2000)
+        self.grid = make_grid(self.lats, self.longs)
+
+    def test_build_grid_leaves_out_points_without_coordinates(self):
+        """Points with a missing latitude or longitude can't be found by any search."""
+        keys, points = build_grid([51.5, np.nan, 52.0], [-0.12, 1.0, np.nan])
+        assert list(points) == [0]
+        assert len(keys) == 1
+
+    def test_within_matches_a_full_scan(self):
+        """Radius searches should find exactly the points a scan of every point finds."""
+        distances = haversine_miles(51.5, -0.12, self.lats, self.longs)
+        for lower, upper in [(0, 5), (0, 50), (20, 80), (0, 1000)]:
+            expected = np.flatnonzero((distances >= lower) & (distances <= upper))
+            assert sorted(self.grid.within(51.5, -0.12, lower, upper)) == list(expected)
+
+    def test_within_wraps_around_the_antimeridian(self):
+        """Points just across the antimeridian are close by."""
+        grid = make_grid([0, 0, 0], [179.9, -179.9, 0])
+        assert sorted(grid.within(0, 179.95, 0, 20)) == [0, 1]
+
+    def test_nearest_returns_the_closest_points_in_order(self):
+        """Nearest searches should agree with sorting every point by distance."""
+        distances = haversine_miles(51.5, -0.12, self.lats, self.longs)
+        expected = np.argsort(distances, kind="stable")[:10]
+        assert list(self.grid.nearest(51.5, -0.12, 10, 1000)) == list(expected)
+
+    def test_nearest_stops_at_the_maximum_distance(self):
+        """Points further than max_distance are never returned, even if there are too few."""
+        grid = make_grid([51.5, 51.6, 55.95], [-0.12, -0.12, -3.19])
+        assert list(grid.nearest(51.5, -0.12, 5, 25)) == [0, 1]
+
+    def test_nearest_skips_points_that_are_not_allowed(self):
+        """Only allowed points should be returned."""
+        grid = make_grid([51.5, 51.6, 51.7], [-0.12, -0.12, -0.12])
+        allowed = np.array([False, True, True])
+        assert list(grid.nearest(51.5, -0.12, 1, 25, allowed)) == [1]
@@ -82,3 +82,15 @@ class TestIsInUsersWishlist(TestCase):
 
         assert is_in_users_wishlist(context, "Place", self.place.id) is True
         assert is_in_users_wishlist(context, "Place", self.place_not_favourite.id) is False
+
+    def test_tag_uses_wishlist_ids_from_context(self):
+        """If the context already has the wishlist ids, the tag should not query for them."""
+        context = MagicMock()
+        context.request = MagicMock()
+        context.request.user = self.user
+        context.get.return_value = {"Activity": {self.activity_not_favourite.id}}
+
+        with self.assertNumQueries(0):
+            assert is_in_users_wishlist(context, "Activity", self.activity_not_favourite.id)
+            assert is_in_users_wishlist(context, "Activity", self.activity.id) is False
+            assert is_in_users_wishlist(context, "Event", self.event.id) is False
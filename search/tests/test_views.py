@@ -9,18 +9,25 @@ from http.client import CREATED
 from http.client import NOT_FOUND
 from http.client import OK
 from io import BytesIO
+from unittest import mock
 
 # 3rd-party
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from PIL import Image
 
 # Project
+from search import snapshot as snapshot_module
 from search import views
+from search.cache import search_cache
 from search.constants import FILTERS
+from search.constants import SEARCH_RESULTS_PAGE_SIZE
 from search.filters import FilterSearchForm
 from search.filters import FilterSettingForm
 from search.forms import EventDatesForm
@@ -36,6 +43,7 @@ from search.tests.factories import ActivityFactory
 from search.tests.factories import EventFactory
 from search.tests.factories import PlaceFactory
 from search.tests.factories import SearchImageFactory
+from search.tests.test_cache import LOCMEM_CACHES
 from users.tests.factories import CustomUserFactory
 from users.views import log_in
 
@@ -760,7 +768,7 @@ class TestNewEvent(TestCase):
 
         assert events[0].dates == [self.dates]
         assert list(events[0].activities.all()) == self.activities
-        assert list(events[0].places.all()) == self.places
+        assert list(events[0].places.order_by("pk")) == sorted(self.places, key=lambda x: x.pk)
 
         for filter_list in FILTERS.values():
             for filter in filter_list:
@@ -1054,6 +1062,78 @@ class TestSearchResults(TestCase):
         assert event.headline in str(response.content)
         assert place.headline in str(response.content)
 
+    def test_results_are_paginated(self):
+        """Only the first page should be rendered, with a link to load the next page."""
+        user = CustomUserFactory()
+        for _ in range(SEARCH_RESULTS_PAGE_SIZE + 1):
+            ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
+        response = self.client.get(self.url, {"seed": "abc"})
+        assert len(response.context["results"]) == SEARCH_RESULTS_PAGE_SIZE
+        assert response.context["total_results"] == SEARCH_RESULTS_PAGE_SIZE + 1
+        assert "page=2" in response.context["next_page_url"]
+        assert "seed=abc" in response.context["next_page_url"]
+        assert 'hx-trigger="intersect once"' in str(response.content)
+
+    def test_filter_counts_are_sent_for_the_filter_buttons(self):
+        """The first page should carry the filter counts that search.js shows on the buttons."""
+        with mock.patch(
+            "search.views.FilterQueryProcessor.get_filter_counts",
+            return_value={"dog_friendly": 2},
+        ):
+            response = self.client.get(self.url, {"seed": "abc"})
+        assert response.context["filter_counts"] == {"dog_friendly": 2}
+        assert 'id="filter-result-counts"' in str(response.content)
+
+    def test_later_pages_only_render_the_cards(self):
+        """Pages after the first should only render the page partial."""
+        user = CustomUserFactory()
+        activities = [
+            ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
+            for _ in range(SEARCH_RESULTS_PAGE_SIZE + 1)
+        ]
+        first_page = self.client.get(self.url, {"seed": "abc"})
+        second_page = self.client.get(self.url, {"seed": "abc", "page": 2})
+        self.assertTemplateNotUsed(second_page, "partials/search_results.html")
+        self.assertTemplateUsed(second_page, "partials/search_results_page.html")
+        assert second_page.context["next_page_url"] is None
+        rendered = list(first_page.context["results"]) + list(second_page.context["results"])
+        assert {result.id for result in rendered} == {activity.id for activity in activities}
+
+    def test_query_count_does_not_grow_with_results(self):
+        """Rendering the cards should not run extra queries per result."""
+        user = CustomUserFactory()
+        self.client.force_login(user)
+
+        def create_results(count):
+            for _ in range(count):
+                activity = ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
+                activity.images.add(SearchImageFactory())
+                user.wishlist_activities.add(activity)
+
+        create_results(2)
+        with CaptureQueriesContext(connection) as few_results:
+            self.client.get(self.url, {"seed": "abc"})
+        create_results(10)
+        with CaptureQueriesContext(connection) as more_results:
+            self.client.get(self.url, {"seed": "abc"})
+        assert len(more_results) == len(few_results)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_anonymous_searches_are_cached(self):
+        """A repeated anonymous search should only fetch the page of documents."""
+        search_cache().clear()
+        user = CustomUserFactory()
+        activities = [
+            ActivityFactory(approved_by=user, approval_timestamp=timezone.now())
+            for _ in range(SEARCH_RESULTS_PAGE_SIZE + 1)
+        ]
+        first_page = self.client.get(self.url, {"seed": "abc"})
+        with self.assertNumQueries(1):
+            second_page = self.client.get(self.url, {"seed": "abc", "page": 2})
+        rendered = list(first_page.context["results"]) + list(second_page.context["results"])
+        assert {result.id for result in rendered} == {activity.id for activity in activities}
+        assert first_page.context["total_results"] == SEARCH_RESULTS_PAGE_SIZE + 1
+
 
 class TestNewEntityWizard(TestCase):
     """Test new entity wizard."""
@@ -1108,6 +1188,43 @@ class TestSeeMore(TestCase):
         assert response.context["search_entity"] == self.event
         assert response.context["entity_type"] == "Event"
 
+    @override_settings(SEARCH_SNAPSHOT_DIR=None, SEARCH_SHOW_UNMODERATED_RESULTS=False)
+    def test_nearby_places_are_close_approved_places(self):
+        """Nearby places should be approved, within range and not the entity's own places."""
+        # Answered from the database, whatever snapshot an earlier test left loaded.
+        snapshot_module._current_snapshot = None
+        user = CustomUserFactory()
+        # Around Lerwick, well away from the places other tests make around London.
+        self.place.location_lat = 60.155
+        self.place.location_long = -1.145
+        self.place.save()
+        near = PlaceFactory(
+            location_lat=60.165,
+            location_long=-1.145,
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+        )
+        PlaceFactory(location_lat=60.175, location_long=-1.145)
+        PlaceFactory(
+            location_lat=55.95,
+            location_long=-3.19,
+            approved_by=user,
+            approval_timestamp=timezone.now(),
+        )
+        for url in [self.url, reverse(self.view, args=["Place", self.place.id])]:
+            response = self.client.get(url)
+            assert [document.id for document in response.context["nearby_places"]] == [near.id]
+            self.assertContains(response, "Nearby Places:")
+
+    def test_no_nearby_places_without_a_location(self):
+        """Activities, and events without located places, have no nearby places."""
+        activity = ActivityFactory()
+        response = self.client.get(reverse(self.view, args=["Activity", activity.id]))
+        assert response.context["nearby_places"] == []
+        self.place.location_lat = None
+        self.place.save()
+        assert self.client.get(self.url).context["nearby_places"] == []
+
 
 class TestModifyWishlist(TestCase):
     """Tests for the add to wishlist view."""
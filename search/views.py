@@ -15,13 +15,17 @@ from django.shortcuts import get_object_or_404
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.crypto import get_random_string
 from django.views.decorators.http import require_POST
 
 # Project
+from search.cache import get_cached_ordered_result_ids
+from search.cache import normalise_search_params
 from search.constants import FILTERS
 from search.filters import FilterQueryProcessor
 from search.filters import FilterSearchForm
 from search.filters import FilterSettingForm
+from search.filters import nearby_place_documents
 from search.forms import EventDatesForm
 from search.forms import NewActivityForm
 from search.forms import NewEventForm
@@ -423,10 +427,67 @@ def search_view(request):
     )
 
 
+def _render_search_results_page(request, processor: FilterQueryProcessor, cached: bool = False):
+    """
+    Render a page of search results for the infinite scroll.
+
+    The first page renders the full results partial, later pages only render their cards so they
+    can be swapped in at the bottom of the list. The seed is passed along with the page number
+    so each page continues the same shuffled order. Cached searches read the ordered result ids for
+    the seed from the search cache and only fetch the documents for the page. The first page also
+    has the number of results with each filter set, when the catalogue snapshot can answer the
+    search.
+    """
+    seed = request.GET.get("seed") or get_random_string(12)
+    page_number = request.GET.get("page", 1)
+    if cached:
+        page = processor.get_results_page_for_ids(
+            get_cached_ordered_result_ids(processor, seed),
+            page_number,
+        )
+    else:
+        page = processor.get_results_page(seed, page_number)
+
+    next_page_url = None
+    if page.has_next():
+        get_params = request.GET.copy()
+        get_params["seed"] = seed
+        get_params["page"] = page.next_page_number()
+        next_page_url = f"{request.path}?{get_params.urlencode()}"
+
+    template = "partials/search_results.html"
+    filter_counts = None
+    if page.number > 1:
+        template = "partials/search_results_page.html"
+    else:
+        filter_counts = processor.get_filter_counts()
+
+    return render(
+        request,
+        template,
+        {
+            "results": page.object_list,
+            "wishlist_ids": processor.get_wishlist_ids(request.user, page.object_list),
+            "total_results": page.paginator.count,
+            "filter_counts": filter_counts,
+            "next_page_url": next_page_url,
+        },
+    )
+
+
 def search_results(request):
-    """An async view that returns the search results based on GET params."""
-    results = FilterQueryProcessor(request.GET).get_results()
-    return render(request, "partials/search_results.html", {"results": results})
+    """
+    An async view that returns the search results based on GET params.
+
+    Anonymous searches are cached, keyed on the search params with the location rounded to a grid.
+    """
+    if request.user.is_authenticated:
+        return _render_search_results_page(request, FilterQueryProcessor(request.GET))
+    return _render_search_results_page(
+        request,
+        FilterQueryProcessor(normalise_search_params(request.GET)),
+        cached=True,
+    )
 
 
 @login_required
@@ -455,7 +516,37 @@ def see_more(request, entity_type, entity_id):
     return render(
         request,
         "see_more.html",
-        {"search_entity": entity_instance, "entity_type": entity_type},
+        {
+            "search_entity": entity_instance,
+            "entity_type": entity_type,
+            "nearby_places": _nearby_places(entity_type, entity_instance),
+        },
+    )
+
+
+def _nearby_places(entity_type, entity_instance):
+    """
+    The documents of the places near a place, or near the first place of an event.
+
+    The entity's own places are left out, as they are already shown as related places.
+    """
+    if entity_type == "Place":
+        places = [entity_instance]
+    elif entity_type == "Event":
+        places = list(entity_instance.places.order_by("pk"))
+    else:
+        return []
+    located = [
+        place
+        for place in places
+        if place.location_lat is not None and place.location_long is not None
+    ]
+    if not located:
+        return []
+    return nearby_place_documents(
+        located[0].location_lat,
+        located[0].location_long,
+        exclude_ids=[place.id for place in places],
     )
 
 
@@ -521,5 +612,7 @@ def my_wishlist(request):
 @login_required
 def my_wishlist_results(request):
     """An async view that returns the users wishlist results based on GET params."""
-    results = FilterQueryProcessor(request.GET, wishlist_user=request.user).get_results()
-    return render(request, "partials/search_results.html", {"results": results})
+    return _render_search_results_page(
+        request,
+        FilterQueryProcessor(request.GET, wishlist_user=request.user),
+    )